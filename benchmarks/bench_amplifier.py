@@ -0,0 +1,57 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> benchmarks/bench_amplifier.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+
+from minispice.amplAnalysis import amplAnalysis, designSpace, unitDisk
+
+# S-parameters of an unconditionally stable transistor
+SPARAMS = np.array([
+	[ 0.5 * np.exp(-1j * np.radians(60)), 0.05 * np.exp(1j * np.radians(50)) ],
+	[ 3.0 * np.exp( 1j * np.radians(80)), 0.40 * np.exp(-1j * np.radians(30)) ],
+])
+
+# Matching design space: gain circles generated one at a time against the
+# vectorized (GammaS, GammaL) grid. Grids have about 0.79 npoints^2 points
+# per axis, so npoints = 36 is close to a million pairs.
+class DesignSpace:
+
+	params = [16, 36]
+	param_names = ["npoints"]
+
+	def setup(self, npoints):
+
+		self.amplifier = amplAnalysis(SPARAMS)
+		self.gamma = unitDisk(npoints)
+
+	def time_gainCircles(self, npoints):
+
+		for _dB in np.linspace(0.0, 10.0, 11):
+			self.amplifier.conjugateCircleData( self.amplifier.constantGainCircle(_dB)["data"] )
+
+	def time_designSpace(self, npoints):
+		designSpace(SPARAMS, self.gamma).optimum()
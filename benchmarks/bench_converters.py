@@ -0,0 +1,56 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> benchmarks/bench_converters.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+
+from minispice.Converter import ytos, stoy, ytoz, ytosN
+
+# Converter throughput on 2x2 matrices: scalar converters in a loop and
+# the batched N-port converter
+class Converters:
+
+	params = [1000, 10000]
+	param_names = ["nfreq"]
+
+	def setup(self, nfreq):
+
+		rng = np.random.RandomState(0)
+
+		self.y = ( rng.standard_normal( (nfreq, 2, 2) ) + 1j * rng.standard_normal( (nfreq, 2, 2) ) ) * 0.02
+		self.list = list(self.y)
+
+	def time_ytos(self, nfreq):
+		[ ytos(_y) for _y in self.list ]
+
+	def time_stoy(self, nfreq):
+		[ stoy(_y) for _y in self.list ]
+
+	def time_ytoz(self, nfreq):
+		[ ytoz(_y) for _y in self.list ]
+
+	def time_ytosN(self, nfreq):
+		ytosN(self.y)
@@ -0,0 +1,53 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> benchmarks/bench_matching.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+
+#!/usr/bin/env python
+import numpy as np
+
+from minispice.matching import matchingSynthesis
+
+# Matching synthesis: one synthesis per target in a loop against a single
+# vectorized pass over all targets, topologies and Q values (element 
+# values, band evaluation and ranking).
+class MatchingSynthesis:
+
+	params = [10, 1000]
+	param_names = ["ntargets"]
+
+	def setup(self, ntargets):
+
+		rng = np.random.default_rng(0)
+		self.ZL = rng.uniform(5.0, 200.0, ntargets) + 1j * rng.uniform(-150.0, 150.0, ntargets)
+		self.f0 = rng.uniform(1e8, 5e9, ntargets)
+
+	def time_perTarget(self, ntargets):
+
+		for _Z, _f in zip(self.ZL, self.f0):
+			matchingSynthesis(_Z, _f).best()
+
+	def time_matchingSynthesis(self, ntargets):
+		matchingSynthesis(self.ZL, self.f0).best()
@@ -0,0 +1,127 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> benchmarks/bench_nonlinear.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import contextlib
+import sys
+import os
+import io
+import tracemalloc
+import numpy as np
+
+from minispice.nonlinear import componentModels
+from minispice.signalTools import signalTools
+
+# The nonlinear solvers live in the examples
+EXAMPLES = os.path.join( os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) ), "examples" )
+
+for _example in ["harmonicBalance", "diodeTransient"]:
+	if os.path.join(EXAMPLES, _example) not in sys.path:
+		sys.path.append( os.path.join(EXAMPLES, _example) )
+
+# Check that surfaceChunks reproduces surface and that its peak memory is 
+# set by the block size. The model temporaries take about 20 blocks, while 
+# the three full outputs take 3 nrows / chunk blocks.
+def checkSurface(device, Vgs, Vds, chunk):
+
+	full = device.surface(Vgs, Vds)
+
+	tracemalloc.start()
+
+	for _rows, _block in device.surfaceChunks(Vgs, Vds, chunk):
+		for _key, _value in _block.items():
+			if not np.array_equal( _value, full[_key][_rows] ):
+				raise ValueError("surfaceChunks differs from surface (%s)"%_key)
+
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+
+	if peak > 32 * chunk * len(Vgs) * 8:
+		raise ValueError("surfaceChunks peak memory %d bytes for blocks of %d rows"%(peak, chunk))
+
+# I-V and conductance surfaces of the HFET model over a dense bias grid, as
+# full arrays and streamed in blocks of rows
+class Surface:
+
+	params = [100, 1000]
+	param_names = ["npoints"]
+
+	def setup(self, npoints):
+
+		self.device = componentModels.HFET()
+		self.Vgs = np.linspace(-1.0, 0.5, npoints)
+		self.Vds = np.linspace(0.0, 5.0, npoints)
+
+		checkSurface(self.device, self.Vgs, self.Vds, max(npoints // 100, 1))
+
+	def time_surface(self, npoints):
+		self.device.surface(self.Vgs, self.Vds, chunk = 100)
+
+	def time_surfaceChunks(self, npoints):
+		for _rows, _block in self.device.surfaceChunks(self.Vgs, self.Vds, chunk = 100):
+			_block["GM"].max()
+
+# Harmonic balance of the diode resistor circuit until convergence
+class HarmonicBalance:
+
+	params = [8, 16]
+	param_names = ["order"]
+
+	def setup(self, order):
+
+		from harmonicBalance import harmonicBalance
+
+		self.solver = harmonicBalance
+		self.config = {
+			"amplitude" : 1.2,
+			"frequency" : 5.0e9,
+			"order"		: order,
+			"epsilon"	: 1.0,
+			"converge"	: 1e-6,
+			"maxiter"	: 2000
+		}
+
+	def time_solve(self, order):
+
+		with contextlib.redirect_stdout( io.StringIO() ):
+			self.solver(self.config, componentModels.diode()).solve(source_impedance = 10.0)
+
+# Companion model transient of the diode resistor circuit. Time per run of
+# npoints time steps
+class Transient:
+
+	params = [1000, 10000]
+	param_names = ["npoints"]
+
+	def setup(self, npoints):
+
+		from diodeTransient import diode_transient
+
+		signal = signalTools().pulse({"amplitude" : 1.0, "period" : 1e-8, "npoints" : npoints, "duty" : 0.25})
+		self.analysis = diode_transient(signal)
+
+	def time_solve(self, npoints):
+		self.analysis.solve(source_impedance = 64.0, conv = 1e-9)
@@ -0,0 +1,83 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> benchmarks/bench_reduction.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import tempfile
+import shutil
+import numpy as np
+
+from minispice.krylovReduction import krylovReduction
+from minispice.compiledNetlist import compiledNetlist
+from minispice.nodeMatrix import portReduction
+from minispice import netlistParser
+
+from ladder import writeLadder
+
+# Check that deflation keeps the Krylov basis within the system size. Ladders
+# smaller than order * nports must be reduced to at most their number of 
+# unknowns, which reproduces the full system exactly.
+def checkOrder(directory):
+
+	for _n, _kind in [ (2, "RC"), (3, "RLC"), (5, "LC") ]:
+
+		path, node = writeLadder(directory, _n, _kind)
+		compiled = compiledNetlist( netlistParser.parse(path) )
+
+		model = krylovReduction(compiled, [1, node], order = 10)
+		freq = np.logspace(8, 10.5, 21)
+
+		full = portReduction( compiled.tensor(freq), [1, node] )
+		error = np.max( np.abs( model.admittance(freq) - full ) ) / np.max( np.abs(full) )
+
+		if model.order > model.size or error > 1e-8:
+			raise ValueError("Krylov reduction of %s ladder (%d sections): order %d for %d unknowns, error %g"%(_kind, _n, model.order, model.size, error))
+
+# PRIMA reduction of RLC ladders (port impedance moments around f0) against
+# sweeping the reduced model
+class KrylovReduction:
+
+	params = [100, 1000]
+	param_names = ["nsections"]
+
+	def setup(self, nsections):
+
+		self.dir = tempfile.mkdtemp()
+		checkOrder(self.dir)
+
+		path, self.node = writeLadder(self.dir, nsections, "RLC")
+		self.compiled = compiledNetlist( netlistParser.parse(path) )
+
+		self.model = krylovReduction(self.compiled, [1, self.node], order = 10)
+		self.freq = np.logspace(8, 10.5, 401)
+
+	def teardown(self, nsections):
+		shutil.rmtree(self.dir)
+
+	def time_reduction(self, nsections):
+		krylovReduction(self.compiled, [1, self.node], order = 10)
+
+	def time_reducedSweep(self, nsections):
+		self.model.Sparameters(self.freq)
@@ -0,0 +1,208 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> benchmarks/bench_sweep.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import tempfile
+import shutil
+import os
+import numpy as np
+
+from minispice.freqAnalysis import freqAnalysis
+from minispice.resultCache import resultCache
+from minispice.compiledNetlist import compiledNetlist
+from minispice.nodeMatrix import nodeMatrix, portReduction
+from minispice import netlistParser
+
+from ladder import writeLadder
+
+# Check that a netlist loaded from the parse cache matches a fresh parse and
+# that the cache stays within maxsize
+def checkNetlistCache(path, cache):
+
+	netlistParser.parse(path, cache = cache)
+	_netlist, _cached = netlistParser.parse(path), netlistParser.parse(path, cache = cache)
+
+	if list( _cached.components.items() ) != list( _netlist.components.items() ) or _cached.sources != _netlist.sources:
+		raise ValueError("Cached netlist differs from parsed netlist (%s)"%path)
+
+	netlistParser.clear(cache)
+	netlistParser.parse(path, cache = cache, maxsize = 1)
+
+	if netlistParser.entries(cache):
+		raise ValueError("Netlist cache exceeds maxsize")
+
+# Check that cached results match a fresh sweep and that results larger than
+# maxsize are skipped instead of evicting the whole cache
+def checkResultCache(path, freq, directory):
+
+	_cache = resultCache(directory)
+	freqAnalysis.fromFile(path, freq, result_cache = _cache)
+
+	_cached, _analysis = freqAnalysis.fromFile(path, freq, result_cache = _cache), freqAnalysis.fromFile(path, freq)
+
+	if _cache.hits != 1 or not np.array_equal(_cached.ytensor, _analysis.ytensor):
+		raise ValueError("Cached results differ from sweep (%s)"%path)
+
+	_small = resultCache(directory, maxsize = _analysis.ytensor.nbytes // 2)
+	freqAnalysis.fromFile(path, 2 * freq, result_cache = _small)
+
+	if _small.stats()["skipped"] != 1 or _small.stats()["entries"] != 1:
+		raise ValueError("Result larger than maxsize was stored (%s)"%_small.stats())
+
+# Frequency sweep assembly on scaled up ladder netlists
+class FreqSweep:
+
+	params = [10, 100, 400]
+	param_names = ["nsections"]
+
+	def setup(self, nsections):
+
+		self.tmp = tempfile.mkdtemp()
+		self.path, self.node = writeLadder(self.tmp, nsections, "LC")
+
+		self.freq = np.linspace(1e6, 1e10, 200)
+		self.netlist = netlistParser.parse(self.path)
+		self.compiled = compiledNetlist(self.netlist)
+
+		# Parse cache warmed with this netlist
+		self.cache = os.path.join(self.tmp, "netlists")
+		checkNetlistCache(self.path, self.cache)
+		netlistParser.parse(self.path, cache = self.cache)
+
+		# Result cache warmed with this sweep
+		self.results = resultCache( os.path.join(self.tmp, "results") )
+		checkResultCache(self.path, self.freq, self.results.path)
+
+	def teardown(self, nsections):
+		shutil.rmtree(self.tmp, ignore_errors = True)
+
+	def time_parse(self, nsections):
+		netlistParser.parse(self.path)
+
+	def time_cachedParse(self, nsections):
+		netlistParser.parse(self.path, cache = self.cache)
+
+	def time_fromFile(self, nsections):
+		freqAnalysis.fromFile(self.path, self.freq)
+
+	def time_cachedFromFile(self, nsections):
+		freqAnalysis.fromFile(self.path, self.freq, result_cache = self.results)
+
+	def time_tensor(self, nsections):
+		self.compiled.tensor(self.freq)
+
+	# Element by element stamping of one matrix (per frequency cost)
+	def time_addPassive(self, nsections):
+
+		ymatrix = nodeMatrix(self.netlist.size, self.freq[0])
+
+		for _name, _component in self.netlist.components.items():
+			ymatrix.addPassive(_name, _component["nodes"][0], _component["nodes"][1], _component["value"])
+
+# Cascode amplifier cell of the cascodeAmp example as a subcircuit. Stages
+# are chained through coupling capacitors and the last one is terminated.
+CELL = """.subckt amp 1 6
+R3	1	0	8.00E+03
+RE	5	0	3.30E+03
+CE	5	0	1.00E-05
+R2	1	3	4.00E+03
+CB	3	0	1.00E-05
+R1	3	0	1.80E+04
+RC	6	0	6.00E+03
+Q1	1	4	5	hybridpix
+Q2	3	6	4	hybridpix
+.ends
+"""
+
+MODEL = "gm 0.125\nrce 1e5\nrbe 800\ncbe 13.9e-12\ncbc 2e-12\nrbb 50\n"
+
+# Write a chain of nstages amplifier cells with the hybridpix model file.
+# Returns (path, output node)
+def writeChain(directory, nstages):
+
+	lines = [ CELL ]
+
+	for i in range(nstages):
+		lines.append( "C%d	%d	%d	1.00E-06"%(i, 2 * i + 1, 2 * i + 2) )
+		lines.append( "X%d	%d	%d	amp"%(i, 2 * i + 2, 2 * i + 3) )
+
+	lines.append( "RL	%d	0	50"%(2 * nstages + 1) )
+
+	with open( os.path.join(directory, "hybridpix.model"), "w" ) as f:
+		f.write(MODEL)
+
+	path = os.path.join(directory, "chain_%d.cir"%nstages)
+
+	with open(path, "w") as f:
+		f.write( "\n".join(lines) + "\n" )
+
+	return path, 2 * nstages + 1
+
+# Check that a model parameter set on the compiled netlist reaches reduced
+# subcircuits and discards their cached port blocks
+def checkReducedSet(netlist, freq, path, ports):
+
+	reduced = compiledNetlist(netlist, path, reduce = True, cachesize = len(freq))
+	flat = compiledNetlist(netlist, path)
+
+	reduced.tensor(freq)
+
+	for _compiled in (reduced, flat):
+		_compiled.set("hybridpix.gm", 0.3)
+
+	Y, _Y = portReduction( reduced.tensor(freq), ports ), portReduction( flat.tensor(freq), ports )
+	error = np.max( np.abs(Y - _Y) ) / np.max( np.abs(_Y) )
+
+	if error > 1e-9 or len(reduced.cache) > len(freq):
+		raise ValueError("Reduced subcircuits out of date after set (error %g, %d cached blocks)"%(error, len(reduced.cache)))
+
+# Sweeps of chained amplifier cells stamped as reduced port blocks. The
+# first sweep fills the block cache, a model parameter change clears it.
+class ReducedSweep:
+
+	params = [10, 100]
+	param_names = ["nstages"]
+
+	def setup(self, nstages):
+
+		self.tmp = tempfile.mkdtemp()
+		path, node = writeChain(self.tmp, nstages)
+
+		self.freq = np.logspace(3, 9, 200)
+		netlist = netlistParser.parse(path)
+
+		checkReducedSet(netlist, self.freq, self.tmp, [1, node])
+		self.compiled = compiledNetlist(netlist, self.tmp, reduce = True)
+
+	def teardown(self, nstages):
+		shutil.rmtree(self.tmp, ignore_errors = True)
+
+	def time_cachedTensor(self, nstages):
+		self.compiled.tensor(self.freq)
+
+	def time_setTensor(self, nstages):
+		self.compiled.set("hybridpix.gm", 0.125)
+		self.compiled.tensor(self.freq)
@@ -0,0 +1,67 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> benchmarks/bench_touchstone.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+
+#!/usr/bin/env python
+import numpy as np
+import os
+import shutil
+import tempfile
+
+from minispice.touchstone import writeTouchstone, readTouchstone
+
+# Touchstone writer and reader on N-port data. Setup checks the round trip
+# for every port count and version, including v1 files with more than 4 
+# ports where each matrix row wraps over several lines.
+class Touchstone:
+
+	params = ([2, 3, 5], [1, 2])
+	param_names = ["nports", "version"]
+
+	def setup(self, nports, version):
+
+		rng = np.random.default_rng(0)
+
+		self.freq = np.linspace(1e9, 10e9, 2001)
+		self.data = rng.standard_normal( (len(self.freq), nports, nports) ) + 1j * rng.standard_normal( (len(self.freq), nports, nports) )
+
+		self.dir = tempfile.mkdtemp()
+		self.path = os.path.join(self.dir, "bench.s%dp"%nports)
+
+		writeTouchstone(self.path, self.freq, self.data, version = version)
+		freq, data, info = readTouchstone(self.path)
+
+		if not ( np.allclose(freq, self.freq) and np.allclose(data, self.data, rtol = 1e-10) and info["nports"] == nports ):
+			raise ValueError("Touchstone round trip failed (%d ports, v%d)"%(nports, version))
+
+	def teardown(self, nports, version):
+		shutil.rmtree(self.dir)
+
+	def time_write(self, nports, version):
+		writeTouchstone(self.path, self.freq, self.data, version = version)
+
+	def time_read(self, nports, version):
+		readTouchstone(self.path)
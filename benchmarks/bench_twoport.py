@@ -0,0 +1,79 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> benchmarks/bench_twoport.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+
+from minispice.compiledNetlist import compiledNetlist
+from minispice.nodeMatrix import nodeMatrix, portReduction, pairwiseTwoports, voltageGains
+from minispice import netlistParser
+
+from ladder import ladder
+
+# Twoport reduction: cofactor based toTwoport per frequency against the
+# batched Schur complement over the whole sweep
+class Twoport:
+
+	params = [10, 50]
+	param_names = ["nsections"]
+
+	def setup(self, nsections):
+
+		text, self.node = ladder(nsections, "RLC")
+		compiled = compiledNetlist( netlistParser.parseString(text) )
+
+		freq = np.linspace(1e6, 1e10, 100)
+		self.ytensor = compiled.tensor(freq)
+		self.matrices = [ nodeMatrix(compiled.size, f, y) for f, y in zip(freq, self.ytensor) ]
+		self.ports = [1, self.node // 3, 2 * self.node // 3, self.node]
+
+	def time_toTwoport(self, nsections):
+
+		for _matrix in self.matrices:
+			_matrix.toTwoport(1, self.node)
+
+	def time_portReduction(self, nsections):
+		portReduction(self.ytensor, [1, self.node])
+
+	def time_voltageGain(self, nsections):
+
+		for _matrix in self.matrices:
+			_matrix.voltageGain(1, self.node)
+
+	# Gain to every node with one factorization per frequency
+	def time_voltageGains(self, nsections):
+		voltageGains(self.ytensor, 1)
+
+	# Every pairwise twoport of four ports: one N-port reduction against one
+	# reduction per pair
+	def time_pairwiseTwoports(self, nsections):
+		pairwiseTwoports( portReduction(self.ytensor, self.ports) )
+
+	def time_pairwiseReduction(self, nsections):
+
+		for i in range(len(self.ports)):
+			for j in range(i + 1, len(self.ports)):
+				portReduction(self.ytensor, [self.ports[i], self.ports[j]])
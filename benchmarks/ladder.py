@@ -0,0 +1,82 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> benchmarks/ladder.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import os
+
+# Synthetic ladder netlists of configurable size. Each section is a series
+# element followed by a shunt element, in the style of chebyshev4.cir:
+#
+#	LC 		series L, shunt C (lossless filter)
+#	RC 		series R, shunt C (distributed RC line)
+#	RLC 	series R + L, shunt C (lossy transmission line)
+#
+# Source and load resistors are added when terminated is True. Node 1 is
+# the input and the last node is the output.
+def ladder(nsections, kind = "LC", terminated = True, L = 1e-9, C = 0.4e-12, R = 0.5):
+
+	lines = [ "* %s ladder with %d sections"%(kind, nsections) ]
+	node = 1
+
+	if terminated:
+		lines.append( "RS	1	2	50" )
+		node = 2
+
+	for i in range(nsections):
+
+		if kind == "LC":
+			lines.append( "L%d	%d	%d	%g"%(i, node, node + 1, L) )
+			node += 1
+
+		elif kind == "RC":
+			lines.append( "R%d	%d	%d	%g"%(i, node, node + 1, R) )
+			node += 1
+
+		elif kind == "RLC":
+			lines.append( "R%d	%d	%d	%g"%(i, node, node + 1, R) )
+			lines.append( "L%d	%d	%d	%g"%(i, node + 1, node + 2, L) )
+			node += 2
+
+		else:
+			raise ValueError("Unknown ladder kind (%s)"%kind)
+
+		lines.append( "C%d	%d	0	%g"%(i, node, C) )
+
+	if terminated:
+		lines.append( "RL	%d	0	50"%node )
+
+	return "\n".join(lines) + "\n", node
+
+# Write a ladder netlist to directory. Returns (path, output node)
+def writeLadder(directory, nsections, kind = "LC", **kwargs):
+
+	text, node = ladder(nsections, kind, **kwargs)
+	path = os.path.join(directory, "ladder_%s_%d.cir"%(kind, nsections))
+
+	with open(path, "w") as f:
+		f.write(text)
+
+	return path, node
@@ -0,0 +1,217 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> benchmarks/run.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import collections
+import subprocess
+import itertools
+import importlib
+import argparse
+import platform
+import fnmatch
+import timeit
+import json
+import time
+import sys
+import os
+
+import numpy as np
+
+# Benchmarks are asv style classes in bench_*.py with optional params,
+# param_names, setup and teardown and timed time_* methods. This runner 
+# times them without asv and appends the results to a JSON history so 
+# regressions are visible between commits.
+DIRECTORY = os.path.dirname( os.path.abspath(__file__) )
+HISTORY = os.path.join(DIRECTORY, "results", "history.json")
+
+# Slowdown relative to the previous run that is reported as a regression
+THRESHOLD = 1.2
+
+# Benchmark classes of all bench_*.py modules
+def discover():
+
+	sys.path.insert(0, DIRECTORY)
+	sys.path.insert(0, os.path.dirname(DIRECTORY))
+
+	classes = []
+
+	for _file in sorted( os.listdir(DIRECTORY) ):
+
+		if _file.startswith("bench_") and _file.endswith(".py"):
+
+			_module = importlib.import_module( _file[:-3] )
+
+			for _name in dir(_module):
+
+				_class = getattr(_module, _name)
+
+				if isinstance(_class, type) and _class.__module__ == _module.__name__:
+					classes.append( (_file[:-3], _class) )
+
+	return classes
+
+# Parameter combinations of a benchmark class
+def combinations(_class):
+
+	params = getattr(_class, "params", None)
+
+	if params is None:
+		return [ () ]
+
+	# A flat list is a single parameter
+	if not isinstance(params[0], (list, tuple)):
+		params = [params]
+
+	return list( itertools.product(*params) )
+
+# Best time per call (seconds) of fn over repeat runs. The number of calls per
+# run is chosen so that a run takes at least mintime.
+def measure(fn, repeat, mintime):
+
+	timer = timeit.Timer(fn)
+	number, _time = 1, 0.0
+
+	while True:
+
+		_time = timer.timeit(number)
+
+		if _time >= mintime or number >= 1e6:
+			break
+
+		number *= 10 if _time < mintime / 10 else 2
+
+	return min( [ _time ] + timer.repeat(repeat - 1, number) ) / number
+
+# Run all benchmarks matching pattern. Returns ordered dict of name to seconds
+def run(pattern = "*", repeat = 5, mintime = 0.1):
+
+	results = collections.OrderedDict()
+
+	for _module, _class in discover():
+
+		methods = [ _m for _m in sorted( dir(_class) ) if _m.startswith("time_") ]
+
+		for _params in combinations(_class):
+
+			_names = [ "%s.%s.%s(%s)"%( _module, _class.__name__, _m, ", ".join( str(_p) for _p in _params ) ) for _m in methods ]
+
+			if not any( fnmatch.fnmatch(_name, pattern) for _name in _names ):
+				continue
+
+			_bench = _class()
+
+			if hasattr(_bench, "setup"):
+				_bench.setup(*_params)
+
+			try:
+				for _method, _name in zip(methods, _names):
+
+					if not fnmatch.fnmatch(_name, pattern):
+						continue
+
+					_fn = getattr(_bench, _method)
+					results[_name] = measure( lambda: _fn(*_params), repeat, mintime )
+
+					print( "%-70s %12.6f ms"%(_name, 1e3 * results[_name]) )
+					sys.stdout.flush()
+
+			finally:
+				if hasattr(_bench, "teardown"):
+					_bench.teardown(*_params)
+
+	return results
+
+# Current commit of the repository (None outside git)
+def commit():
+
+	try:
+		return subprocess.check_output( ["git", "rev-parse", "--short", "HEAD"], cwd = DIRECTORY, stderr = subprocess.DEVNULL ).decode().strip()
+
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+# Load and store the result history
+def load(path):
+
+	if not os.path.isfile(path):
+		return []
+
+	with open(path, "r") as f:
+		return json.load(f)
+
+def save(path, history):
+
+	if not os.path.isdir( os.path.dirname(path) ):
+		os.makedirs( os.path.dirname(path) )
+
+	with open(path, "w") as f:
+		json.dump(history, f, indent = 1)
+
+# Compare results with a previous run. Returns list of regressions
+def compare(results, previous, threshold = THRESHOLD):
+
+	regressions = []
+
+	for _name, _time in results.items():
+
+		if _name in previous and _time > threshold * previous[_name]:
+			regressions.append( (_name, previous[_name], _time) )
+
+	return regressions
+
+if __name__ == "__main__":
+
+	parser = argparse.ArgumentParser(description = "Run the minispice benchmarks")
+	parser.add_argument("-k", dest = "pattern", default = "*", help = "fnmatch pattern of benchmark names")
+	parser.add_argument("--repeat", type = int, default = 5, help = "timing runs per benchmark")
+	parser.add_argument("--mintime", type = float, default = 0.1, help = "minimum duration of one timing run (s)")
+	parser.add_argument("--history", default = HISTORY, help = "JSON history file")
+	parser.add_argument("--no-save", action = "store_true", help = "do not append results to the history")
+	parser.add_argument("--fail", action = "store_true", help = "exit with an error on regressions")
+	args = parser.parse_args()
+
+	results = run(args.pattern, args.repeat, args.mintime)
+	history = load(args.history)
+
+	regressions = compare(results, history[-1]["results"] if history else {})
+
+	for _name, _before, _after in regressions:
+		print( "REGRESSION %s: %.6f ms -> %.6f ms (x%.2f)"%(_name, 1e3 * _before, 1e3 * _after, _after / _before) )
+
+	if not args.no_save:
+
+		history.append({
+			"time"	  : time.strftime("%Y-%m-%dT%H:%M:%S"),
+			"commit"  : commit(),
+			"python"  : platform.python_version(),
+			"numpy"	  : np.__version__,
+			"machine" : platform.machine(),
+			"results" : results,
+		})
+
+		save(args.history, history)
+
+	sys.exit( 1 if regressions and args.fail else 0 )
@@ -0,0 +1,101 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> benchmarks/startup.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import subprocess
+import argparse
+import sys
+import os
+
+# Import time budgets (ms) for the solver modules, excluding numpy itself
+BUDGETS = {
+	"minispice.freqAnalysis" 				: 100.0,
+	"minispice.nodeMatrix" 					: 20.0,
+	"minispice.amplAnalysis" 				: 20.0,
+	"minispice.nonlinear.componentModels" 	: 20.0,
+	"minispice.nonlinear.companionModels" 	: 20.0,
+	"minispice.discreteFourierTransform" 	: 20.0,
+	"minispice.krylovReduction" 			: 100.0,
+	"minispice.poleZero" 					: 100.0,
+	"minispice.cli" 						: 100.0,
+}
+
+# Packages that must not be loaded by importing a solver module
+FORBIDDEN = ["matplotlib", "scipy", "PyQt5"]
+
+# Import a module in a fresh interpreter with -X importtime. Returns the
+# cumulative import time per module (ms) and the list of loaded packages
+def importtime(module):
+
+	code = "import sys, %s; print(' '.join( sorted( set( m.split('.')[0] for m in sys.modules ) ) ))"%module
+
+	env = dict(os.environ, PYTHONPATH = os.pathsep.join( [ os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) ), os.environ.get("PYTHONPATH", "") ] ))
+	proc = subprocess.run( [sys.executable, "-X", "importtime", "-c", code], stdout = subprocess.PIPE, stderr = subprocess.PIPE, env = env, universal_newlines = True )
+
+	if proc.returncode != 0:
+		raise RuntimeError(proc.stderr)
+
+	times = {}
+
+	# Lines are "import time: self [us] | cumulative | package"
+	for line in proc.stderr.splitlines():
+
+		if not line.startswith("import time:") or "cumulative" in line:
+			continue
+
+		_self, _cumulative, _name = line[len("import time:"):].split("|")
+		times[ _name.strip() ] = int(_cumulative) / 1000.0
+
+	return times, proc.stdout.split()
+
+# Check every module against its budget. Returns True if all pass
+def run(budgets, scale = 1.0):
+
+	passed = True
+
+	for _module, _budget in budgets.items():
+
+		times, loaded = importtime(_module)
+
+		# Time attributable to minispice (numpy is loaded by any user)
+		_time = times.get(_module, 0.0) - times.get("numpy", 0.0)
+		_forbidden = [ _p for _p in FORBIDDEN if _p in loaded ]
+
+		_ok = _time <= _budget * scale and not _forbidden
+		passed = passed and _ok
+
+		print( "%-40s %8.1f ms (budget %6.1f ms) %s%s"%(
+			_module, _time, _budget * scale, "ok" if _ok else "FAIL", " loads %s"%", ".join(_forbidden) if _forbidden else "" ) )
+
+	return passed
+
+if __name__ == "__main__":
+
+	parser = argparse.ArgumentParser(description = "Import time budgets of the minispice solver modules")
+	parser.add_argument("--scale", type = float, default = 1.0, help = "multiply all budgets (slow machines)")
+	args = parser.parse_args()
+
+	sys.exit( 0 if run(BUDGETS, args.scale) else 1 )
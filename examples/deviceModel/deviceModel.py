@@ -56,19 +56,8 @@ class deviceModel:
          # Array to hold the grid
         self.VGS, self.VDS = np.meshgrid( self.Vgs, self.Vds )
 
-        # Arrays to hold current
-        self.IDS = np.zeros( (self.size, self.size) )
-        
-        # Loop through voltages
-        for i, _vds in enumerate(self.Vds): 
-        
-            for j, _vgs in enumerate(self.Vgs): 
-            
-                # Model looks takes gate drain and gate source voltage
-                _vgd = (_vgs -_vds)
-                
-                # Calculate current
-                self.IDS[i][j] = self.device.f( _vgd , _vgs ) 
+        # Evaluate current over the grid in one broadcasted call 
+        self.IDS = self.device.surface( self.Vgs, self.Vds, derivatives=False )["IDS"]
 
     # Show model data
     def show(self):
@@ -26,7 +26,9 @@
 
 from minispice.nonlinear import companionModels
 from minispice.nonlinear import componentModels
+from minispice.nonlinear.solverResult import solverResult
 from minispice.Converter import *
+from minispice import instrument
 
 # Signal tools for pulse
 from minispice.signalTools import signalTools
@@ -47,35 +49,56 @@ class diode_bias_point:
 		# Initialize companion models
 		self.diodeR = companionModels.nonlinearR( self.diode )
 
-	def solve(self, source_impedance, conv = 0.0):
+	# Newton iterations of all bias points are recorded in self.result (see 
+	# solverResult). Each point is limited to maxiter iterations. The result 
+	# is truncated if a point fails to converge or a callback aborts.
+	def solve(self, source_impedance, conv = 0.0, maxiter = 100, callbacks = None):
 		
 		diode_waveform = []
 
+		npoints = len(self.signal['waveform'])
+		self.result = solverResult(maxiter * npoints, callbacks, name = "bias", capacity = 4 * npoints)
+
 		# Initilize solver
 		vm = self.signal['waveform'][0]
 
 		# Perform iteration over companion model
-		for source_voltage in self.signal['waveform']:
+		for point, source_voltage in enumerate(self.signal['waveform']):
 
 			# Perform iteration over companion model for nonlinear resistor
-			while True:
+			for _ in range(maxiter):
 
 				num = self.diodeR.im(vm) + nortonI(source_voltage, source_impedance) 
 				den = self.diodeR.gm(vm) + nortonG(source_impedance)
 
 				_vm = num / den
 
+				# Current residual at vm and Newton step
+				_continue = self.result.record( np.abs( den * vm - num ), np.abs( _vm - vm ), 1.0 )
 
 				if np.abs( _vm - vm ) <= conv:  
 
+					instrument.count("bias.points")
 					diode_waveform.append(_vm)
 
 					break 
 
+				elif not _continue:
+
+					return diode_waveform
+
 				else: 
 
 					vm = _vm
 
+			else:
+
+				self.result.finish("maxiter", "no convergence at bias point %d"%point)
+
+				return diode_waveform
+
+		self.result.finish("converged")
+
 		# Return solution waveform
 		return diode_waveform
 
@@ -110,10 +133,10 @@ if __name__ == "__main__":
 	ax1.set_title("Diode Resistor Circuit : Bias Point")
 
 	# Create some test resistances(1 Ohm to 1024 Ohm)
-	source_impedacnce = [ 2.0**_power for _power in range(11) ]
+	source_impedances = [ 2.0**_power for _power in range(11) ]
 
 	# Loop through all source impeances
-	for _ in source_impedacnce:
+	for _ in source_impedances:
 		
 		diode_waveform = analysis.solve(source_impedance = _, conv = 1e-15 )
 		
@@ -26,7 +26,9 @@
 
 from minispice.nonlinear import companionModels
 from minispice.nonlinear import componentModels
+from minispice.nonlinear.solverResult import solverResult
 from minispice.Converter import *
+from minispice import instrument
 
 # Signal tools for pulse
 from minispice.signalTools import signalTools
@@ -48,38 +50,60 @@ class diode_transient:
 		self.diodeR = companionModels.nonlinearR( self.diode )
 		self.diodeC = companionModels.nonlinearC( self.diode )
 	
-	def solve(self, source_impedacnce, conv = 1e-6):
+	# Newton iterations of all time steps are recorded in self.result (see 
+	# solverResult). Each time step is limited to maxiter iterations. The 
+	# waveform is truncated if a step fails to converge or a callback aborts.
+	def solve(self, source_impedance, conv = 1e-6, maxiter = 100, callbacks = None):
 
 		diode_waveform = []
 
+		npoints = len(self.signal['waveform'])
+		self.result = solverResult(maxiter * npoints, callbacks, name = "transient", capacity = 4 * npoints)
+
 		# Initilize transient solver with first signal value
 		vm = self.signal['waveform'][0]
 
 		# Perform iteration over companion model
-		for source_voltage in self.signal['waveform']:
+		for step, source_voltage in enumerate(self.signal['waveform']):
 
 			# vn is determined by final step of previous iteration (Eq 8.20)
 			# if n = 0 then vn is determined by the start value.
 			vn = diode_waveform[-1] if len(diode_waveform) > 1 else vm
 
 			# Perform Newton iteration at each timestep to solve diode voltage
-			while True:
+			for _ in range(maxiter):
 			
-				num = ( self.diodeR.im(vm) + self.diodeC.im(vm, vn, self.signal['delta']) + nortonI( source_voltage, source_impedacnce ) ) 
-				den = ( self.diodeR.gm(vm) + self.diodeC.gm(vm, vn, self.signal['delta']) + nortonG( source_impedacnce ) )
+				num = ( self.diodeR.im(vm) + self.diodeC.im(vm, vn, self.signal['delta']) + nortonI( source_voltage, source_impedance ) ) 
+				den = ( self.diodeR.gm(vm) + self.diodeC.gm(vm, vn, self.signal['delta']) + nortonG( source_impedance ) )
 
 				_vm = num / den
 
+				# Current residual at vm and Newton step
+				_continue = self.result.record( np.abs( den * vm - num ), np.abs( _vm - vm ), 1.0 )
+
 				if np.abs( _vm - vm ) <= conv:  
 
+					instrument.count("transient.steps")
 					diode_waveform.append(_vm)
 
 					break 
 
+				elif not _continue:
+
+					return diode_waveform
+
 				else: 
 
 					vm = _vm
 
+			else:
+
+				self.result.finish("maxiter", "no convergence at time step %d"%step)
+
+				return diode_waveform
+
+		self.result.finish("converged")
+
 		# Return solution waveform
 		return diode_waveform
 
@@ -103,7 +127,7 @@ if __name__ == "__main__":
 	analysis = diode_transient( signal )
 	
 	# Create some test resistances(1 Ohm to 1024 Ohm)
-	source_impedacnce = [ 2.0**_power for _power in range(11) ]
+	source_impedances = [ 2.0**_power for _power in range(11) ]
 
 	# Create axes object	
 	fig = plt.figure()
@@ -113,9 +137,9 @@ if __name__ == "__main__":
 	ax0.set_title("Diode Resistor Circuit : Transient Response")
 
 	# Loop through all source impeances
-	for _ in source_impedacnce:
+	for _ in source_impedances:
 
-		diode_waveform = analysis.solve(source_impedacnce = _, conv = 1e-9 )
+		diode_waveform = analysis.solve(source_impedance = _, conv = 1e-9 )
 
 		h0, = ax0.plot(signal['time'], diode_waveform, color="tab:orange")
 
@@ -31,7 +31,9 @@ import numpy as np
 
 # Import diode models
 from minispice.nonlinear import componentModels
+from minispice.nonlinear.solverResult import solverResult
 from minispice.Converter import *
+from minispice import instrument
 
 # Import DFT class
 import minispice.discreteFourierTransform as DFT
@@ -53,6 +55,7 @@ class harmonicBalance:
 		self.epsilon = config["epsilon"]
 		self.maxiter = config["maxiter"]
 		self.converge = config["converge"]
+		self.verbose = config.get("verbose", False)
 
 		# Calculate transform matrices
 		self.Transform = DFT.Transform(self.freq, self.order)
@@ -77,8 +80,9 @@ class harmonicBalance:
 		
 		return DFT.Dual( _signal, self.Transform, domain="freq")
 
-	# Harmonic balance solver
-	def solve( self, source_impedance ):	
+	# Harmonic balance solver. The iteration history is kept in self.result 
+	# (see solverResult). Abort callbacks may stop diverging runs early.
+	def solve( self, source_impedance, callbacks = None ):	
 
 		# Linear admittance matrices
 		Y11 = self.Transform.zeros()
@@ -106,12 +110,17 @@ class harmonicBalance:
 
 		# Convergence comparison
 		self.step = 0
+		self.result = solverResult(self.maxiter, callbacks, name = "hb")
+
+		# Size of the update that produced the current iterate
+		_step, _damping = np.nan, np.nan
 
 		# Iteration loop
 		while True:
 			
 			# 1) Calculate the nonlinear signal (time domain)			
-			_Fv = [ self.nonlinear.f(v) for v in self.signal.time ]
+			with instrument.phase("hb.nonlinear"):
+				_Fv = [ self.nonlinear.f(v) for v in self.signal.time ]
 
 			Fv = DFT.Dual(_Fv, self.Transform, "time")
 
@@ -123,54 +132,65 @@ class harmonicBalance:
 			# Calculate convergence criteria 
 			delta = ( sum( np.abs(ef.time.real) ) / self.order )
 
+			_continue = self.result.record(delta, _step, _damping)
+
 			# Print convergence condition
-			if ( self.step % 20 ) == 0:
+			if self.verbose and ( self.step % 20 ) == 0:
 	
 				print("Conv: %s"%delta)
 
-			# Stop on max_iterations
-			if ( self.step ) > self.maxiter:
+			# If convergence criteria is met stop iteration
+			if ( delta ) < self.converge:
 
-				print( "Maximum number of iterations %s", self.step)
+				self.result.finish("converged")
 
-				return self.source, self.signal				
+				return self.source, self.signal
 
-			# If convergence criteria is met stop iteration
-			if ( delta ) < self.converge:
+			# Stop on max_iterations or abort
+			if not _continue:
+
+				if self.verbose:
+					print( "Stopped after %s iterations: %s"%(self.step, self.result.message) )
 
 				return self.source, self.signal
 
 			# Otherwise calculate the Jacobian and iterate 
 			else:   
 
-				# Conductance and capacitance terms
-				dG = self.Transform.zeros()
-				dC = self.Transform.zeros()
+				with instrument.phase("hb.jacobian"):
+
+					# Conductance and capacitance terms
+					dG = self.Transform.zeros()
+					dC = self.Transform.zeros()
 
-				for i in range( self.order ):
+					for i in range( self.order ):
 
-					for j in range( self.order ):
+						for j in range( self.order ):
 
-						# Resistive term in Jacobian (time domain)
-						dG[i][j] = complex( self.nonlinear.df( self.signal.time[i] ) ) if i == j else complex(0.0)
+							# Resistive term in Jacobian (time domain)
+							dG[i][j] = complex( self.nonlinear.df( self.signal.time[i] ) ) if i == j else complex(0.0)
 
-						# Capacitive term in Jacobian (time domain)
-						dC[i][j] = complex( self.nonlinear.c( self.signal.time[i] ) ) if i == j else complex(0.0)
+							# Capacitive term in Jacobian (time domain)
+							dC[i][j] = complex( self.nonlinear.c( self.signal.time[i] ) ) if i == j else complex(0.0)
 
 
-				# Jacobian: Resistive subterm
-				JR = np.dot( self.Transform.get_dft(), np.dot(dG, self.Transform.get_idft()) ) # [F][G][F^-1]
+					# Jacobian: Resistive subterm
+					JR = np.dot( self.Transform.get_dft(), np.dot(dG, self.Transform.get_idft()) ) # [F][G][F^-1]
 
-				# Jacobian: Capacitive subterm
-				JC = np.dot( self.Transform.get_dft(), np.dot(dC, self.Transform.get_idft()) ) # [F][C][F^-1]
+					# Jacobian: Capacitive subterm
+					JC = np.dot( self.Transform.get_dft(), np.dot(dC, self.Transform.get_idft()) ) # [F][C][F^-1]
 
-				# Jacobian: Total
-				J = Y11 + JR + np.dot(iOMEGA, JC)
+					# Jacobian: Total
+					J = Y11 + JR + np.dot(iOMEGA, JC)
+
+				instrument.matrix("hb.jacobian", J)
 
 				# Invert this matrix and multiply it by the error vector
 				# to obtain change in voltage (frequency domain).
 				_dV = np.dot( la.inv(J), ef.freq )
 
+				_step, _damping = self.epsilon * la.norm(_dV), self.epsilon
+
 				## Add to original vector V and calculate its dual.
 				self.signal = DFT.Dual(self.signal.freq - self.epsilon * _dV, self.Transform, "freq")
 			
@@ -187,7 +207,8 @@ if __name__ == "__main__":
 		"order"		: 64,
 		"epsilon"	: 0.001,
 		"converge"	: 1e-9,
-		"maxiter"	: 8192
+		"maxiter"	: 8192,
+		"verbose"	: True
 	}
 
 	# Run the simulation
@@ -195,6 +216,8 @@ if __name__ == "__main__":
 
 	Vsource, Vsignal = HB.solve(source_impedance = 10.0)
 
+	print(HB.result)
+
 	# Figure 1: Waveform
 	fig = plt.figure(1)
 	ax0 = plt.subplot(111)
@@ -30,7 +30,7 @@ import numpy as np
 # Import module
 from minispice.freqAnalysis import freqAnalysis
 from minispice.plotAnalysis import plotAnalysis
-from minispice.amplAnalysis import amplAnalysis
+from minispice.amplAnalysis import amplAnalysis, unitDisk
 from minispice.Converter import *
 
 # We would like to match our intrinsic transistor at 10GHz for maximum gain. 
@@ -89,6 +89,15 @@ print("\nConjugate Match (Admittance)")
 print("\tYs = %s"%(gammatoy(GammaS,1)) )
 print("\tYl = %s"%(gammatoy(GammaL,1)) )
 
+# Alternatively search the whole (GammaS, GammaL) design space at once 
+# for the stable pair with the highest transducer gain
+best = active.designSpace( unitDisk(36) ).optimum()
+
+print("\nDesign Space Optimum (Stable Terminations)")
+print("\t|GammaL| = %f : <GammaL = %f"%phasor(best["gammaL"], "deg") )
+print("\t|GammaS| = %f : <GammaS = %f"%phasor(best["gammaS"], "deg") )
+print("\tGT = %f dB"%best["GT_dB"] )
+
 # stdout buffer
 print("\n")
 
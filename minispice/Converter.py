@@ -206,6 +206,34 @@ def ytos(y, z0 = 50.):
     else: 
         return None
  
+# S-parameters for N-ports. Accepts stacks of matrices (..., N, N)
+def ytosN(y, z0 = 50.):
+    y = np.asarray(y, dtype='complex')
+    I = np.eye(y.shape[-1])
+    return np.linalg.solve(I + z0*y, I - z0*y)
+
+def stoyN(s, z0 = 50.):
+    s = np.asarray(s, dtype='complex')
+    I = np.eye(s.shape[-1])
+    return np.linalg.solve(I + s, I - s) / z0
+
+def ztosN(z, z0 = 50.):
+    z = np.asarray(z, dtype='complex')
+    I = np.eye(z.shape[-1])
+    return np.linalg.solve(z + z0*I, z - z0*I)
+
+def stozN(s, z0 = 50.):
+    s = np.asarray(s, dtype='complex')
+    I = np.eye(s.shape[-1])
+    return z0 * np.linalg.solve(I - s, I + s)
+
+# Z and Y for N-ports. Accepts stacks of matrices (..., N, N)
+def ytozN(y):
+    return np.linalg.inv( np.asarray(y, dtype='complex') )
+
+def ztoyN(z):
+    return np.linalg.inv( np.asarray(z, dtype='complex') )
+
 def stoz(s, z0 = 50.):
     if dataCheck(s): 
 
@@ -0,0 +1,2 @@
+# Library version. Part of the key of cached results
+__version__ = "1.1dev0"
@@ -0,0 +1,6 @@
+# Run the command line interface as python -m minispice
+import sys
+
+from .cli import main
+
+sys.exit( main() )
@@ -0,0 +1,118 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> adaptiveSweep.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+
+from .nodeMatrix import portReduction
+from .Converter import ytosN
+
+# Default S-parameter response of the twoport between n1 and n2. Returns an
+# array of shape (nfreq, 4)
+def twoportResponse(n1, n2, z0 = 50.):
+
+	def response(ytensor):
+		return ytosN( portReduction(ytensor, [n1, n2]), z0 ).reshape( len(ytensor), -1 )
+
+	return response
+
+# Adaptive frequency sampling between fmin and fmax. Starts from a coarse grid
+# of npoints and repeatedly bisects intervals where the response at the
+# midpoint differs from linear interpolation of the endpoints by more than
+# tol (relative to max(1, |response|)). All midpoints of one pass are solved
+# in a single batched assembly. Intervals are bisected in log(f) if scale is
+# "log". Refinement stops when all intervals pass, intervals are narrower
+# than resolution (fraction of the span) or maxpoints is reached.
+#
+# Response is a function of admittance tensors (nfreq, size, size) returning
+# (nfreq, ...) and defaults to the S-parameters between n1 and n2. Returns
+# the sorted non-uniform frequencies and their admittance tensor.
+def adaptiveSweep(compiled, fmin, fmax, n1 = None, n2 = None, tol = 1e-3, npoints = 17, maxpoints = 2001, scale = "lin", resolution = 1e-9, response = None, z0 = 50.):
+
+	if response is None:
+
+		if n1 is None or n2 is None:
+			raise ValueError("Adaptive sweep needs port nodes or a response function")
+
+		response = twoportResponse(n1, n2, z0)
+
+	# Sampling variable
+	if scale == "log":
+
+		if fmin <= 0:
+			raise ValueError("Logarithmic sweep needs fmin > 0")
+
+		_map, _inv = np.log, np.exp
+
+	elif scale == "lin":
+		_map, _inv = np.asarray, np.asarray
+
+	else:
+		raise ValueError("Unknown sweep scale (%s)"%scale)
+
+	x = np.linspace( _map(float(fmin)), _map(float(fmax)), max(npoints, 2) )
+	width = resolution * ( x[-1] - x[0] )
+
+	ytensor = compiled.tensor( _inv(x) )
+	r = response(ytensor).reshape( len(x), -1 )
+
+	# Error estimate of each interval (unknown for the coarse grid)
+	error = np.full( len(x) - 1, np.inf )
+
+	while len(x) < maxpoints:
+
+		# Intervals to bisect, largest error first within the point budget
+		candidates = np.nonzero( (error > tol) & (np.diff(x) > width) )[0]
+
+		if len(candidates) == 0:
+			break
+
+		candidates = candidates[ np.argsort( -error[candidates], kind="stable" ) ]
+		index = np.sort( candidates[ :maxpoints - len(x) ] )
+
+		# Solve all midpoints in one pass
+		xm = 0.5 * ( x[index] + x[index + 1] )
+		ym = compiled.tensor( _inv(xm) )
+		rm = response(ym).reshape( len(xm), -1 )
+
+		# Interpolation error at the midpoints
+		_error = np.max( np.abs( rm - 0.5 * ( r[index] + r[index + 1] ) ), axis=1 )
+		_error /= np.maximum( 1.0, np.max( np.abs(rm), axis=1 ) )
+
+		# Both halves of a bisected interval inherit its midpoint error
+		counts = np.ones( len(error), dtype=int )
+		counts[index] = 2
+
+		_parent = error.copy()
+		_parent[index] = _error
+
+		error = np.repeat(_parent, counts)
+
+		x = np.insert(x, index + 1, xm)
+		r = np.insert(r, index + 1, rm, axis=0)
+		ytensor = np.insert(ytensor, index + 1, ym, axis=0)
+
+	return _inv(x), ytensor
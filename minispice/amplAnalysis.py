@@ -151,6 +151,20 @@ class amplAnalysis:
 		# Return data
 		return {"c" : cg, "r" : rg, "data" : self.Circle(cg, rg)}
 
+	# Constant noise figure circle for noise parameters Fmin, Rn and Gopt
+	# (see noise.py) at the frequency of the S-parameters
+	def noiseCircle(self, NF_dB, Fmin, Rn, Gopt, z0 = 50.):
+
+		cf, rf = noiseCircles(NF_dB, Fmin, Rn, Gopt, z0)
+
+		# Return data
+		return {"c" : complex(cf), "r" : float(rf), "data" : self.Circle(cf, rf)}
+
+	# Transducer gain, stability and mismatch over a grid of source and load
+	# reflection coefficients (see designSpace)
+	def designSpace(self, gammaS, gammaL = None, **kwargs):
+		return designSpace(self.sparams, gammaS, gammaL, **kwargs)
+
 	# Maximum transducer gain
 	def maxTransducerGain(self):
 
@@ -178,3 +192,124 @@ class amplAnalysis:
 	# Method to calculate source conjugate 
 	def conjugateCircleData(self, data):
 		return [ ( self.s11 + (self.s12 * self.s21 * _)/(1- (self.s22 * _)) ).conj() for _ in data ]
+
+# Constant noise figure circles in the source reflection plane. Arguments 
+# broadcast, e.g. NF_dB of shape (nnf, 1) against noise parameter arrays of 
+# shape (nfreq,). Returns centers and radii. Circles are empty (nan radius)
+# for NF_dB below the minimum noise figure.
+def noiseCircles(NF_dB, Fmin, Rn, Gopt, z0 = 50.):
+
+	F = 10.0**( np.asarray(NF_dB, dtype=float) / 10.0 )
+	Gopt = np.asarray(Gopt, dtype=complex)
+
+	N = ( F - Fmin ) / ( 4.0 * np.asarray(Rn) / z0 ) * np.abs(1.0 + Gopt)**2
+
+	with np.errstate(invalid = "ignore"):
+		return Gopt / ( N + 1.0 ), np.sqrt( N * ( N + 1.0 - np.abs(Gopt)**2 ) ) / ( N + 1.0 )
+
+# Reflection coefficients of a square grid of npoints x npoints over the unit
+# disk, restricted to |gamma| <= rmax. Returns a flat complex array.
+def unitDisk(npoints = 101, rmax = 0.99):
+
+	x = np.linspace(-rmax, rmax, npoints)
+	gamma = ( x[np.newaxis, :] + 1j * x[:, np.newaxis] ).ravel()
+
+	return gamma[ np.abs(gamma) <= rmax ]
+
+# Design space of a twoport for all pairs of source and load reflection 
+# coefficients gammaS (nS,) and gammaL (nL,), e.g. from unitDisk. Maps of 
+# shape (nS, nL) are computed as outer products of per-gamma terms:
+#
+#	GT 		transducer gain
+#	Min		input mismatch factor (1 - |GS|^2)(1 - |Gin|^2) / |1 - GS Gin|^2
+#	Mout	output mismatch factor (1 - |GL|^2)(1 - |Gout|^2) / |1 - GL Gout|^2
+#	stable	|Gin| < 1 and |Gout| < 1
+#
+# Rows are evaluated in chunks of gammaS to bound temporary memory. If noise
+# parameters (Fmin, Rn, Gopt) are given, NF (nS,) is the noise figure (dB)
+# of each source termination. optimum() returns the best stable pair.
+class designSpace:
+
+	def __init__(self, sparams, gammaS, gammaL = None, chunk = 256, noise = None, z0 = 50.):
+
+		s11, s12, s21, s22 = sparams[0][0], sparams[0][1], sparams[1][0], sparams[1][1]
+
+		self.gammaS = np.atleast_1d( np.asarray(gammaS, dtype=complex) )
+		self.gammaL = self.gammaS if gammaL is None else np.atleast_1d( np.asarray(gammaL, dtype=complex) )
+
+		gS, gL = self.gammaS, self.gammaL
+
+		# Terms that depend on one reflection coefficient only
+		self.gammaIn = s11 + s12 * s21 * gL / ( 1.0 - s22 * gL )
+		self.gammaOut = s22 + s12 * s21 * gS / ( 1.0 - s11 * gS )
+
+		self.stableS = np.abs(self.gammaOut) < 1.0
+		self.stableL = np.abs(self.gammaIn) < 1.0
+
+		_S = 1.0 - np.abs(gS)**2
+		_L = 1.0 - np.abs(gL)**2
+		_in = 1.0 - np.abs(self.gammaIn)**2
+		_out = 1.0 - np.abs(self.gammaOut)**2
+
+		# GT = |s21|^2 (1 - |GS|^2)(1 - |GL|^2) / ( |1 - GS Gin|^2 |1 - s22 GL|^2 )
+		_gain = np.abs(s21)**2 * _L / np.abs( 1.0 - s22 * gL )**2
+
+		self.GT = np.empty( (len(gS), len(gL)) )
+		self.Min = np.empty( (len(gS), len(gL)) )
+		self.Mout = np.empty( (len(gS), len(gL)) )
+
+		for i in range(0, len(gS), chunk):
+
+			_gS = gS[i:i+chunk, np.newaxis]
+
+			_dS = np.abs( 1.0 - _gS * self.gammaIn )**2
+			_dL = np.abs( 1.0 - gL * self.gammaOut[i:i+chunk, np.newaxis] )**2
+
+			self.GT[i:i+chunk] = _S[i:i+chunk, np.newaxis] * _gain / _dS
+			self.Min[i:i+chunk] = _S[i:i+chunk, np.newaxis] * _in / _dS
+			self.Mout[i:i+chunk] = _L * _out[i:i+chunk, np.newaxis] / _dL
+
+		# Noise figure of the source terminations
+		self.NF = None
+
+		if noise is not None:
+
+			Fmin, Rn, Gopt = noise
+			Ys = ( 1.0 - gS ) / ( 1.0 + gS ) / z0
+			Yopt = ( 1.0 - Gopt ) / ( 1.0 + Gopt ) / z0
+
+			self.NF = 10.0 * np.log10( Fmin + Rn / Ys.real * np.abs( Ys - Yopt )**2 )
+
+	# Stability of all pairs (nS, nL)
+	@property
+	def stable(self):
+		return self.stableS[:, np.newaxis] & self.stableL[np.newaxis, :]
+
+	# Best stable pair by transducer gain, optionally with a noise figure 
+	# bound (dB) on the source termination. Returns None if no pair qualifies.
+	def optimum(self, maxNF = None):
+
+		rows = self.stableS.copy()
+
+		if maxNF is not None:
+
+			if self.NF is None:
+				raise ValueError("Noise figure bound needs noise parameters")
+
+			rows &= self.NF <= maxNF
+
+		GT = np.where( rows[:, np.newaxis] & self.stableL[np.newaxis, :], self.GT, -np.inf )
+		i, j = np.unravel_index( np.argmax(GT), GT.shape )
+
+		if not np.isfinite( GT[i, j] ):
+			return None
+
+		return {
+			"gammaS" 	: self.gammaS[i],
+			"gammaL" 	: self.gammaL[j],
+			"GT" 		: self.GT[i, j],
+			"GT_dB" 	: todB( self.GT[i, j] ),
+			"Min" 		: self.Min[i, j],
+			"Mout" 		: self.Mout[i, j],
+			"NF" 		: None if self.NF is None else self.NF[i],
+		}
@@ -0,0 +1,361 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> cli.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import multiprocessing
+import argparse
+import numpy as np
+import time
+import sys
+import os
+
+from .compiledNetlist import compiledNetlist
+from .adaptiveSweep import adaptiveSweep
+from .nodeMatrix import portReduction, transducerGain
+from .resultStore import resultWriter
+from .Converter import ytosN
+from . import netlistParser
+from . import touchstone
+from . import __version__
+
+# Network parameters and twoport quantities that can be written
+NETWORK = ["S", "Y", "Z"]
+TWOPORT = ["gain", "zin", "zout"]
+
+# Batch runner for netlist sweeps:
+#
+#	minispice amp.cir --sweep log:1meg:20g:401 --ports 1 7 --output S gain
+#	minispice *.cir --sweep adaptive:1g:10g:1e-4 --ports 1 2 -j 8 --format touchstone
+#
+# Netlists are solved in parallel across a worker pool. Each netlist is 
+# written next to its source (or into --outdir) as a result store (<name>.store)
+# or as Touchstone files (<name>.s2p). Transistor model files are read from 
+# --models or the directory of the netlist. Plotting is only imported with 
+# --plot.
+
+# Parse a sweep spec: lin:fmin:fmax:n, log:fmin:fmax:n or adaptive:fmin:fmax[:tol]. 
+# Frequencies accept SPICE suffixes (1meg, 2.4g). 
+def parseSweep(spec):
+
+	fields = spec.split(":")
+	kind = fields[0].lower()
+
+	try:
+		fmin, fmax = [ _toValue(_f) for _f in fields[1:3] ]
+
+		if kind in ("lin", "log") and len(fields) == 4:
+			return {"kind" : kind, "fmin" : fmin, "fmax" : fmax, "npoints" : int( _toValue(fields[3]) )}
+
+		if kind == "adaptive" and len(fields) in (3, 4):
+			return {"kind" : kind, "fmin" : fmin, "fmax" : fmax, "tol" : _toValue(fields[3]) if len(fields) == 4 else 1e-3}
+
+	except (ValueError, TypeError):
+		pass
+
+	raise ValueError("Invalid sweep specification (%s)"%spec)
+
+# Numeric value with SPICE suffix
+def _toValue(token):
+
+	value = netlistParser.toValue(token)
+
+	if value is None:
+		raise ValueError("Invalid value (%s)"%token)
+
+	return value
+
+# Frequencies of a lin or log sweep
+def frequencies(sweep):
+
+	if sweep["kind"] == "log":
+
+		if sweep["fmin"] <= 0:
+			raise ValueError("Logarithmic sweep needs fmin > 0")
+
+		return np.logspace( np.log10(sweep["fmin"]), np.log10(sweep["fmax"]), sweep["npoints"] )
+
+	return np.linspace( sweep["fmin"], sweep["fmax"], sweep["npoints"] )
+
+# Requested outputs of port admittance matrices (nfreq, nports, nports)
+def outputs(tp, names, z0 = 50., Zs = 50., Zl = 50.):
+
+	result = {}
+
+	for _name in names:
+
+		if _name == "S":
+			result[_name] = ytosN(tp, z0)
+
+		elif _name == "Y":
+			result[_name] = tp
+
+		elif _name == "Z":
+			result[_name] = np.linalg.inv(tp)
+
+		elif _name == "gain":
+			result[_name] = transducerGain(tp, Zs, Zl)
+
+		# Input impedance with load Zl and output impedance with source Zs
+		elif _name == "zin":
+			det = tp[:, 0, 0] * tp[:, 1, 1] - tp[:, 0, 1] * tp[:, 1, 0]
+			result[_name] = ( tp[:, 1, 1] + 1./Zl ) / ( det + tp[:, 0, 0] / Zl )
+
+		elif _name == "zout":
+			det = tp[:, 0, 0] * tp[:, 1, 1] - tp[:, 0, 1] * tp[:, 1, 0]
+			result[_name] = ( tp[:, 0, 0] + 1./Zs ) / ( det + tp[:, 1, 1] / Zs )
+
+	return result
+
+# Output path of a netlist without extension
+def _stem(path, outdir):
+
+	_name = os.path.splitext( os.path.basename(path) )[0]
+	return os.path.join( os.path.dirname(path) if outdir is None else outdir, _name )
+
+# Solve one netlist and write its results. Runs in a worker process. Returns
+# (path, number of frequencies, elapsed time, error, plot data)
+def runNetlist(path, options):
+
+	start = time.time()
+
+	try:
+		_netlist = netlistParser.parse(path, cache = options["netlist_cache"])
+		compiled = compiledNetlist(_netlist, options["models"] or os.path.dirname(path))
+
+		sweep, ports, chunk = options["sweep"], options["ports"], options["chunk"]
+
+		# Adaptive sweeps refine on the S-parameters of the first two ports
+		if sweep["kind"] == "adaptive":
+			freq, ytensor = adaptiveSweep(compiled, sweep["fmin"], sweep["fmax"], ports[0], ports[1], tol = sweep["tol"], z0 = options["z0"])
+
+		else:
+			freq, ytensor = frequencies(sweep), None
+
+		stem = _stem(path, options["outdir"])
+		names = options["output"]
+		plot = {} if options["plot"] else None
+
+		if options["format"] == "touchstone":
+
+			_kinds = [ _name for _name in names if _name in NETWORK ]
+			_ext = ".s%dp"%len(ports)
+
+			writers = dict( ( _kind, touchstone.touchstoneWriter(
+				stem + ( _ext if len(_kinds) == 1 else "_%s%s"%(_kind, _ext) ), len(ports), _kind, "RI", "HZ", options["z0"], options["touchstone_version"], len(freq),
+				["minispice %s"%os.path.basename(path)]
+			) ) for _kind in _kinds )
+
+		else:
+			store = resultWriter(stem + ".store", len(freq), {
+				"analysis" 	: "cli",
+				"netlist" 	: os.path.abspath(path),
+				"ports" 	: list(ports),
+				"z0" 		: options["z0"],
+				"zs" 		: options["zs"],
+				"zl" 		: options["zl"],
+			})
+			store.write("freq", freq)
+
+		try:
+			# Assemble, reduce and convert in chunks of frequencies
+			for i in range(0, len(freq), chunk):
+
+				_y = compiled.tensor(freq[i:i+chunk]) if ytensor is None else ytensor[i:i+chunk]
+				_result = outputs( portReduction(_y, ports), names, options["z0"], options["zs"], options["zl"] )
+
+				for _name, _data in _result.items():
+
+					if options["format"] == "touchstone":
+						writers[_name].write(freq[i:i+chunk], _data)
+
+					else:
+						store.write(_name, _data, i)
+
+					if plot is not None:
+						plot.setdefault(_name, []).append(_data)
+
+		# Remove partial output of failed sweeps so it is never read as valid
+		except BaseException:
+			for _writer in ( writers.values() if options["format"] == "touchstone" else [store] ):
+				_writer.abort()
+
+			raise
+
+		for _writer in ( writers.values() if options["format"] == "touchstone" else [store] ):
+			_writer.close()
+
+		if plot is not None:
+			plot = dict( (_name, np.concatenate(_data)) for _name, _data in plot.items() )
+			plot["freq"] = freq
+
+		return path, len(freq), time.time() - start, None, plot
+
+	except Exception as e:
+		return path, 0, time.time() - start, "%s: %s"%(type(e).__name__, e), None
+
+# Star-args helper for Pool.imap_unordered
+def _run(args):
+	return runNetlist(*args)
+
+# Plot magnitudes of all results, one figure per quantity
+def plotResults(results, ports, scale = "lin"):
+
+	from .plotAnalysis import plotAnalysis
+	plot = plotAnalysis()
+
+	for _path, _data in results:
+
+		_label = os.path.basename(_path)
+
+		for _name, _value in _data.items():
+
+			if _name == "freq":
+				continue
+
+			# Network parameters: one figure per entry
+			if _value.ndim == 3:
+				_entries = [ ( "%s%d%d"%(_name, i + 1, j + 1), _value[:, i, j] ) for i in range(len(ports)) for j in range(len(ports)) ]
+
+			else:
+				_entries = [ (_name, _value) ]
+
+			for _key, _v in _entries:
+
+				if _key not in plot.figures:
+					plot.add_figure(_key)
+					plot.set_xlabel(_key, "Frequency (Hz)")
+					plot.set_ylabel(_key, "|%s| (dB)"%_key if _name in ("S", "gain") else "|%s|"%_key)
+					plot.set_title(_key, _key)
+
+				if _name == "S":
+					_v = 20.0 * np.log10( np.abs(_v) )
+
+				elif _name == "gain":
+					_v = 10.0 * np.log10( np.abs(_v) )
+
+				else:
+					_v = np.abs(_v)
+
+				plot.plot(_key, _data["freq"], _v, scale, label = _label)
+
+	for _fig in plot.figures.values():
+		_fig.axes[0].legend()
+
+	plot.show()
+
+def parser():
+
+	parser = argparse.ArgumentParser(prog = "minispice", description = "Frequency sweeps of SPICE netlists")
+
+	parser.add_argument("netlists", nargs = "+", help = "netlist files (.cir)")
+	parser.add_argument("-s", "--sweep", required = True, type = parseSweep, help = "lin:fmin:fmax:n, log:fmin:fmax:n or adaptive:fmin:fmax[:tol]")
+	parser.add_argument("-p", "--ports", required = True, type = int, nargs = "+", help = "port nodes")
+	parser.add_argument("-o", "--output", nargs = "+", default = ["S"], choices = NETWORK + TWOPORT, help = "quantities to write (default S)")
+	parser.add_argument("-f", "--format", default = "store", choices = ["store", "touchstone"], help = "binary result store or Touchstone files")
+	parser.add_argument("-d", "--outdir", default = None, help = "output directory (default: next to each netlist)")
+	parser.add_argument("-j", "--jobs", type = int, default = 1, help = "number of worker processes (0: one per cpu)")
+	parser.add_argument("--z0", type = float, default = 50., help = "reference impedance")
+	parser.add_argument("--zs", type = float, default = 50., help = "source impedance for gain and zout")
+	parser.add_argument("--zl", type = float, default = 50., help = "load impedance for gain and zin")
+	parser.add_argument("--touchstone-version", type = int, default = 1, choices = [1, 2], help = "Touchstone file version (default 1)")
+	parser.add_argument("--chunk", type = int, default = touchstone.CHUNK, help = "frequencies per chunk")
+	parser.add_argument("--models", default = None, help = "directory of transistor model files")
+	parser.add_argument("--netlist-cache", action = "store_true", help = "cache parsed netlists")
+	parser.add_argument("--plot", action = "store_true", help = "plot results (imports matplotlib)")
+	parser.add_argument("--version", action = "version", version = "minispice %s"%__version__)
+
+	return parser
+
+def main(argv = None):
+
+	_parser = parser()
+	args = _parser.parse_args(argv)
+
+	if len(args.ports) < 2 and args.sweep["kind"] == "adaptive":
+		_parser.error("adaptive sweeps need at least two ports")
+
+	if len(args.ports) != 2 and any( _name in TWOPORT for _name in args.output ):
+		_parser.error("%s need exactly two ports"%", ".join(TWOPORT))
+
+	if args.format == "touchstone" and any( _name in TWOPORT for _name in args.output ):
+		_parser.error("Touchstone files hold S, Y or Z parameters only")
+
+	if args.outdir is not None and not os.path.isdir(args.outdir):
+		os.makedirs(args.outdir)
+
+	options = {
+		"sweep" 		: args.sweep,
+		"ports" 		: args.ports,
+		"output" 		: list( dict.fromkeys(args.output) ),
+		"format" 		: args.format,
+		"outdir" 		: None if args.outdir is None else os.path.abspath(args.outdir),
+		"z0" 			: args.z0,
+		"zs" 			: args.zs,
+		"zl" 			: args.zl,
+		"touchstone_version" : args.touchstone_version,
+		"chunk" 		: max(args.chunk, 1),
+		"models" 		: None if args.models is None else os.path.abspath(args.models),
+		"netlist_cache" : True if args.netlist_cache else None,
+		"plot" 			: args.plot,
+	}
+
+	tasks = [ ( os.path.abspath(_path), options ) for _path in args.netlists ]
+	jobs = min( args.jobs or multiprocessing.cpu_count(), len(tasks) )
+
+	if jobs > 1:
+		pool = multiprocessing.Pool(jobs)
+		results = pool.imap_unordered(_run, tasks)
+
+	else:
+		pool, results = None, map(_run, tasks)
+
+	failed, plots = 0, []
+
+	try:
+		for _path, _nfreq, _elapsed, _error, _plot in results:
+
+			if _error is not None:
+				failed += 1
+				sys.stderr.write("%s: failed (%s)\n"%(_path, _error))
+
+			else:
+				sys.stdout.write("%s: %d frequencies in %.3f s\n"%(_path, _nfreq, _elapsed))
+
+			if _plot is not None:
+				plots.append( (_path, _plot) )
+
+	finally:
+		if pool is not None:
+			pool.close()
+			pool.join()
+
+	if args.plot and plots:
+		plotResults( sorted(plots, key = lambda _p: _p[0]), args.ports, "log" if args.sweep["kind"] == "log" else "lin" )
+
+	return 1 if failed else 0
+
+if __name__ == "__main__":
+	sys.exit( main() )
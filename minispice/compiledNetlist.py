@@ -0,0 +1,459 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> compiledNetlist.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import collections
+import numpy as np
+import math
+
+from .nodeMatrix import readModel, transistorStamp, portReduction
+from .netlistParser import NetlistError
+from . import instrument
+
+# Linear elements are rank one stamps y * (e[p+] - e[p-]) (e[q+] - e[q-])^T
+# where nodes are stored as (p+, p-, q+, q-). Row, column and sign for each
+# of the four matrix entries of a stamp.
+STAMP_ROWS  = [0, 0, 1, 1]
+STAMP_COLS  = [2, 3, 2, 3]
+STAMP_SIGNS = np.array([1.0, -1.0, -1.0, 1.0])
+
+# Maximum number of reduced subcircuit port blocks kept in the cache. The
+# least recently used blocks are evicted beyond this size.
+CACHE_SIZE = 65536
+
+# Compiled netlist. Flattens the subcircuit hierarchy into a single node
+# space and stores element stamps as arrays so that admittance matrices
+# for many frequencies can be assembled in one vectorized pass.
+#
+# Subcircuits listed in reduce (or all if reduce is True) are not flattened.
+# Their instances are stamped as dense port admittance blocks obtained by 
+# eliminating internal nodes once per frequency. Elements and internal nodes
+# of reduced instances are not addressable from the compiled netlist. Model
+# parameters set on the compiled netlist reach reduced subcircuits, whose
+# cached port blocks are then discarded.
+class compiledNetlist:
+
+	def __init__(self, _netlist, path = None, reduce = None, subcircuits = None, memo = None, stack = (), cache = None, models = None, cachesize = CACHE_SIZE):
+
+		# Directory searched for transistor models (None is cwd)
+		self.path = path
+
+		# Size of admittance matrix. Internal subcircuit nodes are numbered
+		# after the nodes of the top level netlist.
+		self.size = _netlist.size
+
+		# Linear elements: name, type (R, C, L, G), value and stamp nodes
+		self.names = []
+		self.kind  = []
+		self.value = []
+		self.nodes = []
+
+		# Transistors grouped by model: names and (b, c, e) nodes
+		self.transistors = collections.OrderedDict()
+
+		# Hierarchical names of internal subcircuit nodes (e.g. X1.3)
+		self.nodenames = collections.OrderedDict()
+
+		# Cache for model parameters (shared by the subcircuit hierarchy)
+		self.models = {} if models is None else models
+
+		# Reduced subcircuit instances: definition, ports and instance nodes
+		self.reduce = reduce
+		self.macromodels = collections.OrderedDict()
+
+		# Port admittance blocks of reduced subcircuits keyed (subcircuit, freq).
+		# Least recently used blocks are evicted beyond cachesize.
+		self.cache = collections.OrderedDict() if cache is None else cache
+		self.cachesize = cachesize
+
+		# Subcircuit definitions are global. Each is compiled a single time.
+		subcircuits = _netlist.subcircuits if subcircuits is None else subcircuits
+		memo = {} if memo is None else memo
+
+		# Group subcircuit instances by definition
+		instances = collections.OrderedDict()
+
+		for _comp, _conf in _netlist.components.items():
+
+			_type = _comp[0].upper()
+			_nodes = _conf["nodes"]
+
+			# Passive components
+			if _type in ("R", "C", "L"):
+				self._add(_comp, _type, _conf["value"], [ _nodes[0], _nodes[1], _nodes[0], _nodes[1] ])
+
+			# Case of a VCCS (transconductance)
+			elif _type == "G":
+				self._add(_comp, _type, _conf["value"], _nodes)
+
+			# Transistor with model file
+			elif _type == "Q":
+				_tr = self.transistors.setdefault( _conf["value"], {"names" : [], "nodes" : []} )
+				_tr["names"].append(_comp)
+				_tr["nodes"].append(_nodes)
+
+			# Subcircuit instance
+			elif _type == "X":
+				instances.setdefault( _conf["value"], [] ).append( (_comp, _nodes) )
+
+		# Convert to arrays
+		self.kind  = np.array(self.kind, dtype = str)
+		self.value = np.array(self.value, dtype = float)
+		self.nodes = np.array(self.nodes, dtype = int).reshape(-1, 4)
+
+		for _model, _tr in self.transistors.items():
+			_tr["nodes"] = np.array(_tr["nodes"], dtype = int).reshape(-1, 3)
+
+		# Flatten instances or stamp them as reduced port blocks
+		for _name, _instances in instances.items():
+
+			if reduce is True or ( reduce is not None and _name in reduce ):
+				self._macromodel(_name, _instances, subcircuits, memo, stack)
+
+			else:
+				self._instantiate(_name, _instances, subcircuits, memo, stack)
+
+		# Lookup of linear elements by name
+		self.index = dict( (_name, i) for i, _name in enumerate(self.names) )
+
+		# Static matrices are built on demand
+		self._matrices = None
+
+	# Add a linear element
+	def _add(self, name, kind, value, nodes):
+
+		self.names.append(name)
+		self.kind.append(kind)
+		self.value.append(float(value))
+		self.nodes.append(nodes)
+
+	# Compile a subcircuit definition (once) and return it
+	def _definition(self, name, subcircuits, memo, stack):
+
+		if name in stack:
+			raise NetlistError("recursive instantiation of subcircuit %s"%name)
+
+		if name not in subcircuits:
+			raise NetlistError("unknown subcircuit %s"%name)
+
+		if name not in memo:
+			memo[name] = compiledNetlist(subcircuits[name], self.path, self.reduce, subcircuits, memo, stack + (name,), self.cache, self.models, self.cachesize)
+
+		return memo[name]
+
+	# Check that instances connect the correct number of ports
+	def _ports(self, name, instances, subcircuits):
+
+		ports = subcircuits[name].ports
+
+		for _inst, _nodes in instances:
+			if len(_nodes) != len(ports):
+				raise NetlistError("%s connects %d nodes but subcircuit %s has %d ports"%(_inst, len(_nodes), name, len(ports)))
+
+		return ports
+
+	# Register instances of a subcircuit which is stamped in reduced form. The
+	# block is built over used nodes and ports only, so gaps in the local node
+	# numbering do not leave empty (singular) rows in the internal block.
+	def _macromodel(self, name, instances, subcircuits, memo, stack):
+
+		child = self._definition(name, subcircuits, memo, stack)
+		ports = self._ports(name, instances, subcircuits)
+
+		# Used local nodes and the positions of the ports among them
+		keep = np.union1d( child.used(), ports )
+
+		self.macromodels[name] = {
+			"model" : child,
+			"ports" : ports,
+			"keep"	: keep,
+			"local" : list( np.searchsorted(keep, ports) + 1 ),
+			"names" : [ _inst for _inst, _nodes in instances ],
+			"nodes" : np.array( [ _nodes for _inst, _nodes in instances ], dtype = int )
+		}
+
+	# Replicate the stamps of a compiled subcircuit for all of its instances.
+	# Local nodes are mapped to global nodes by a lookup table per instance.
+	def _instantiate(self, name, instances, subcircuits, memo, stack):
+
+		child = self._definition(name, subcircuits, memo, stack)
+		ports = self._ports(name, instances, subcircuits)
+
+		# Internal nodes are all nodes used by the child which are not ports
+		internal = child.used()
+		internal = internal[ ~np.isin(internal, ports) ]
+
+		# Node map (instance, local node) -> global node
+		ninst, nint = len(instances), len(internal)
+		nodemap = np.zeros( (ninst, child.size + 1), dtype = int )
+		nodemap[:, ports] = [ _nodes for _inst, _nodes in instances ]
+		nodemap[:, internal] = self.size + 1 + np.arange(ninst * nint).reshape(ninst, nint)
+		self.size += ninst * nint
+
+		# Replicate linear elements
+		_insts = [ _inst for _inst, _nodes in instances ]
+
+		self.names.extend( [ "%s.%s"%(_inst, _name) for _inst in _insts for _name in child.names ] )
+		self.kind  = np.concatenate( [ self.kind,  np.tile(child.kind,  ninst) ] )
+		self.value = np.concatenate( [ self.value, np.tile(child.value, ninst) ] )
+		self.nodes = np.concatenate( [ self.nodes, nodemap[:, child.nodes].reshape(-1, 4) ] )
+
+		# Replicate transistors
+		for _model, _tr in child.transistors.items():
+
+			_self = self.transistors.setdefault( _model, {"names" : [], "nodes" : np.zeros( (0, 3), dtype = int) } )
+			_self["names"].extend( [ "%s.%s"%(_inst, _name) for _inst in _insts for _name in _tr["names"] ] )
+			_self["nodes"] = np.concatenate( [ _self["nodes"], nodemap[:, _tr["nodes"]].reshape(-1, 3) ] )
+
+		# Hierarchical node names
+		_names = [ (str(_node), _node) for _node in internal if _node <= subcircuits[name].size ]
+		_names += [ (_name, _node) for _name, _node in child.nodenames.items() ]
+
+		for i, _inst in enumerate(_insts):
+			for _name, _node in _names:
+				self.nodenames[ "%s.%s"%(_inst, _name) ] = int( nodemap[i, _node] )
+
+	# Sorted array of nodes used by elements and reduced instances (excluding
+	# ground)
+	def used(self):
+
+		_nodes = [ self.nodes.ravel() ] + [ _tr["nodes"].ravel() for _tr in self.transistors.values() ]
+		_nodes += [ _macro["nodes"].ravel() for _macro in self.macromodels.values() ]
+		_nodes = np.unique( np.concatenate(_nodes) )
+
+		return _nodes[ _nodes > 0 ]
+
+	# Look up global node index from node number or hierarchical name
+	def node(self, name):
+
+		return int(name) if str(name).isdigit() else self.nodenames[name]
+
+	# Extract transistor model parameters (cached)
+	def model(self, name):
+
+		if name not in self.models:
+			self.models[name] = readModel(name, self.path)
+
+		return self.models[name]
+
+	# Parameter value by name. Linear elements by element name and transistor
+	# model parameters as model.param (e.g. hybridpix.gm)
+	def get(self, name):
+
+		if name in self.index:
+			return self.value[ self.index[name] ]
+
+		_model, _param = self._param(name)
+		return self.model(_model)[_param]
+
+	# Set parameter value by name. Static matrices are rebuilt on next use.
+	def set(self, name, value):
+
+		if name in self.index:
+			self.value[ self.index[name] ] = float(value)
+			self._matrices = None
+
+		else:
+			_model, _param = self._param(name)
+			self.model(_model)[_param] = float(value)
+
+			# Port blocks of reduced subcircuits using the model are stale
+			stale = self._dependents(_model)
+
+			for _key in [ _key for _key in self.cache if _key[0] in stale ]:
+				del self.cache[_key]
+
+	# Names of reduced subcircuits (at any depth) containing transistors of a
+	# given model
+	def _dependents(self, model):
+
+		names = set()
+
+		for _name, _macro in self.macromodels.items():
+
+			_nested = _macro["model"]._dependents(model)
+
+			if _nested or model in _macro["model"].transistors:
+				names |= _nested | {_name}
+
+		return names
+
+	# Split model.param names
+	def _param(self, name):
+
+		_model, _sep, _param = name.rpartition(".")
+
+		if ( _model not in self.transistors and not self._dependents(_model) ) or _param not in self.model(_model):
+			raise KeyError("Unknown element or model parameter (%s)"%name)
+
+		return _model, _param
+
+	# Coefficient of each linear element in its static matrix
+	def coefficient(self, value = None, kind = None):
+
+		value = self.value if value is None else value
+		kind  = self.kind if kind is None else kind
+
+		return np.where( (kind == "R") | (kind == "L"), 1.0 / value, value )
+
+	# Admittance of a linear element of given kind. Value and freq broadcast
+	def admittance(self, kind, value, freq):
+
+		w = 2 * math.pi * np.asarray(freq, dtype = float)
+		value = np.asarray(value, dtype = float)
+
+		if kind == "R":
+			return ( 1.0 / value ) + 0j * w
+
+		elif kind == "C":
+			return 1j * w * value
+
+		elif kind == "L":
+			return 1.0 / ( 1j * w * value )
+
+		else:
+			return value + 0j * w
+
+	# Stamp vectors (u, v) of a linear element. Its contribution to the
+	# admittance matrix is y * outer(u, v)
+	def incidence(self, name):
+
+		nodes = self.nodes[ self.index[name] ]
+
+		u = np.zeros(self.size + 1)
+		v = np.zeros(self.size + 1)
+
+		np.add.at(u, nodes[:2], [1.0, -1.0])
+		np.add.at(v, nodes[2:], [1.0, -1.0])
+
+		return u[1:], v[1:]
+
+	# Triplet (row, col, value) form of the stamps of the masked elements.
+	# Entries in ground rows or columns are dropped. Indices are zero based.
+	def triplets(self, mask):
+
+		nodes = self.nodes[mask]
+
+		rows = nodes[:, STAMP_ROWS].ravel()
+		cols = nodes[:, STAMP_COLS].ravel()
+		vals = ( self.coefficient()[mask][:, np.newaxis] * STAMP_SIGNS ).ravel()
+
+		keep = (rows > 0) & (cols > 0)
+
+		return rows[keep] - 1, cols[keep] - 1, vals[keep]
+
+	# Frequency independent conductance (G), capacitance (C) and inverse
+	# inductance (Gamma) matrices: Y(w) = G + jwC + Gamma/jw (+ transistors)
+	def matrices(self):
+
+		if self._matrices is None:
+
+			self._matrices = []
+
+			for kinds in [ ("R", "G"), ("C",), ("L",) ]:
+
+				_matrix = np.zeros( (self.size, self.size) )
+				rows, cols, vals = self.triplets( np.isin(self.kind, kinds) )
+				np.add.at(_matrix, (rows, cols), vals)
+
+				self._matrices.append(_matrix)
+
+		return self._matrices
+
+	# Admittance tensor of shape (nfreq, size, size)
+	@instrument.timed("assemble")
+	def tensor(self, freq):
+
+		freq = np.atleast_1d( np.asarray(freq, dtype = float) )
+		w = 2 * math.pi * freq[:, np.newaxis, np.newaxis]
+
+		# Static matrices
+		G, C, Gamma = self.matrices()
+
+		ytensor = np.empty( (len(freq), self.size, self.size), dtype = complex )
+		ytensor[:] = G
+
+		if np.any(C):
+			ytensor += 1j * w * C
+
+		if np.any(Gamma):
+			ytensor += Gamma / (1j * w)
+
+		# Transistor blocks are evaluated once per model for all frequencies
+		for _model, _tr in self.transistors.items():
+			self._scatter( ytensor, _tr["nodes"], transistorStamp(_model, self.model(_model), freq) )
+
+		# Reduced subcircuit blocks
+		for _name, _macro in self.macromodels.items():
+			self._scatter( ytensor, _macro["nodes"], self.macromodel(_name, freq) )
+
+		instrument.matrix("admittance", ytensor)
+		instrument.count("frequencies", len(freq))
+
+		return ytensor
+
+	# Add a block of shape (nfreq, k, k) to the tensor for every row of nodes
+	# (ninstances, k). Entries in ground rows or columns are dropped.
+	def _scatter(self, ytensor, nodes, block):
+
+		for i in range( nodes.shape[1] ):
+			for j in range( nodes.shape[1] ):
+
+				rows, cols = nodes[:, i], nodes[:, j]
+				keep = (rows > 0) & (cols > 0)
+
+				np.add.at(ytensor, (slice(None), rows[keep] - 1, cols[keep] - 1), block[:, i, j][:, np.newaxis])
+
+	# Port admittance blocks of a reduced subcircuit, shape (nfreq, k, k). 
+	# Internal nodes are eliminated once per (subcircuit, frequency).
+	def macromodel(self, name, freq):
+
+		_macro = self.macromodels[name]
+
+		freq = [ float(f) for f in np.atleast_1d(freq) ]
+		blocks = {}
+
+		for f in freq:
+			if (name, f) in self.cache:
+				self.cache.move_to_end( (name, f) )
+				blocks[f] = self.cache[ (name, f) ]
+
+		missing = [ f for f in freq if f not in blocks ]
+
+		if missing:
+
+			_keep = _macro["keep"] - 1
+			_ytensor = _macro["model"].tensor(missing)[:, _keep[:, np.newaxis], _keep]
+
+			reduced = portReduction( _ytensor, _macro["local"] )
+
+			for f, block in zip(missing, reduced):
+				blocks[f] = self.cache[ (name, f) ] = block
+
+		while len(self.cache) > self.cachesize:
+			self.cache.popitem(last = False)
+
+		return np.array( [ blocks[f] for f in freq ] )
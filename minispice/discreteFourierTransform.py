@@ -26,6 +26,8 @@
 #!/usr/bin/env python 
 import numpy as np
 
+from . import instrument
+
 # Class to hold the transform object
 class Transform: 
 
@@ -52,13 +54,14 @@ class Transform:
 		)
 
 	# Build the transform matrices   
+	@instrument.timed("dft.build")
 	def build(self):	
 
 		# Cache number of harmonics
 		n = float( self.harmonics["n"] )
 
 		# Twiddle factor
-		W = np.exp( np.complex( 0,  (-2.0 * np.pi / n ) ) )
+		W = np.exp( complex( 0,  (-2.0 * np.pi / n ) ) )
 
 		# Calculate the discrete fourier transform matrix
 		self.dft, self.idft = self.zeros(), self.zeros()
@@ -75,11 +78,13 @@ class Transform:
 
 	
 	# Calculate Discrete Fourier Transform
+	@instrument.timed("dft.transform")
 	def DFT(self, vt): 
 		
 		return np.dot(self.dft, vt)
 
 	# Calculate Inverse Discrete Fourier Transform 
+	@instrument.timed("dft.transform")
 	def IDFT(self, vf): 
 		
 		return np.dot(self.idft, vf)
@@ -149,7 +154,7 @@ class Dual:
 		for i, c in enumerate( self.freq ):
 
 			# Calculate contribution from harmonic
-			harmonic = [ c * np.exp( np.complex(0, self.DFT.get_omega(i) * t) ) for t in period ]
+			harmonic = [ c * np.exp( complex(0, self.DFT.get_omega(i) * t) ) for t in period ]
 
 			# Signal is a linear comibnation of harmonics
 			signal = np.add( signal, harmonic )
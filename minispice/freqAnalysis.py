@@ -31,18 +31,24 @@ import math
 import copy
 import re
 
-# For plotting
-import matplotlib.pyplot as plt
-
 # Imprt node matrix
-from .nodeMatrix import nodeMatrix
+from .nodeMatrix import nodeMatrix, T0, portReduction, pairwiseTwoports, nodeVoltages, voltageGains
+from .compiledNetlist import compiledNetlist
+from .sensitivity import adjointSensitivity
+from .noise import noiseAnalysis
+from .adaptiveSweep import adaptiveSweep
+from .resultStore import resultWriter
+from .resultCache import resultCache
+from . import instrument
+from . import touchstone
+from . import netlistParser
 from .Converter import *
 
 # Class to construct y-matrix for a list of frequencies
 class freqAnalysis: 
 	
 	# Method to initialize directly
-	def __init__(self, data, freq, components):
+	def __init__(self, data, freq, components, compiled = None):
 
 		# Data is dict of admittance matrices
 		self.data = data
@@ -52,91 +58,77 @@ class freqAnalysis:
 		
 		# Dictionary to hold components
 		self.components = components
+
+		# Compiled netlist (element stamps)
+		self.compiled = compiled
+
+		# Admittance tensor (nfreq, size, size) if assembled in one pass
+		self.ytensor = None
 	
-	# Overload constructor via @classmethod	
+	# Overload constructor via @classmethod. Parsed netlists are cached on
+	# disk when netlist_cache is True or a cache directory. Subcircuits in 
+	# reduce (or all if True) are stamped as reduced port admittance blocks.
+	# If result_cache is True, a directory or a resultCache, admittance
+	# matrices are reused from a content addressed on-disk cache.
 	@classmethod
-	def fromFile(cls, path, freq):
+	def fromFile(cls, path, freq, netlist_cache = None, reduce = None, result_cache = None):
 	
-		# Read all components into dict
-		components = {}
+		# Parse netlist into components dict
+		_netlist = netlistParser.parse(path, cache = netlist_cache)
 
-		# While parsing, we will determine the size of admittace matrix
-		size = 0
+		# Flatten subcircuits and compile element stamps
+		with instrument.phase("compile"):
+			compiled = compiledNetlist(_netlist, reduce = reduce)
 
-		with open(path, 'r') as f:
-		
-			for _line in f:
+		_cache = resultCache.open(result_cache)
+
+		if _cache is None:
+			return cls.fromCompiled(compiled, freq, _netlist.components)
+
+		key = _cache.key(_netlist, freq, reduce = reduce)
+		cached = _cache.get(key)
+
+		if cached is not None:
+			return cls.fromCompiled(compiled, freq, _netlist.components, cached["Y"])
+
+		analysis = cls.fromCompiled(compiled, freq, _netlist.components)
+		_cache.put(key, {"freq" : np.asarray(freq, dtype=float), "Y" : analysis.ytensor}, {"netlist" : str(path)})
 
-				# Split component data
-				_comp = _line.split()
+		return analysis
 
-				# Extract nodes from list
-				_nodes = [ int(n) for n in _comp[1:len(_comp)-1] ]
+	# Adaptive sweep between fmin and fmax. Frequencies are refined where the
+	# S-parameters between n1 and n2 (or a custom response) vary faster than
+	# linear interpolation resolves. The analysis freq is non-uniform.
+	@classmethod
+	def fromFileAdaptive(cls, path, fmin, fmax, n1 = None, n2 = None, netlist_cache = None, reduce = None, **kwargs):
+
+		_netlist = netlistParser.parse(path, cache = netlist_cache)
+		compiled = compiledNetlist(_netlist, reduce = reduce)
 
-				# Augment size if necessary
-				if max(_nodes) > size:
-					size = max(_nodes)
+		freq, ytensor = adaptiveSweep(compiled, fmin, fmax, n1, n2, **kwargs)
 
-				# Parse data into dictionary 
-				try:
-					components[ _comp[0] ] = {"nodes" : _nodes, "value" : float(_comp[-1]) }
+		return cls.fromCompiled(compiled, freq, _netlist.components, ytensor)
+
+	# Construct admittance matrices for all frequencies from compiled netlist.
+	# An admittance tensor that was already assembled can be passed in.
+	@classmethod
+	def fromCompiled(cls, compiled, freq, components = None, ytensor = None):
 
-				except:
-					components[ _comp[0] ] = {"nodes" : _nodes, "value" : str(_comp[-1]) }
+		# Assemble all frequencies in one pass
+		if ytensor is None:
+			ytensor = compiled.tensor(freq)
 
 		# Create a dictionary for admittance matrices
 		data = collections.OrderedDict()
-				
-		# Loop through frequencies and initialize components
-		for f in freq:
 
-			# Initialize node matrix for frequency f
-			ymatrix = nodeMatrix(size, f)
-		
-			# Loop through components and add them in
-			for _comp, _conf in components.items():
+		with instrument.phase("nodeMatrix"):
+			for i, f in enumerate(freq):
+				data[f] = nodeMatrix(compiled.size, f, ytensor[i])
 
-				# Passive components
-				if re.match(r'R|C|L', _comp) is not None:
-	
-					ymatrix.addPassive(
-						_comp, 
-						_conf["nodes"][0], 
-						_conf["nodes"][1], 
-						_conf["value"]
-					)
-
-				# Transistor with model file
-				elif re.match(r'Q', _comp) is not None: 
-					
-					ymatrix.addTransistor(
-						_comp, 
-						_conf["nodes"][0], 
-						_conf["nodes"][1], 
-						_conf["nodes"][2], 
-						_conf["value"]
-					)
-
-				# Case of a VCCS (transconductance)			
-				elif re.match(r'G', _comp) is not None:
-					
-					ymatrix.addVCCS(
-						_comp, 
-						_conf["nodes"][0], 
-						_conf["nodes"][1], 
-						_conf["nodes"][2], 
-						_conf["nodes"][3], 
-						_conf["value"]
-					)
-
-				# Pass 
-				else:
-					pass
+		analysis = cls(data, freq, components, compiled)
+		analysis.ytensor = ytensor
 
-			# Assign data 
-			data[f] = ymatrix
-			
-		return cls(data, freq, components)
+		return analysis
 
 	# Method to return S-parameters for two nodes over all frequencies
 	def Sparameters(self, n1, n2):
@@ -149,6 +141,92 @@ class freqAnalysis:
 
 		return sdata	
 
+	# Port admittance matrices (nfreq, N, N) for a list of port nodes. All
+	# other nodes are eliminated with one factorization per frequency, in 
+	# chunks over the sweep.
+	def toNport(self, ports, chunk = touchstone.CHUNK):
+
+		ytensor = self.getTensor()
+		ynport = np.empty( (len(ytensor), len(ports), len(ports)), dtype=complex )
+
+		for i in range(0, len(ytensor), chunk):
+			ynport[i:i+chunk] = portReduction(ytensor[i:i+chunk], ports)
+
+		return ynport
+
+	# Port S-parameters (nfreq, N, N) for a list of port nodes
+	def NportSparameters(self, ports, z0 = 50.):
+		return ytosN( self.toNport(ports), z0 )
+
+	# Twoport admittance matrices (nfreq, 2, 2) of every pair of port nodes
+	# with the other ports open, from a single N-port reduction. Returns a 
+	# dict keyed by (n1, n2).
+	def pairwiseTwoports(self, ports):
+
+		return dict(
+			( (ports[i], ports[j]), tp ) for (i, j), tp in pairwiseTwoports( self.toNport(ports) ).items()
+		)
+
+	# Poles and zeros of the transfer function from n1 to n2 by generalized
+	# eigenvalues of the compiled netlist (see poleZero.py)
+	def poleZero(self, n1 = None, n2 = None, **kwargs):
+
+		from .poleZero import poleZero
+		return poleZero(self.compiled, n1, n2, **kwargs)
+
+	# Noise parameters and noise figure of the twoport between n1 and n2 for
+	# a source impedance Zs (see noise.py)
+	def noise(self, n1, n2, Zs = 50., z0 = 50., T = T0):
+		return noiseAnalysis(self.compiled, self.getTensor(), self.freq, n1, n2, Zs, z0, T)
+
+	# Adjoint sensitivities of the twoport between n1 and n2 with respect to
+	# all element values and transistor model parameters (see sensitivity.py)
+	@instrument.timed("sensitivity")
+	def sensitivity(self, n1, n2, Zs = 50., Zl = 50., z0 = 50.):
+		return adjointSensitivity(self.compiled, self.getTensor(), self.freq, n1, n2, Zs, Zl, z0)
+
+	# Write the twoport between n1 and n2 to a Touchstone file as S, Y or Z 
+	# parameters. Port reduction and conversion are done in chunks.
+	def toTouchstone(self, path, n1, n2, kind = "S", z0 = 50., fmt = "RI", version = 1, chunk = touchstone.CHUNK):
+
+		ytensor, freq = self.getTensor(), np.asarray(self.freq, dtype=float)
+
+		with touchstone.touchstoneWriter(path, 2, kind, fmt, "HZ", z0, version, len(freq)) as f:
+
+			for i in range(0, len(freq), chunk):
+
+				tp = portReduction(ytensor[i:i+chunk], [n1, n2])
+
+				if kind.upper() == "S":
+					tp = ytosN(tp, z0)
+
+				elif kind.upper() == "Z":
+					tp = np.linalg.inv(tp)
+
+				f.write(freq[i:i+chunk], tp)
+
+	# Write results to a binary result store (see resultStore.py). Stores the
+	# full admittance tensor or, if n1 and n2 are given, the twoport Y and S
+	# parameters. Records are frequencies and are written in chunks.
+	def toStore(self, path, n1 = None, n2 = None, z0 = 50., chunk = touchstone.CHUNK):
+
+		ytensor, freq = self.getTensor(), np.asarray(self.freq, dtype=float)
+
+		with resultWriter(path, len(freq), {"analysis" : "freqAnalysis", "ports" : [n1, n2], "z0" : z0}) as store:
+
+			store.write("freq", freq)
+
+			for i in range(0, len(freq), chunk):
+
+				if n1 is None or n2 is None:
+					store.write("Y", ytensor[i:i+chunk], i)
+
+				else:
+					tp = portReduction(ytensor[i:i+chunk], [n1, n2])
+
+					store.write("Y", tp, i)
+					store.write("S", ytosN(tp, z0), i)
+
 	# Return a single matrix from simulation
 	def getMatrix(self, freq ):
 		return self.data[ freq ] if freq in self.data.keys() else None
@@ -157,6 +235,71 @@ class freqAnalysis:
 	def getData(self):
 		return self.data
 
+	# Return admittance matrices as array of shape (nfreq, size, size)
+	def getTensor(self):
+		if self.ytensor is not None:
+			return self.ytensor
+		return np.array( [ ymatrix.ymatrix for f, ymatrix in self.data.items() ] )
+
+	# Sweep the values of one or more linear elements (R, C, L, G) and return
+	# twoport admittance matrices between n1 and n2 with shape (nvalues, nfreq, 
+	# 2, 2). Values has shape (nvalues, len(names)), or (nvalues,) for a 
+	# single element. The base system is factored once per frequency and each
+	# sweep point is applied as a low rank (Sherman-Morrison-Woodbury) update
+	# of the element stamps.
+	@instrument.timed("sweep")
+	def sweep(self, names, values, n1, n2):
+
+		names = [names] if isinstance(names, str) else list(names)
+		values = np.asarray(values, dtype=float)
+
+		# A flat array is only unambiguous for a single element
+		if len(names) == 1 and values.ndim == 1:
+			values = values[:, np.newaxis]
+
+		if values.ndim != 2 or values.shape[1] != len(names):
+			raise ValueError("Sweep values must have shape (nvalues, %d) for %d elements, got %s"%(len(names), len(names), values.shape))
+
+		for _name in names:
+			if self.compiled is None or _name not in self.compiled.index:
+				raise ValueError("Element %s cannot be swept (linear elements only)"%_name)
+
+		freq = np.asarray(self.freq, dtype=float)
+		size, k = self.compiled.size, len(names)
+
+		# Stamp vectors and admittance changes for each element
+		U, V = np.zeros( (size, k) ), np.zeros( (size, k) )
+		dY = np.zeros( (len(values), len(freq), k), dtype=complex )
+	
+		for i, _name in enumerate(names):
+
+			_index = self.compiled.index[_name]
+			_kind, _value = self.compiled.kind[_index], self.compiled.value[_index]
+
+			U[:, i], V[:, i] = self.compiled.incidence(_name)
+
+			dY[:, :, i] = self.compiled.admittance(_kind, values[:, i, np.newaxis], freq) - \
+				self.compiled.admittance(_kind, _value, freq)
+
+		# One factorization per frequency: solve for port columns and U
+		P = np.zeros( (size, 2) )
+		P[n1 - 1, 0], P[n2 - 1, 1] = 1.0, 1.0
+
+		X = np.linalg.solve( self.getTensor(), np.concatenate([P, U], axis=1) )
+
+		Zpp = X[:, [n1 - 1, n2 - 1], :2]				# P^T Z P
+		ZpU = X[:, [n1 - 1, n2 - 1], 2:]				# P^T Z U
+		VZP = np.einsum('nk,fnp->fkp', V, X[:, :, :2])	# V^T Z P
+		VZU = np.einsum('nk,fnj->fkj', V, X[:, :, 2:])	# V^T Z U
+
+		# Woodbury: Z' = Z - Z U D (I + V^T Z U D)^-1 V^T Z 
+		D = dY[:, :, np.newaxis, :]
+		M = np.eye(k) + VZU[np.newaxis] * D
+		Zpp = Zpp[np.newaxis] - np.matmul( ZpU[np.newaxis] * D, np.linalg.solve(M, VZP[np.newaxis]) )
+
+		# Twoport admittance from port impedances
+		return np.linalg.inv(Zpp)
+
 	# Methods to return abs and angle of list
 	def abs(self, _data):
 		return [ np.abs(_) for _ in _data ]
@@ -168,6 +311,34 @@ class freqAnalysis:
 	def calcVoltageGain(self, n1, n2):	
 		return [ self.data[f].voltageGain(n1, n2) for f, ymatrix in self.data.items() ]
 
+	# Node voltages (nfreq, nnodes) for currents injected at one or more input
+	# nodes. Currents has shape (ninputs,) or (nfreq, ninputs), default 1 A.
+	# All nodes are solved with one factorization per frequency.
+	def nodeVoltages(self, inputs, currents = 1.0, chunk = touchstone.CHUNK):
+
+		ytensor = self.getTensor()
+		currents = np.asarray(currents, dtype=complex)
+
+		voltages = np.empty( ytensor.shape[:2], dtype=complex )
+
+		for i in range(0, len(ytensor), chunk):
+			_currents = currents[i:i+chunk] if currents.ndim == 2 else currents
+			voltages[i:i+chunk] = nodeVoltages(ytensor[i:i+chunk], inputs, _currents)
+
+		return voltages
+
+	# Voltage gain from n1 to every node (nfreq, nnodes). Column n2 - 1 is
+	# calcVoltageGain(n1, n2)
+	def calcVoltageGains(self, n1, chunk = touchstone.CHUNK):
+
+		ytensor = self.getTensor()
+		gains = np.empty( ytensor.shape[:2], dtype=complex )
+
+		for i in range(0, len(ytensor), chunk):
+			gains[i:i+chunk] = voltageGains(ytensor[i:i+chunk], n1)
+
+		return gains
+
 	# Calculate gain of effective twoport network connected to Rs and Rl
 	def calcNetworkGain(self, n1, n2, Zs, Zl):
 		return [ np.abs( self.data[f].networkGain(n1, n2, Zs, Zl) ) for f, ymatrix in self.data.items() ]
@@ -0,0 +1,237 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> instrument.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import collections
+import functools
+import numpy as np
+import json
+import time
+
+# Opt-in instrumentation. When disabled (the default) every hook is a single
+# check of the module level _stats. When enabled, hooks record per-phase wall
+# time and call counts, event counters, convergence series (e.g. Newton 
+# residuals) and matrix sizes/fill into a runStats object:
+#
+#	with instrument.profile() as stats:
+#		analysis = freqAnalysis.fromFile(path, freq)
+#		analysis.calcNetworkGain(1, 7, 50., 50.)
+#
+#	print( stats.report() )
+#	stats.toJSON("profile.json")
+#
+# Phases may nest. Times are inclusive of nested phases.
+_stats = None
+
+# Structured statistics of one instrumented run
+class runStats:
+
+	def __init__(self):
+
+		self.start = time.time()
+
+		# name -> {"calls", "time"}
+		self.phases = collections.OrderedDict()
+
+		# name -> count
+		self.counters = collections.OrderedDict()
+
+		# name -> list of values (convergence histories)
+		self.series = collections.OrderedDict()
+
+		# name -> {"shape", "nnz", "fill"} of the last recorded matrix
+		self.matrices = collections.OrderedDict()
+
+	def add(self, name, elapsed):
+
+		_phase = self.phases.get(name)
+
+		if _phase is None:
+			_phase = self.phases[name] = {"calls" : 0, "time" : 0.0}
+
+		_phase["calls"] += 1
+		_phase["time"] += elapsed
+
+	def count(self, name, n = 1):
+		self.counters[name] = self.counters.get(name, 0) + n
+
+	def append(self, name, value):
+		self.series.setdefault(name, []).append( float(value) )
+
+	def matrix(self, name, shape, nnz):
+
+		size = 1
+		for _n in shape:
+			size *= _n
+
+		self.matrices[name] = {"shape" : [ int(_n) for _n in shape ], "nnz" : int(nnz), "fill" : float(nnz) / max(size, 1)}
+
+	# Plain dict for serialization
+	def toDict(self):
+
+		return {
+			"wall" 		: time.time() - self.start,
+			"phases" 	: self.phases,
+			"counters" 	: self.counters,
+			"series" 	: self.series,
+			"matrices" 	: self.matrices,
+		}
+
+	# Dump to a JSON file or return a JSON string if path is None
+	def toJSON(self, path = None):
+
+		if path is None:
+			return json.dumps(self.toDict(), indent = 1)
+
+		with open(path, "w") as f:
+			json.dump(self.toDict(), f, indent = 1)
+
+	# Human readable summary of phases sorted by time
+	def report(self):
+
+		lines = [ "%-36s %10s %12s"%("phase", "calls", "time (ms)") ]
+
+		for _name, _phase in sorted( self.phases.items(), key = lambda _p : -_p[1]["time"] ):
+			lines.append( "%-36s %10d %12.3f"%(_name, _phase["calls"], 1e3 * _phase["time"]) )
+
+		for _name, _count in self.counters.items():
+			lines.append( "%-36s %10d"%(_name, _count) )
+
+		for _name, _matrix in self.matrices.items():
+			lines.append( "%-36s %10s nnz %d (fill %.3f)"%(_name, "x".join( str(_n) for _n in _matrix["shape"] ), _matrix["nnz"], _matrix["fill"]) )
+
+		return "\n".join(lines)
+
+# Enable instrumentation. Returns the active runStats
+def enable(stats = None):
+
+	global _stats
+	_stats = runStats() if stats is None else stats
+
+	return _stats
+
+def disable():
+
+	global _stats
+	_stats = None
+
+# Active runStats or None
+def active():
+	return _stats
+
+# Context manager that enables instrumentation for a block
+class profile:
+
+	def __init__(self, stats = None):
+		self.stats = runStats() if stats is None else stats
+
+	def __enter__(self):
+
+		self.previous = _stats
+		return enable(self.stats)
+
+	def __exit__(self, *args):
+
+		global _stats
+		_stats = self.previous
+
+# Timed phase. Used as a context manager
+class _phase:
+
+	__slots__ = ("name", "start")
+
+	def __init__(self, name):
+		self.name = name
+
+	def __enter__(self):
+		self.start = time.perf_counter()
+
+	def __exit__(self, *args):
+
+		if _stats is not None:
+			_stats.add(self.name, time.perf_counter() - self.start)
+
+# No-op context manager returned while disabled
+class _null:
+
+	def __enter__(self):
+		pass
+
+	def __exit__(self, *args):
+		pass
+
+_NULL = _null()
+
+def phase(name):
+	return _NULL if _stats is None else _phase(name)
+
+# Decorator recording each call of a function as a phase
+def timed(name):
+
+	def decorator(fn):
+
+		@functools.wraps(fn)
+		def wrapper(*args, **kwargs):
+
+			if _stats is None:
+				return fn(*args, **kwargs)
+
+			start = time.perf_counter()
+
+			try:
+				return fn(*args, **kwargs)
+
+			finally:
+				if _stats is not None:
+					_stats.add(name, time.perf_counter() - start)
+
+		return wrapper
+
+	return decorator
+
+# Event counter
+def count(name, n = 1):
+
+	if _stats is not None:
+		_stats.count(name, n)
+
+# Append a value to a convergence series
+def append(name, value):
+
+	if _stats is not None:
+		_stats.append(name, value)
+
+# Record size and number of nonzeros of a matrix (or stack of matrices, in
+# which case the fill of the union pattern is recorded)
+def matrix(name, A):
+
+	if _stats is None:
+		return
+
+	A = np.asarray(A)
+	pattern = np.any( A != 0, axis = tuple( range( A.ndim - 2 ) ) ) if A.ndim > 2 else ( A != 0 )
+
+	_stats.matrix(name, A.shape[-2:], np.count_nonzero(pattern))
@@ -0,0 +1,182 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> krylovReduction.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+import math
+
+from .compiledNetlist import compiledNetlist
+from .Converter import ytosN
+from . import netlistParser
+
+# Sparse modified nodal analysis matrices (G + sC) x = B u of a linear
+# compiled netlist. Unknowns are the node voltages followed by one branch
+# current per inductor, so no 1/s terms appear:
+#
+#	G = [ Gn  AL ]		C = [ Cn  0 ]
+#		[-AL' 0  ]			[ 0   L ]
+#
+# B has one column per port node (1-based). Returns (G, C, B) with G and C
+# in CSC format and B dense.
+def mnaMatrices(compiled, ports):
+
+	# Imported here to keep scipy out of the package import
+	import scipy.sparse
+
+	if compiled.transistors or compiled.macromodels:
+		raise ValueError("MNA matrices support linear R, C, L and G netlists only (no transistors or reduced subcircuits)")
+
+	n = compiled.size
+	inductors = np.nonzero( compiled.kind == "L" )[0]
+	N = n + len(inductors)
+
+	# Conductance and capacitance stamps
+	rows, cols, vals = compiled.triplets( np.isin(compiled.kind, ("R", "G")) )
+	_rows, _cols, _vals = compiled.triplets( compiled.kind == "C" )
+
+	# Inductor incidence (ground entries dropped)
+	branch = n + np.arange( len(inductors) )
+	pos, neg = compiled.nodes[inductors, 0], compiled.nodes[inductors, 1]
+
+	r, c, v = [rows], [cols], [vals]
+
+	for _nodes, _sign in [ (pos, 1.0), (neg, -1.0) ]:
+
+		keep = _nodes > 0
+
+		r += [ _nodes[keep] - 1, branch[keep] ]
+		c += [ branch[keep], _nodes[keep] - 1 ]
+		v += [ _sign * np.ones( np.count_nonzero(keep) ), -_sign * np.ones( np.count_nonzero(keep) ) ]
+
+	G = scipy.sparse.coo_matrix( ( np.concatenate(v), ( np.concatenate(r), np.concatenate(c) ) ), shape = (N, N) ).tocsc()
+
+	C = scipy.sparse.coo_matrix( (
+		np.concatenate( [ _vals, compiled.value[inductors] ] ),
+		( np.concatenate( [ _rows, branch ] ), np.concatenate( [ _cols, branch ] ) )
+	), shape = (N, N) ).tocsc()
+
+	# Port incidence
+	p = np.asarray(ports, dtype=int) - 1
+
+	B = np.zeros( (N, len(p)) )
+	B[p, np.arange(len(p))] = 1.0
+
+	return G, C, B
+
+# Orthonormalize the columns of V against the basis blocks and each other.
+# Columns that are numerically dependent are dropped (deflation): a column
+# is kept only if its norm after projection is above tol times its norm 
+# before projection.
+def _orthonormalize(V, basis, tol = 1e-10):
+
+	norms = np.linalg.norm(V, axis=0)
+
+	# Block modified Gram-Schmidt, repeated once for stability
+	for _ in range(2):
+		for _X in basis:
+			V = V - np.matmul( _X, np.matmul( _X.T, V ) )
+
+	Q, R = np.linalg.qr(V)
+	d = np.abs( np.diag(R) )
+
+	return Q[:, d > tol * np.maximum(norms, 1e-300) ] if len(d) else Q
+
+# Model-order reduction by block Arnoldi projection (PRIMA). The Krylov
+# subspace of (G + s0 C)^-1 C with starting block (G + s0 C)^-1 B is built
+# with one sparse LU factorization at the real expansion point s0 = 2 pi f0.
+# The congruence projection Gr = X'GX, Cr = X'CX, Br = X'B matches order
+# block moments of the port impedance around s0 and preserves passivity of
+# RLC networks. The reduced system (order * nports states) is evaluated at
+# all frequencies in one batched dense solve.
+class krylovReduction:
+
+	def __init__(self, compiled, ports, order = 10, f0 = None):
+
+		self.ports = list(ports)
+
+		G, C, B = mnaMatrices(compiled, ports)
+
+		# Expansion point where conductive and reactive parts are comparable
+		if f0 is None:
+			s0 = abs(G).sum(axis=0).max() / max( abs(C).sum(axis=0).max(), 1e-300 )
+
+		else:
+			s0 = 2 * math.pi * float(f0)
+
+		self.f0 = s0 / ( 2 * math.pi )
+
+		import scipy.sparse.linalg
+
+		# One sparse factorization for all Krylov blocks
+		lu = scipy.sparse.linalg.splu( ( G + s0 * C ).tocsc() )
+
+		basis = [ _orthonormalize( lu.solve(B), [] ) ]
+
+		for _ in range( order - 1 ):
+
+			_block = _orthonormalize( lu.solve( C.dot(basis[-1]) ), basis )
+
+			if _block.shape[1] == 0:
+				break
+
+			basis.append(_block)
+
+		# The basis never exceeds the number of unknowns
+		X = np.concatenate(basis, axis=1)[:, :G.shape[0]]
+
+		# Congruence projection
+		self.G = X.T.dot( G.dot(X) )
+		self.C = X.T.dot( C.dot(X) )
+		self.B = X.T.dot(B)
+
+		self.size = G.shape[0]
+		self.order = X.shape[1]
+
+	# Construct from netlist file
+	@classmethod
+	def fromFile(cls, path, ports, order = 10, f0 = None):
+
+		return cls( compiledNetlist( netlistParser.parse(path) ), ports, order, f0 )
+
+	# Port impedance matrices (nfreq, nports, nports)
+	def impedance(self, freq):
+
+		s = 2j * math.pi * np.atleast_1d( np.asarray(freq, dtype=float) )
+
+		X = np.linalg.solve( self.G + s[:, np.newaxis, np.newaxis] * self.C, self.B )
+
+		return np.matmul( self.B.T, X )
+
+	# Port admittance matrices (nfreq, nports, nports). For two ports this is
+	# the twoport admittance of nodeMatrix.toTwoport
+	def admittance(self, freq):
+
+		return np.linalg.inv( self.impedance(freq) )
+
+	# Port S-parameters (nfreq, nports, nports)
+	def Sparameters(self, freq, z0 = 50.):
+
+		return ytosN( self.admittance(freq), z0 )
@@ -0,0 +1,314 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> matching.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+
+from .Converter import seriesL, seriesC, shuntL, shuntC
+
+# Element patterns of the topologies, ordered from source to load
+TOPOLOGIES = {
+	"L1" : ["series", "shunt"],
+	"L2" : ["shunt", "series"],
+	"Pi" : ["shunt", "series", "shunt"],
+	"T"  : ["series", "shunt", "series"],
+}
+
+# Topology of the single empty network of loads that are already matched
+NONE = "none"
+
+# Reactances below this fraction of Rs (susceptances of 1/Rs) are zero
+ZERO = 1e-9
+
+# L-section from load impedance Z to a real resistance R with a shunt element
+# at the load and a series element towards the source. Returns susceptance B
+# and reactance X (nan where Re(1/Z) > 1/R) for the root sign.
+def shuntSeries(Z, R, sign):
+
+	Y = 1.0 / np.asarray(Z, dtype=complex)
+	G = Y.real
+
+	# Total susceptance after the shunt element
+	with np.errstate(invalid = "ignore"):
+		b = sign * np.sqrt( G / R - G**2 )
+
+	return b - Y.imag, b / ( G**2 + b**2 )
+
+# L-section from load impedance Z to a real resistance R with a series 
+# element at the load and a shunt element towards the source. Returns 
+# reactance X and susceptance B (nan where Re(Z) > R) for the root sign.
+def seriesShunt(Z, R, sign):
+
+	Z = np.asarray(Z, dtype=complex)
+	RL = Z.real
+
+	# Total reactance after the series element
+	with np.errstate(invalid = "ignore"):
+		x = sign * np.sqrt( R * RL - RL**2 )
+
+	return x - Z.imag, x / ( RL**2 + x**2 )
+
+# Lossless matching network synthesis. Load impedances ZL (ntargets,) at 
+# center frequencies f0 are matched to a real source resistance Rs with L 
+# sections (both orientations), Pi and T networks. Pi and T networks are 
+# cascades of two L sections through a virtual resistance set by the loaded
+# quality factors in Q. Element values of all targets, roots and Q values 
+# are solved in one vectorized pass per chunk of targets.
+#
+# Every candidate is then evaluated over a band f0 (1 +- span/2) of nband 
+# points with batched ABCD products. Bandwidth is the contiguous band around
+# f0 where |Gamma| <= gammaMax (1/3 is VSWR 2) and is limited to the span.
+# The load may vary over the band: pass ZLband of shape (ntargets, nband).
+# Targets are processed in chunks to bound temporary memory, and only the 
+# bandwidth and the reflection at f0 are kept per candidate (see response). 
+# Loads that are already matched have a single empty network (topology 
+# "none").
+#
+#	match = matchingSynthesis([10 - 15j, 120 + 40j], 2.4e9)
+#	for _s in match.solutions(0, n = 3):
+#		print(_s["topology"], _s["bandwidth"], _s["elements"])
+#
+class matchingSynthesis:
+
+	def __init__(self, ZL, f0, Rs = 50., topologies = ("L1", "L2", "Pi", "T"), Q = (1., 2., 5.), span = 1.0, nband = 201, gammaMax = 1./3., ZLband = None, chunk = 1024):
+
+		self.ZL = np.atleast_1d( np.asarray(ZL, dtype=complex) )
+		self.f0 = np.broadcast_to( np.asarray(f0, dtype=float), self.ZL.shape ).copy()
+		self.Rs, self.gammaMax = float(Rs), gammaMax
+
+		for _name in topologies:
+			if _name not in TOPOLOGIES:
+				raise ValueError("Unknown topology (%s)"%_name)
+
+		# Band around f0 with f0 at the center point
+		nband += 1 - nband % 2
+		self.ratio = 1.0 + span * np.linspace(-0.5, 0.5, nband)
+
+		if self.ratio[0] <= 0:
+			raise ValueError("Span must be below 2")
+
+		self.ZLband = self.ZL[:, np.newaxis] if ZLband is None else np.asarray(ZLband, dtype=complex)
+		Q = np.atleast_1d( np.asarray(Q, dtype=float) )
+
+		# Candidates per chunk of targets and topology: reactances (X for 
+		# series, B for shunt) of shape (ntargets, nsolutions, nelements)
+		fields = ["target", "topology", "count", "Q", "values", "gamma", "bandwidth", "empty"]
+		columns = dict( (_field, []) for _field in fields )
+
+		for i in range(0, len(self.ZL), max(int(chunk), 1)):
+
+			_targets = np.arange( i, min(i + chunk, len(self.ZL)) )
+
+			for _name in topologies:
+
+				values, _Q = self._solve(_name, Q, _targets)
+				gamma = self._response(_name, values, self.ZLband[_targets])
+
+				nt, ns, ne = values.shape
+				values, gamma = values.reshape(nt * ns, ne), gamma.reshape(nt * ns, -1)
+
+				# Drop roots without solution
+				valid = np.all( np.isfinite(values), axis = 1 ) & np.all( np.isfinite(gamma), axis = 1 )
+				target = np.repeat(_targets, ns)[valid]
+
+				columns["target"].append( target )
+				columns["topology"].append( np.full( len(target), _name, dtype=object ) )
+				columns["count"].append( np.full( len(target), ne, dtype=int ) )
+				columns["Q"].append( np.tile(_Q, nt)[valid] )
+				columns["values"].append( np.pad( values[valid], ( (0, 0), (0, 3 - ne) ), constant_values = np.nan ) )
+				columns["gamma"].append( gamma[valid, gamma.shape[1] // 2] )
+				columns["bandwidth"].append( self._bandwidth( gamma[valid], self.f0[target] ) )
+
+				# Networks without elements (normalized values below ZERO)
+				series = np.array( [ _kind == "series" for _kind in TOPOLOGIES[_name] ] )
+				columns["empty"].append( np.all( np.abs( np.where( series, values[valid] / self.Rs, values[valid] * self.Rs ) ) < ZERO, axis = 1 ) )
+
+		columns = dict( ( _field, np.concatenate( columns[_field] ) ) for _field in fields )
+
+		# Loads that are already matched keep a single empty network
+		empty = columns.pop("empty")
+		_, first = np.unique( columns["target"][empty], return_index = True )
+
+		keep = ~empty
+		keep[ np.nonzero(empty)[0][first] ] = True
+		empty = empty[keep]
+
+		for _field, _column in columns.items():
+			setattr( self, _field, _column[keep] )
+
+		self.topology[empty], self.count[empty] = NONE, 0
+		self.Q[empty], self.values[empty] = np.nan, np.nan
+
+	# Element reactances of a topology for targets, all roots and Q values
+	def _solve(self, name, Q, targets):
+
+		ZL, Rs = self.ZL[targets, np.newaxis], self.Rs
+		signs = np.array([1.0, -1.0])
+
+		if name == "L1":
+			B, X = shuntSeries(ZL, Rs, signs)
+			return np.stack( [X, B], axis = -1 ), np.full(2, np.nan)
+
+		if name == "L2":
+			X, B = seriesShunt(ZL, Rs, signs)
+			return np.stack( [B, X], axis = -1 ), np.full(2, np.nan)
+
+		# Roots of the load and source sections for every Q
+		s1, s2, _Q = [ _a.ravel() for _a in np.meshgrid(signs, signs, Q, indexing = "ij") ]
+
+		if name == "Pi":
+
+			# Virtual resistance below source and load resistances
+			Rv = np.minimum( Rs, 1.0 / ( 1.0 / ZL ).real ) / ( 1.0 + _Q**2 )
+
+			B2, X2 = shuntSeries(ZL, Rv, s2)
+			X1, B1 = seriesShunt(Rv, Rs, s1)
+
+			return np.stack( [B1, X1 + X2, B2], axis = -1 ), _Q
+
+		# T: virtual resistance above source and load resistances
+		Rv = np.maximum( Rs, ZL.real ) * ( 1.0 + _Q**2 )
+
+		X2, B2 = seriesShunt(ZL, Rv, s2)
+		B1, X1 = shuntSeries(Rv, Rs, s1)
+
+		return np.stack( [X1, B1 + B2, X2], axis = -1 ), _Q
+
+	# Reflection coefficient at the source over the band (ntargets, 
+	# nsolutions, nband) from batched ABCD products of the elements. Positive
+	# reactances are inductive (series) or capacitive (shunt) and scale with
+	# f/f0, negative ones with f0/f.
+	def _response(self, name, values, ZLband):
+
+		r = self.ratio
+		values = values.reshape( values.shape[:2] + (-1,) )
+
+		A = np.ones( values.shape[:2] + (len(r),), dtype=complex )
+		B, C, D = np.zeros_like(A), np.zeros_like(A), np.ones_like(A)
+
+		for k, _kind in enumerate( TOPOLOGIES.get(name, []) ):
+
+			_v = values[:, :, k, np.newaxis]
+			_x = 1j * _v * np.where( _v > 0, r, 1.0 / r )
+
+			# Series impedance [[1, Z], [0, 1]] or shunt admittance [[1, 0], [Y, 1]]
+			if _kind == "series":
+				B, D = A * _x + B, C * _x + D
+
+			else:
+				A, C = A + B * _x, C + D * _x
+
+		ZL = ZLband[:, np.newaxis, :]
+
+		# Roots without solution are nan here and dropped by the caller
+		with np.errstate(invalid = "ignore", divide = "ignore"):
+
+			Zin = ( A * ZL + B ) / ( C * ZL + D )
+
+			return ( Zin - self.Rs ) / ( Zin + self.Rs )
+
+	# Contiguous band (Hz) around f0 with |Gamma| <= gammaMax for the band 
+	# responses gamma (ncandidates, nband)
+	def _bandwidth(self, gamma, f0):
+
+		ok = np.abs(gamma) <= self.gammaMax
+		c = ok.shape[1] // 2
+
+		# Run lengths of passing points from the center to either side
+		right, left = ok[:, c:], ok[:, c::-1]
+
+		nright = np.where( right.all(axis = 1), right.shape[1], np.argmin(right, axis = 1) )
+		nleft = np.where( left.all(axis = 1), left.shape[1], np.argmin(left, axis = 1) )
+
+		lo = np.clip( c - nleft + 1, 0, c )
+		hi = np.clip( c + nright - 1, c, ok.shape[1] - 1 )
+
+		return np.where( ok[:, c], f0 * ( self.ratio[hi] - self.ratio[lo] ), 0.0 )
+
+	# Band frequencies and reflection coefficient of candidate i
+	def response(self, i):
+
+		t = self.target[i]
+		values = self.values[i, :self.count[i]].reshape(1, 1, -1)
+
+		return self.f0[t] * self.ratio, self._response( self.topology[i], values, self.ZLband[t:t+1] )[0, 0]
+
+	# Candidate indices ordered by target, then ranked by bandwidth, number
+	# of elements and reflection at f0
+	def _order(self):
+
+		return np.lexsort( ( np.abs(self.gamma), self.count, -self.bandwidth, self.target ) )
+
+	# Candidate indices of a target in ranked order
+	def ranked(self, target = 0):
+
+		i = self._order()
+
+		return i[ self.target[i] == target ]
+
+	# Best candidate index for every target (-1 if there is no solution)
+	def best(self):
+
+		i = self._order()
+		first = np.ones( len(i), dtype=bool )
+		first[1:] = self.target[i][1:] != self.target[i][:-1]
+
+		best = np.full( len(self.ZL), -1, dtype=int )
+		best[ self.target[i][first] ] = i[first]
+
+		return best
+
+	# Element values of candidate i from source to load as (position, 
+	# component, value) with values in H or F. Zero reactances are omitted.
+	def elements(self, i):
+
+		f, z0 = self.f0[ self.target[i] ], self.Rs
+		elements = []
+
+		for _kind, _v in zip( TOPOLOGIES.get( self.topology[i], [] ), self.values[i] ):
+
+			if abs( _v / z0 if _kind == "series" else _v * z0 ) < ZERO:
+				continue
+
+			if _kind == "series":
+				elements.append( (_kind, "L", seriesL(_v / z0, f, z0)) if _v > 0 else (_kind, "C", seriesC(-_v / z0, f, z0)) )
+
+			else:
+				elements.append( (_kind, "C", shuntC(_v * z0, f, z0)) if _v > 0 else (_kind, "L", shuntL(-_v * z0, f, z0)) )
+
+		return elements
+
+	# Ranked solutions of a target as dicts
+	def solutions(self, target = 0, n = None):
+
+		return [ {
+			"topology" 	: self.topology[i],
+			"Q" 		: self.Q[i],
+			"elements" 	: self.elements(i),
+			"bandwidth" : self.bandwidth[i],
+			"fractional": self.bandwidth[i] / self.f0[ self.target[i] ],
+			"gamma" 	: self.gamma[i],
+		} for i in self.ranked(target)[:n] ]
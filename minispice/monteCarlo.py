@@ -0,0 +1,235 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> monteCarlo.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import collections
+import fnmatch
+import numpy as np
+
+from .compiledNetlist import compiledNetlist, STAMP_ROWS, STAMP_COLS, STAMP_SIGNS
+from .nodeMatrix import portReduction, transducerGain
+from .Converter import ytosN
+from .resultStore import resultWriter
+from . import netlistParser
+
+# Default memory budget for one chunk of admittance tensors (bytes)
+MEMORY = 256 * 1024**2
+
+# Monte Carlo analysis of linear element tolerances. Tolerances is a dict of
+# element name (or fnmatch pattern, e.g. "C*") to a relative tolerance:
+#
+#	0.05					uniform in [-5%, 5%]
+#	("uniform", 0.05)		uniform in [-5%, 5%]
+#	("normal", 0.02)		gaussian with 2% standard deviation
+#	("lognormal", 0.02)		lognormal with 2% standard deviation of log(value)
+#
+# Trials are assembled as (ntrials, nfreq, n, n) admittance tensors in chunks
+# bounded by a memory budget. Transistor model parameters are not varied.
+class monteCarlo:
+
+	def __init__(self, compiled, freq, tolerances, seed = None):
+
+		self.compiled = compiled
+		self.freq = np.atleast_1d( np.asarray(freq, dtype=float) )
+
+		# Seedable random number generator
+		self.random = np.random.RandomState(seed)
+
+		# Resolve element names and distributions
+		self.tolerances = collections.OrderedDict()
+
+		for _pattern, _tol in tolerances.items():
+
+			_names = fnmatch.filter(compiled.names, _pattern)
+
+			if not _names:
+				raise ValueError("No linear elements match %s"%_pattern)
+
+			for _name in _names:
+				self.tolerances[_name] = ("uniform", float(_tol)) if np.isscalar(_tol) else ( str(_tol[0]), float(_tol[1]) )
+
+		self.names = list( self.tolerances.keys() )
+		self.index = np.array( [ compiled.index[_name] for _name in self.names ], dtype=int )
+
+		# Base admittance tensor (nominal values)
+		self.ytensor = compiled.tensor(self.freq)
+
+	# Construct from netlist file
+	@classmethod
+	def fromFile(cls, path, freq, tolerances, seed = None):
+
+		return cls( compiledNetlist( netlistParser.parse(path) ), freq, tolerances, seed )
+
+	# Draw element values of shape (ntrials, nelements)
+	def sample(self, ntrials):
+
+		nominal = self.compiled.value[self.index]
+		values = np.empty( (ntrials, len(self.names)) )
+
+		for i, _name in enumerate(self.names):
+
+			_dist, _tol = self.tolerances[_name]
+
+			if _dist == "uniform":
+				values[:, i] = nominal[i] * ( 1.0 + _tol * self.random.uniform(-1.0, 1.0, ntrials) )
+
+			elif _dist == "normal":
+				values[:, i] = nominal[i] * ( 1.0 + _tol * self.random.standard_normal(ntrials) )
+
+			elif _dist == "lognormal":
+				values[:, i] = nominal[i] * np.exp( _tol * self.random.standard_normal(ntrials) )
+
+			else:
+				raise ValueError("Unknown distribution (%s)"%_dist)
+
+		return values
+
+	# Assemble admittance tensors (ntrials, nfreq, n, n) for sampled values
+	def tensor(self, values):
+
+		ytensor = np.empty( (len(values),) + self.ytensor.shape, dtype=complex )
+		ytensor[:] = self.ytensor
+
+		# Admittance change of each varied element (ntrials, nfreq, nelements)
+		kind = self.compiled.kind[self.index]
+		dY = np.empty( (len(values), len(self.freq), len(self.names)), dtype=complex )
+
+		for i in range( len(self.names) ):
+			dY[:, :, i] = self.compiled.admittance(kind[i], values[:, i, np.newaxis], self.freq) - \
+				self.compiled.admittance(kind[i], self.compiled.value[self.index[i]], self.freq)
+
+		# Delta stamps for all elements in one scatter
+		nodes = self.compiled.nodes[self.index]
+
+		rows = nodes[:, STAMP_ROWS].ravel()
+		cols = nodes[:, STAMP_COLS].ravel()
+		elem = np.repeat( np.arange(len(self.names)), 4 )
+		sign = np.tile( STAMP_SIGNS, len(self.names) )
+
+		keep = (rows > 0) & (cols > 0)
+
+		np.add.at(ytensor, (slice(None), slice(None), rows[keep] - 1, cols[keep] - 1), dY[:, :, elem[keep]] * sign[keep])
+
+		return ytensor
+
+	# Number of trials per chunk for a memory budget in bytes. Solving needs
+	# roughly one more tensor worth of workspace.
+	def chunk(self, memory = None):
+
+		memory = MEMORY if memory is None else memory
+
+		return max( 1, int( memory // ( 2 * self.ytensor.nbytes ) ) )
+
+	# Run trials and return twoport statistics between nodes n1 and n2. If keep
+	# is True the sampled twoport admittances are included in the result. If
+	# store is a path the per trial results are written to a result store
+	# (see resultStore.py) and the samples are memory mapped from disk.
+	def run(self, ntrials, n1, n2, Zs = 50., Zl = 50., z0 = 50., percentiles = (5, 50, 95), memory = None, keep = False, store = None):
+
+		values = self.sample(ntrials)
+		chunk = self.chunk(memory)
+
+		# Per trial results
+		if store is not None:
+
+			writer = resultWriter(store, ntrials, {"analysis" : "monteCarlo", "ports" : [n1, n2], "z0" : z0, "Zs" : str(Zs), "Zl" : str(Zl)})
+			writer.write("values", values)
+
+			gain = writer.column("gain", (len(self.freq),), float)
+			sparams = writer.column("S", (len(self.freq), 2, 2), complex)
+			twoport = writer.column("Y", (len(self.freq), 2, 2), complex)
+
+			keep = True
+
+		else:
+			gain = np.empty( (ntrials, len(self.freq)) )
+			sparams = np.empty( (ntrials, len(self.freq), 2, 2), dtype=complex )
+			twoport = np.empty( (ntrials, len(self.freq), 2, 2), dtype=complex ) if keep else None
+
+		try:
+			for i in range(0, ntrials, chunk):
+
+				# Batched port reduction of the chunk
+				tp = portReduction( self.tensor(values[i:i+chunk]), [n1, n2] )
+
+				gain[i:i+chunk] = transducerGain(tp, Zs, Zl)
+				sparams[i:i+chunk] = ytosN(tp, z0)
+
+				if keep:
+					twoport[i:i+chunk] = tp
+
+			# Statistics in chunks of frequencies so stored samples are never
+			# loaded as a whole
+			result = {
+				"freq"	 : self.freq,
+				"values" : collections.OrderedDict( (_name, values[:, i]) for i, _name in enumerate(self.names) ),
+				"gain"	 : self.statistics(gain, percentiles, memory = memory),
+				"S"		 : self.statistics(sparams, percentiles, np.abs, memory),
+			}
+
+		except BaseException:
+			if store is not None:
+				writer.abort()
+
+			raise
+
+		if store is not None:
+			writer.attrs["freq"] = self.freq.tolist()
+			writer.attrs["names"] = self.names
+			writer.close()
+
+		if keep:
+			result["samples"] = {"gain" : gain, "S" : sparams, "Y" : twoport}
+
+		return result
+
+	# Summary statistics over trials (axis 0) of transform(data). Data of 
+	# shape (ntrials, nfreq, ...) is processed in chunks of frequencies that 
+	# fit the memory budget, so memory mapped samples are read piecewise.
+	def statistics(self, data, percentiles, transform = None, memory = None):
+
+		memory = MEMORY if memory is None else memory
+
+		shape = data.shape[1:]
+		stats = dict( ( _key, np.empty(shape) ) for _key in ["mean", "std", "min", "max"] )
+		stats["percentiles"] = collections.OrderedDict( ( p, np.empty(shape) ) for p in percentiles )
+
+		step = max( 1, int( memory // max( 1, data[:, :1].nbytes ) ) )
+
+		for i in range(0, shape[0], step):
+
+			_d = np.asarray( data[:, i:i+step] )
+			_d = transform(_d) if transform is not None else _d
+
+			stats["mean"][i:i+step] = np.mean(_d, axis=0)
+			stats["std"][i:i+step] = np.std(_d, axis=0)
+			stats["min"][i:i+step] = np.min(_d, axis=0)
+			stats["max"][i:i+step] = np.max(_d, axis=0)
+
+			for p in percentiles:
+				stats["percentiles"][p][i:i+step] = np.percentile(_d, p, axis=0)
+
+		return stats
@@ -0,0 +1,548 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> netlistParser.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import collections
+import hashlib
+import os
+import re
+
+import numpy as np
+
+from . import instrument
+
+# Bump when the netlist structure changes to invalidate cached parses
+PARSER_VERSION = "2"
+
+# Default location and size bound (bytes) of the parsed netlist cache
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".minispice", "netlists")
+MAX_SIZE = 256 * 1024**2
+
+# Engineering suffixes
+SUFFIX = {
+	"t"   : 1e12,
+	"g"   : 1e9,
+	"meg" : 1e6,
+	"k"   : 1e3,
+	"m"   : 1e-3,
+	"mil" : 25.4e-6,
+	"u"   : 1e-6,
+	"n"   : 1e-9,
+	"p"   : 1e-12,
+	"f"   : 1e-15,
+}
+
+# Precompiled patterns. Values may carry a suffix followed by trailing unit
+# letters which are ignored as in SPICE (e.g. 10pF, 1.5kOhm)
+_VALUE   = re.compile(r'^([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(meg|mil|[tgkmunpf])?[a-z]*$', re.IGNORECASE)
+_COMMENT = re.compile(r'[;$].*$')
+_NODE    = re.compile(r'^\d+$')
+
+# Number of nodes expected for each element type
+NODES = {
+	"R" : 2,
+	"C" : 2,
+	"L" : 2,
+	"G" : 4,
+	"Q" : 3
+}
+
+# Exception raised for malformed netlists. Carries file and line information
+class NetlistError(ValueError):
+
+	def __init__(self, message, path = None, line = None):
+
+		self.message = message
+		self.path = path
+		self.line = line
+
+		if path is not None and line is not None:
+			message = "%s:%d: %s"%(path, line, message)
+
+		elif path is not None:
+			message = "%s: %s"%(path, message)
+
+		super(NetlistError, self).__init__(message)
+
+# Parsed netlist. Components are stored in the format consumed by freqAnalysis
+class netlist:
+
+	def __init__(self, path = None):
+
+		# Path of top level netlist
+		self.path = path
+
+		# Dictionary to hold components
+		self.components = collections.OrderedDict()
+
+		# Size of admittance matrix (largest node number)
+		self.size = 0
+
+		# List of (path, digest) for all files read during parsing
+		self.sources = []
+
+		# Dictionary of subcircuit definitions
+		self.subcircuits = collections.OrderedDict()
+
+	# Add a component to the netlist
+	def add(self, name, nodes, value):
+
+		self.components[name] = {"nodes" : nodes, "value" : value}
+
+		if max(nodes) > self.size:
+			self.size = max(nodes)
+
+# Subcircuit definition. Ports are local node numbers in the order they are
+# connected by X instances. Node 0 is the global ground.
+class subcircuit(netlist):
+
+	def __init__(self, name, ports, path = None):
+
+		netlist.__init__(self, path)
+
+		self.name = name
+		self.ports = ports
+
+		if ports and max(ports) > self.size:
+			self.size = max(ports)
+
+# Convert a value token into a float. Returns None if token is not numeric
+def toValue(token):
+
+	match = _VALUE.match(token)
+
+	if match is None:
+		return None
+
+	value = float( match.group(1) )
+
+	if match.group(2) is not None:
+		value *= SUFFIX[ match.group(2).lower() ]
+
+	return value
+
+# Digest of file contents
+def digest(data):
+
+	return hashlib.sha1(data).hexdigest()
+
+# Read a file in one bulk read. Returns decoded text and digest
+def _read(path):
+
+	try:
+		with open(path, 'rb') as f:
+			data = f.read()
+
+	except (IOError, OSError) as e:
+		raise NetlistError("unable to read netlist (%s)"%e.strerror, path)
+
+	return data.decode("utf-8", "replace"), digest(data)
+
+# Split text into logical lines. Strips comments and joins continuation
+# lines. Returns list of (line number, tokens)
+def _logical(text, path):
+
+	lines = []
+
+	for number, line in enumerate(text.splitlines(), 1):
+
+		# Full line comments
+		line = line.strip()
+		if not line or line[0] == '*':
+			continue
+
+		# Inline comments
+		line = _COMMENT.sub('', line).strip()
+		if not line:
+			continue
+
+		# Continuation of previous line
+		if line[0] == '+':
+
+			if not lines:
+				raise NetlistError("continuation without preceding line", path, number)
+
+			lines[-1][1].extend( line[1:].split() )
+
+		else:
+			lines.append( (number, line.split()) )
+
+	return lines
+
+# Parse a list of node tokens
+def toNodes(name, tokens):
+
+	for _node in tokens:
+		if _NODE.match(_node) is None:
+			raise NetlistError("invalid node %s in %s"%(_node, name))
+
+	return [ int(n) for n in tokens ]
+
+# Parse the logical lines from one file into netlist. Scope holds the netlist
+# or subcircuit definition that elements are currently added to.
+def _parse(_netlist, text, path, stack, scope):
+
+	for number, tokens in _logical(text, path):
+
+		if not tokens:
+			continue
+
+		name = tokens[0]
+
+		try:
+
+			# Control statements
+			if name[0] == '.':
+
+				_control = name.lower()
+
+				if _control == ".end":
+
+					if scope[-1] is not _netlist:
+						raise NetlistError(".end inside .subckt %s"%scope[-1].name)
+
+					return True
+
+				elif _control == ".include":
+
+					if len(tokens) != 2:
+						raise NetlistError(".include expects one file name")
+
+					# Included files are relative to the including file
+					_path = tokens[1].strip('"\'')
+					_path = os.path.join( os.path.dirname(path), _path )
+
+					if os.path.abspath(_path) in stack:
+						raise NetlistError("recursive .include of %s"%_path)
+
+					_text, _digest = _read(_path)
+					_netlist.sources.append( (_path, _digest) )
+
+					if _parse(_netlist, _text, _path, stack + [os.path.abspath(_path)], scope):
+						return True
+
+				elif _control == ".subckt":
+
+					if scope[-1] is not _netlist:
+						raise NetlistError("nested .subckt definitions are not supported")
+
+					if len(tokens) < 3:
+						raise NetlistError(".subckt expects a name and at least one port")
+
+					if tokens[1] in _netlist.subcircuits:
+						raise NetlistError("duplicate subcircuit %s"%tokens[1])
+
+					_ports = toNodes(tokens[1], tokens[2:])
+
+					if 0 in _ports or len(set(_ports)) != len(_ports):
+						raise NetlistError("subcircuit ports must be distinct non-zero nodes")
+
+					_subcircuit = subcircuit(tokens[1], _ports, path)
+					_netlist.subcircuits[tokens[1]] = _subcircuit
+					scope.append(_subcircuit)
+
+				elif _control == ".ends":
+
+					if scope[-1] is _netlist:
+						raise NetlistError(".ends without .subckt")
+
+					if len(tokens) > 1 and tokens[1] != scope[-1].name:
+						raise NetlistError(".ends %s does not match .subckt %s"%(tokens[1], scope[-1].name))
+
+					scope.pop()
+
+				else:
+					raise NetlistError("unsupported control statement %s"%name)
+
+			# Subcircuit instances
+			elif name[0].upper() == 'X':
+
+				if len(tokens) < 3:
+					raise NetlistError("%s expects nodes and a subcircuit name"%name)
+
+				if name in scope[-1].components:
+					raise NetlistError("duplicate element %s"%name)
+
+				scope[-1].add(name, toNodes(name, tokens[1:-1]), str(tokens[-1]))
+
+			# Elements
+			else:
+
+				_type = name[0].upper()
+
+				if _type not in NODES:
+					raise NetlistError("unknown element type %s"%name)
+
+				if len(tokens) != NODES[_type] + 2:
+					raise NetlistError("%s expects %d nodes and a value (got %d fields)"%(name, NODES[_type], len(tokens) - 1))
+
+				if name in scope[-1].components:
+					raise NetlistError("duplicate element %s"%name)
+
+				# Nodes are non-negative integers
+				_nodes = toNodes(name, tokens[1:-1])
+
+				# Transistors take a model name. Otherwise numeric values
+				if _type == "Q":
+					_value = str(tokens[-1])
+
+				else:
+					_value = toValue(tokens[-1])
+
+					if _value is None:
+						raise NetlistError("invalid value %s for %s"%(tokens[-1], name))
+
+				scope[-1].add(name, _nodes, _value)
+
+		# Attach location to diagnostics
+		except NetlistError as e:
+
+			if e.line is None:
+				raise NetlistError(e.message, path, number)
+			raise
+
+	return False
+
+# Check that all subcircuit definitions were closed
+def _close(scope, path):
+
+	if len(scope) > 1:
+		raise NetlistError("missing .ends for .subckt %s"%scope[-1].name, path)
+
+# Parse netlist from a string
+def parseString(text, path = "<string>"):
+
+	_netlist = netlist(path)
+	_scope = [_netlist]
+
+	if not _parse(_netlist, text, path, [], _scope):
+		_close(_scope, path)
+
+	return _netlist
+
+# Parse netlist from a file. If cache is True or a directory then the parsed
+# netlist is stored on disk keyed by content hash and reused on later calls.
+# The least recently used entries are evicted beyond maxsize bytes.
+@instrument.timed("parse")
+def parse(path, cache = None, maxsize = MAX_SIZE):
+
+	text, _digest = _read(path)
+
+	if cache:
+
+		# Cache location
+		_dir = CACHE_DIR if cache is True else str(cache)
+		_key = digest( (PARSER_VERSION + _digest + os.path.abspath(path)).encode("utf-8") )
+		_file = os.path.join(_dir, _key + ".npz")
+
+		_netlist = _load(_file)
+
+		if _netlist is not None:
+			return _netlist
+
+	# Parse file
+	_netlist = netlist(path)
+	_netlist.sources.append( (path, _digest) )
+	_scope = [_netlist]
+
+	if not _parse(_netlist, text, path, [os.path.abspath(path)], _scope):
+		_close(_scope, path)
+
+	if cache:
+		_store(_file, _netlist)
+		evict(_dir, maxsize)
+
+	return _netlist
+
+# Flatten a parsed netlist into arrays. Scope 0 is the top level netlist and
+# scopes 1, 2 ... are the subcircuit definitions. Nodes and ports of all 
+# elements are concatenated with their counts alongside. Elements taking a
+# name (transistor models and subcircuits) store it in model.
+def _toArrays(_netlist):
+
+	scopes = [_netlist] + list( _netlist.subcircuits.values() )
+	names, scope, value, model, nodes, nnodes = [], [], [], [], [], []
+
+	for i, _scope in enumerate(scopes):
+		for _name, _component in _scope.components.items():
+
+			_value = _component["value"]
+
+			names.append(_name)
+			scope.append(i)
+			value.append( float("nan") if isinstance(_value, str) else _value )
+			model.append( _value if isinstance(_value, str) else "" )
+			nodes.extend( _component["nodes"] )
+			nnodes.append( len(_component["nodes"]) )
+
+	return {
+		"path"		: np.array( [ str(_netlist.path) ] ),
+		"names"		: np.array( names, dtype = str ),
+		"scope"		: np.array( scope, dtype = int ),
+		"value"		: np.array( value, dtype = float ),
+		"model"		: np.array( model, dtype = str ),
+		"nodes"		: np.array( nodes, dtype = int ),
+		"nnodes"	: np.array( nnodes, dtype = int ),
+		"subnames"	: np.array( [ _sub.name for _sub in scopes[1:] ], dtype = str ),
+		"subpaths"	: np.array( [ str(_sub.path) for _sub in scopes[1:] ], dtype = str ),
+		"ports"		: np.array( [ _port for _sub in scopes[1:] for _port in _sub.ports ], dtype = int ),
+		"nports"	: np.array( [ len(_sub.ports) for _sub in scopes[1:] ], dtype = int ),
+		"sources"	: np.array( [ _path for _path, _digest in _netlist.sources ], dtype = str ),
+		"digests"	: np.array( [ _digest for _path, _digest in _netlist.sources ], dtype = str ),
+	}
+
+# Rebuild a parsed netlist from the arrays of _toArrays
+def _fromArrays(arrays):
+
+	_netlist = netlist( str(arrays["path"][0]) )
+	_netlist.sources = list( zip( arrays["sources"].tolist(), arrays["digests"].tolist() ) )
+
+	scopes = [_netlist]
+	ports, start = arrays["ports"].tolist(), 0
+
+	for _name, _path, _nports in zip( arrays["subnames"].tolist(), arrays["subpaths"].tolist(), arrays["nports"].tolist() ):
+
+		_subcircuit = subcircuit( _name, ports[start:start + _nports], _path )
+		_netlist.subcircuits[_name] = _subcircuit
+		scopes.append(_subcircuit)
+
+		start += _nports
+
+	nodes, start = arrays["nodes"].tolist(), 0
+
+	for _name, _scope, _value, _model, _nnodes in zip( *[ arrays[_key].tolist() for _key in ("names", "scope", "value", "model", "nnodes") ] ):
+
+		scopes[_scope].add( _name, nodes[start:start + _nnodes], _model if _model else _value )
+		start += _nnodes
+
+	return _netlist
+
+# Digest of the cached arrays in key order
+def _checksum(arrays):
+
+	h = hashlib.sha1()
+
+	for _key in sorted(arrays):
+		h.update( _key.encode("utf-8") )
+		h.update( np.ascontiguousarray( arrays[_key] ).tobytes() )
+
+	return h.hexdigest()
+
+# Load a cached netlist. Returns None on miss, if the entry is corrupt or if
+# an included file changed. Entries are plain arrays and never unpickled.
+def _load(_file):
+
+	if not os.path.isfile(_file):
+		return None
+
+	try:
+		with np.load(_file, allow_pickle = False) as f:
+			arrays = dict( (_key, f[_key]) for _key in f.files )
+
+		if str( arrays.pop("checksum")[0] ) != _checksum(arrays):
+			return None
+
+		_netlist = _fromArrays(arrays)
+
+	except Exception:
+		return None
+
+	# Validate included files
+	for _path, _digest in _netlist.sources[1:]:
+
+		try:
+			with open(_path, 'rb') as f:
+				if digest( f.read() ) != _digest:
+					return None
+
+		except (IOError, OSError):
+			return None
+
+	# Mark as recently used
+	try:
+		os.utime(_file, None)
+
+	except OSError:
+		pass
+
+	return _netlist
+
+# Store a parsed netlist in the cache (atomic replace)
+def _store(_file, _netlist):
+
+	arrays = _toArrays(_netlist)
+	arrays["checksum"] = np.array( [ _checksum(arrays) ] )
+
+	try:
+		if not os.path.isdir( os.path.dirname(_file) ):
+			os.makedirs( os.path.dirname(_file) )
+
+		_tmp = "%s.%d.tmp"%(_file, os.getpid())
+
+		with open(_tmp, 'wb') as f:
+			np.savez(f, **arrays)
+
+		os.replace(_tmp, _file)
+
+	# Caching is best effort
+	except (IOError, OSError):
+		pass
+
+# Cached netlists in a cache directory as (last used, size, path)
+def entries(cache = True):
+
+	_dir = CACHE_DIR if cache is True else str(cache)
+
+	if not os.path.isdir(_dir):
+		return []
+
+	_files = [ os.path.join(_dir, _name) for _name in os.listdir(_dir) if _name.endswith(".npz") ]
+
+	return [ ( os.path.getmtime(_file), os.path.getsize(_file), _file ) for _file in _files if os.path.isfile(_file) ]
+
+# Remove least recently used cached netlists until the cache fits in maxsize
+def evict(cache = True, maxsize = MAX_SIZE):
+
+	_entries = sorted( entries(cache) )
+	size = sum( _size for _time, _size, _file in _entries )
+
+	for _time, _size, _file in _entries:
+
+		if size <= maxsize:
+			break
+
+		try:
+			os.remove(_file)
+
+		except OSError:
+			pass
+
+		size -= _size
+
+# Remove all cached netlists
+def clear(cache = True):
+
+	evict(cache, -1)
@@ -31,11 +31,233 @@ import copy
 import re
 import os
 
+from . import instrument
+
+# Boltzmann constant (J/K) and standard noise temperature (K)
+BOLTZMANN = 1.380649e-23
+T0 = 290.0
+
+# Method to extract params from a *.model file 
+def readModel(name, path = None):
+	params = {}
+	path = os.getcwd() if path is None else path
+	path = path + os.path.sep + name + '.model'
+	
+	with open(path, 'r') as f:
+		data = [line.split() for line in f]
+	
+	for i,lst in enumerate(data):
+		params[str(lst[0])] = float(lst[1])
+	
+	return params
+
+# Transistor admittance block ordered (b, c, e). Frequency may be an array in 
+# which case the block has shape freq.shape + (3,3)
+@instrument.timed("transistorStamp")
+def transistorStamp(model, params, freq):
+
+	w = 2 * math.pi * np.asarray(freq, dtype=float)
+	z = np.zeros_like(w, dtype=complex)
+
+	g  = lambda r : complex(1/r) + z
+	bc = lambda c : 1j * w * c
+
+	# Simple Model with only b and rbe
+	if model == 'simple':
+
+		b=float(params['b'])
+		rbe=float(params['rbe'])
+
+		block = [
+			[ g(rbe),          z, -g(rbe)         ],	# Base
+			[ b*g(rbe),        z, -b*g(rbe)       ],	# Collector
+			[ -(b+1)*g(rbe),   z, (b+1)*g(rbe)    ],	# Emitter
+		]
+
+	# Intrinsic transistor pi model
+	elif model == 'hybridpi':
+
+		gm = float(params['gm'])
+		r0 = float(params['rce'])
+		rpi= float(params['rbe'])
+		cpi= float(params['cbei'])
+		cmu= float(params['cbc'])
+
+		block = [
+			[ (g(rpi)+bc(cpi)+bc(cmu)),  z,       -(g(rpi)+bc(cpi)+bc(cmu))        ],	# Base
+			[ (gm-bc(cmu)),              g(r0),   (bc(cmu)-g(r0)-gm)               ],	# Collector
+			[ -(g(rpi)+bc(cpi)+gm),      -g(r0),  (g(rpi)+bc(cpi)+g(r0)+gm)        ],	# Emitter
+		]
+
+	# Transistor with base spreading resistance
+	elif model == 'hybridpix':
+
+		gm = float(params['gm'])
+		rce = float(params['rce'])
+		rbe= float(params['rbe'])
+		cbe= float(params['cbe'])
+		cbc= float(params['cbc'])
+		rbb = float(params['rbb'])
+
+		# Construct the CE admittance parameters
+		y11 = (g(rbe)+bc(cbe)+bc(cbc))
+		y12 = z
+		y21 = (gm-bc(cbc))
+		y22 = g(rce)
+		rbbDce = (rbb*((y11*y22)-(y21*y12)))
+		s = (1/(1+y11*rbb))
+
+		block = [
+			[ ((y11)*s),        ((y12)*s),                -((y11+y12)*s)                     ],	# Base
+			[ ((y21)*s),        ((y22+rbbDce)*s),         -((y21+y22+rbbDce)*s)              ],	# Collector
+			[ -((y11+y21)*s),   -((y12+y22+rbbDce)*s),    ((y11+y22+y12+y21+rbbDce)*s)       ],	# Emitter
+		]
+
+	else:
+		raise ValueError("Unknown transistor model (%s)"%model)
+
+	# Move the (3,3) block axes last
+	return np.moveaxis( np.array(block, dtype=complex), [0, 1], [-2, -1] )
+
+# Correlation matrix (single sided PSD, A^2/Hz) of the short circuit noise 
+# currents injected at the (b, c, e) terminals of a transistor, shape 
+# freq.shape + (3,3). Base and collector shot noise 2qIb and 2qIc follow
+# from the small signal parameters with Ic = gm kT/q and Ib = Ic/(gm rbe),
+# i.e. 2kT/rbe between base and emitter and 2kT gm between collector and
+# emitter. For hybridpix the base spreading resistance adds thermal noise 
+# 4kT/rbb and the sources at the internal base are mapped to the terminals.
+@instrument.timed("transistorNoise")
+def transistorNoise(model, params, freq, T = T0):
+
+	w = 2 * math.pi * np.asarray(freq, dtype=float)
+	z = np.zeros_like(w, dtype=complex)
+	kT = BOLTZMANN * T
+
+	if model == 'simple':
+		rbe = float(params['rbe'])
+		gm = float(params['b']) / rbe
+
+	elif model in ('hybridpi', 'hybridpix'):
+		rbe = float(params['rbe'])
+		gm = float(params['gm'])
+
+	else:
+		raise ValueError("Unknown transistor model (%s)"%model)
+
+	# Incidence of the base and collector sources at (b, c, e)
+	ab = np.array([ 1.0 + z, z, -1.0 + z ])
+	ac = np.array([ z, 1.0 + z, -1.0 + z ])
+	sources = [ (ab, 2.0 * kT / rbe), (ac, 2.0 * kT * gm) ]
+
+	if model == 'hybridpix':
+
+		rbb = float(params['rbb'])
+
+		# Currents injected at the internal base divide between the terminals
+		# as t = (s, -y21 s rbb, (y11 + y21) s rbb), see transistorStamp
+		y11 = 1.0 / rbe + 1j * w * ( float(params['cbe']) + float(params['cbc']) )
+		y21 = gm - 1j * w * float(params['cbc'])
+		s = 1.0 / ( 1.0 + y11 * rbb )
+
+		t = np.array([ s, -y21 * s * rbb, (y11 + y21) * s * rbb ])
+
+		sources = [ ( t - np.array([ z, z, 1.0 + z ]), 2.0 * kT / rbe ), (ac, 2.0 * kT * gm), ( np.array([ 1.0 + z, z, z ]) - t, 4.0 * kT / rbb ) ]
+
+	C = sum( _S * _a[:, np.newaxis] * _a[np.newaxis, :].conj() for _a, _S in sources )
+
+	# Move the (3,3) axes last
+	return np.moveaxis( C, [0, 1], [-2, -1] )
+
+# Reduce admittance matrices of shape (..., n, n) to a list of port nodes by
+# eliminating all other nodes (Schur complement). Ground is the reference. 
+# For two ports this is equivalent to the cofactor method in toTwoport.
+@instrument.timed("portReduction")
+def portReduction(ymatrix, ports):
+
+	p = np.asarray(ports, dtype=int) - 1
+
+	if len( np.unique(p) ) != len(p) or np.any(p < 0) or np.any(p >= ymatrix.shape[-1]):
+		raise ValueError("Invalid port nodes %s for %d nodes"%(list(ports), ymatrix.shape[-1]))
+
+	i = np.setdiff1d(np.arange(ymatrix.shape[-1]), p)
+
+	Ypp = ymatrix[..., p[:,None], p]
+
+	# Nothing to eliminate 
+	if len(i) == 0:
+		return Ypp.copy()
+
+	Ypi = ymatrix[..., p[:,None], i]
+	Yip = ymatrix[..., i[:,None], p]
+	Yii = ymatrix[..., i[:,None], i]
+
+	return Ypp - np.matmul(Ypi, np.linalg.solve(Yii, Yip))
+
+# Transfer impedances from unit currents injected at input nodes (1-based)
+# to all nodes. One LU factorization per frequency is shared by all inputs 
+# (multiple right hand sides). Returns (..., n, ninputs) for admittance 
+# matrices (..., n, n).
+@instrument.timed("transferImpedances")
+def transferImpedances(ymatrix, inputs):
+
+	p = np.atleast_1d( np.asarray(inputs, dtype=int) ) - 1
+
+	if np.any(p < 0) or np.any(p >= ymatrix.shape[-1]):
+		raise ValueError("Invalid input nodes %s for %d nodes"%(list(p + 1), ymatrix.shape[-1]))
+
+	B = np.zeros( (ymatrix.shape[-1], len(p)), dtype=complex )
+	B[p, np.arange(len(p))] = 1.0
+
+	return np.linalg.solve( ymatrix, np.broadcast_to( B, ymatrix.shape[:-2] + B.shape ) )
+
+# Node voltages (..., n) for currents injected at input nodes. Currents has
+# shape (ninputs,) or (..., ninputs) and defaults to 1 A at every input.
+def nodeVoltages(ymatrix, inputs, currents = 1.0):
+
+	Z = transferImpedances(ymatrix, inputs)
+	currents = np.broadcast_to( np.asarray(currents, dtype=complex), Z.shape[:-2] + Z.shape[-1:] )
+
+	return np.matmul( Z, currents[..., np.newaxis] )[..., 0]
+
+# Voltage gain from node n1 to all nodes (..., n). Entry n2 - 1 equals 
+# nodeMatrix.voltageGain(n1, n2).
+def voltageGains(ymatrix, n1):
+
+	Z = transferImpedances(ymatrix, [n1])[..., 0]
+
+	return Z / Z[..., n1 - 1, np.newaxis]
+
+# Every pairwise twoport of N-port admittance matrices (..., N, N). Returns 
+# a dict of (i, j) port index pairs (0-based, i < j) to twoport admittance 
+# matrices (..., 2, 2) with the remaining ports open. Each twoport is a Schur 
+# complement of the small port matrix, so the circuit is factored only once.
+def pairwiseTwoports(ynport):
+
+	n = ynport.shape[-1]
+
+	return dict(
+		( (i, j), portReduction(ynport, [i + 1, j + 1]) ) for i in range(n) for j in range(i + 1, n)
+	)
+
+# Transducer gain of twoport admittance matrices (..., 2, 2) connected to
+# source and load impedances
+def transducerGain(tp, Zs = 50., Zl = 50.):
+
+	# Source and load admittances
+	Ys = complex(1./Zs)
+	Yl = complex(1./Zl)
+
+	# calculate twoport gain between nodes
+	num = 4.0 * Ys.real * Yl.real * np.abs(tp[...,1,0])**2 
+	den = np.abs( ( tp[...,0,0] + Ys ) * ( tp[...,1,1] + Yl ) - tp[...,0,1] * tp[...,1,0] )**2
+
+	return num / den
+
 # Node admittace matrix class
 class nodeMatrix: 
 
-	def __init__(self, size, freq): 
-		self.ymatrix = np.zeros(shape=(size,size),dtype=complex)
+	def __init__(self, size, freq, ymatrix = None): 
+		self.ymatrix = np.zeros(shape=(size,size),dtype=complex) if ymatrix is None else ymatrix
 		self.freq = float(freq)
 		self.size = size
 
@@ -130,107 +352,21 @@ class nodeMatrix:
 	# Method for adding a transistor
 	def addTransistor(self,name, nb, nc, ne, model): 
 		
-		nb-=1
-		nc-=1
-		ne-=1
-
-		# Simple Model with only b and rbe
-		g = lambda r : complex(1/r) 
-		if model == 'simple':
-			# Extract transistor parameters out of params dict			
-			params = self.getModel('simple')
-			b=float(params['b'])
-			rbe=float(params['rbe'])
-			# Base
-			self.ymatrix[nb,nb]+=g(rbe)
-			self.ymatrix[nb,nc]+=0
-			self.ymatrix[nb,ne]-=g(rbe)
-			# Collector
-			self.ymatrix[nc,nb]+=b*g(rbe)
-			self.ymatrix[nc,nc]+=0
-			self.ymatrix[nc,ne]-=b*g(rbe)
-			# Emitter
-			self.ymatrix[ne,nb]-=(b+1)*g(rbe)
-			self.ymatrix[ne,nc]+=0
-			self.ymatrix[ne,ne]+=(b+1)*g(rbe)
-
-		# Intrinsic transistor pi model
-		g  = lambda r : complex(1/r) 
-		bc = lambda c : complex(0,2*math.pi*self.freq*c) 
-		if model == 'hybridpi':
-			# Extract transistor parameters out of params dict			
-			params = self.getModel('hybridpi')
-			
-			gm = float(params['gm'])
-			r0 = float(params['rce'])
-			rpi= float(params['rbe'])
-			cpi= float(params['cbei'])
-			cmu= float(params['cbc'])
-
-			# Base
-			self.ymatrix[nb,nb]+=(g(rpi)+bc(cpi)+bc(cmu))
-			self.ymatrix[nb,nc]+=0
-			self.ymatrix[nb,ne]-=(g(rpi)+bc(cpi)+bc(cmu)) 
-			# Collector
-			self.ymatrix[nc,nb]+=(gm-bc(cmu))
-			self.ymatrix[nc,nc]+=g(r0)
-			self.ymatrix[nc,ne]+=(bc(cmu)-g(r0)-gm)
-			# Emitter
-			self.ymatrix[ne,nb]-=((g(rpi)+bc(cpi)+gm))
-			self.ymatrix[ne,nc]-=g(r0)
-			self.ymatrix[ne,ne]+=(g(rpi)+bc(cpi)+g(r0)+gm)
-
-
-		#Transistor with base spreading resistance
-		g  = lambda r : complex(1/r) 
-		bc = lambda c : complex(0,2*math.pi*self.freq*c)
-		if model == 'hybridpix':
-			# Extract transistor parameters out of params dict			
-			params = self.getModel('hybridpix')
-			
-			gm = float(params['gm'])
-			rce = float(params['rce'])
-			rbe= float(params['rbe'])
-			cbe= float(params['cbe'])
-			cbc= float(params['cbc'])
-			rbb = float(params['rbb'])
-
-			# Construct the CE admittance parameters
-			y11 = (g(rbe)+bc(cbe)+bc(cbc))
-			y12 = 0
-			y21 = (gm-bc(cbc))
-			y22 = g(rce)
-			rbbDce = (rbb*((y11*y22)-(y21*y12)))
-			s = (1/(1+y11*rbb))
-
-			# Base
-			self.ymatrix[nb,nb]+=((y11)*s)
-			self.ymatrix[nb,nc]+=((y12)*s)
-			self.ymatrix[nb,ne]-=((y11+y12)*s)
-			# Collector
-			self.ymatrix[nc,nb]+=((y21)*s)
-			self.ymatrix[nc,nc]+=((y22+rbbDce)*s)
-			self.ymatrix[nc,ne]-=((y21+y22+rbbDce)*s)
-			# Emitter
-			self.ymatrix[ne,nb]-=((y11+y21)*s)
-			self.ymatrix[ne,nc]-=((y12+y22+rbbDce)*s)
-			self.ymatrix[ne,ne]+=((y11+y22+y12+y21+rbbDce)*s)
+		# Admittance block for (b, c, e) from model parameters
+		block = transistorStamp(model, self.getModel(model), self.freq)
 
+		# Stamp block into matrix (ground rows and columns are dropped)
+		for i, ni in enumerate([nb, nc, ne]):
+			for j, nj in enumerate([nb, nc, ne]):
+				if ni != 0 and nj != 0:
+					self.ymatrix[ni-1, nj-1] += block[i, j]
 
 	# Method to extract params from a *.model file 
 	def getModel(self,name):
-		params = {}
-		path = os.getcwd()+ os.path.sep + name + '.model'
-		
-		with open(path, 'r') as f:
-			data = [line.split() for line in f]
-		
-		for i,lst in enumerate(data):
-			params[str(lst[0])] = float(lst[1])
-		
-		return params
+		return readModel(name)
 
 	# Method to calculate cofactors Dij
+	@instrument.timed("nodeMatrix.cofactor")
 	def cofactorN(self,i,j): 
 		try:
 			if i<1 or j<1:
@@ -247,8 +383,8 @@ class nodeMatrix:
 		# Store copy of Y matrix and remove rows i and j
 		# Need deep copy so operations on A dont change ymatrix
 		A = copy.deepcopy(self.ymatrix)
-		A[i,:] = np.NaN
-		A[:,j] = np.NaN
+		A[i,:] = np.nan
+		A[:,j] = np.nan
 		
 		Am = np.ma.masked_invalid(A)
 		Am = np.ma.compressed(Am)
@@ -256,6 +392,7 @@ class nodeMatrix:
 		return np.linalg.det(Am)*((-1)**toPower)
 	
 	# Method to calculate cofactor Dii,jj
+	@instrument.timed("nodeMatrix.cofactor")
 	def cofactorD(self,i,j): 
 		
 		#Check bounds of cofactor index
@@ -277,10 +414,10 @@ class nodeMatrix:
 		j-=1
 		# Store copy of Y matrix and delete rows using NaN mask
 		A = copy.deepcopy(self.ymatrix)
-		A[i,:] = np.NaN
-		A[j,:] = np.NaN
-		A[:,i] = np.NaN
-		A[:,j] = np.NaN
+		A[i,:] = np.nan
+		A[j,:] = np.nan
+		A[:,i] = np.nan
+		A[:,j] = np.nan
 
 		# Compress out the remaning data
 		Am = np.ma.masked_invalid(A)
@@ -291,6 +428,7 @@ class nodeMatrix:
 		return np.linalg.det(Am)
 
 	# Method which calculates cofactors and returns the corresponding twoport parameters
+	@instrument.timed("nodeMatrix.toTwoport")
 	def toTwoport(self, n1, n2):
 
 		# Initialize 2x2 matrix of zeros
@@ -305,27 +443,33 @@ class nodeMatrix:
 		twoport=twoport/Delta
 		return twoport
 
+	# Method which eliminates all nodes except ports (Schur complement) and 
+	# returns the port admittance matrix
+	def reduce(self, ports):
+		return portReduction(self.ymatrix, ports)
+
 	# Calculate node gain
+	@instrument.timed("nodeMatrix.voltageGain")
 	def voltageGain(self, n1, n2):
 
 		#The voltage gain is given by the ratio of cofactors
 		return self.cofactorN(n1,n2) / self.cofactorN(n1,n1)
 
+	# Voltage gain from n1 to all nodes with one factorization
+	def voltageGains(self, n1):
+		return voltageGains(self.ymatrix, n1)
+
+	# Node voltages for currents injected at input nodes
+	def nodeVoltages(self, inputs, currents = 1.0):
+		return nodeVoltages(self.ymatrix, inputs, currents)
+
 	# Calculate gain in a network
 	def networkGain(self, n1, n2, Zs = 50., Zl = 50.):
 
 		# Compress admittance matrix to twoport
 		tp = self.toTwoport(n1,n2)
 
-		# Source and load admittances
-		Ys = complex(1./Zs)
-		Yl = complex(1./Zl)
-
-		# calculate twoport gain between nodes
-		num = 4.0 * Ys.real * Yl.real * np.abs(tp[1,0])**2 
-		den = np.abs( ( tp[0,0] + Ys ) * ( tp[1,1] + Yl ) - tp[0,1] * tp[1,0] )**2
-
-		return num / den
+		return transducerGain(tp, Zs, Zl)
 
 	# Calculate twoport input impedace given a certain load 
 	def inputImpedance(self, n1, n2, Zl = 50.):
@@ -0,0 +1,156 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> noise.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+
+from .nodeMatrix import transistorNoise, BOLTZMANN, T0
+from .sensitivity import _gather
+from . import instrument
+
+# Correlation matrices (nfreq, m, m) of the noise voltages w^T i produced by
+# all noise sources for the adjoint solutions W (nfreq, size, m). Sources are
+# thermal noise 4kT/R of resistors and the transistor noise currents of 
+# transistorNoise. Capacitors, inductors and controlled sources are noiseless.
+def noiseVoltages(compiled, W, freq, T = T0):
+
+	if compiled.macromodels:
+		raise ValueError("Noise analysis does not support reduced subcircuits")
+
+	freq = np.atleast_1d( np.asarray(freq, dtype = float) )
+
+	# Resistors
+	resistors = np.nonzero( compiled.kind == "R" )[0]
+	nodes = compiled.nodes[resistors]
+
+	D = _gather(W, nodes[:, 0]) - _gather(W, nodes[:, 1])
+	S = 4.0 * BOLTZMANN * T / compiled.value[resistors]
+
+	C = np.einsum('frk,r,frl->fkl', D, S, D.conj())
+
+	# Transistors
+	for _model, _tr in compiled.transistors.items():
+
+		Ct = transistorNoise(_model, compiled.model(_model), freq, T)
+		Wt = np.stack( [ _gather(W, _tr["nodes"][:, i]) for i in range(3) ], axis = 2 )
+
+		C += np.einsum('ftik,fij,ftjl->fkl', Wt, Ct, Wt.conj())
+
+	return C
+
+# Open circuit noise voltage correlation (nfreq, k, k) at port nodes and the
+# port impedance matrices (nfreq, k, k). The transfer from a current injected 
+# at any node to the port voltages is a row of Y^-1, so one adjoint solve 
+# Y^T W = P per frequency (k right hand sides) covers all noise sources. 
+@instrument.timed("noise")
+def portNoise(compiled, ytensor, freq, ports, T = T0):
+
+	p = np.asarray(ports, dtype = int) - 1
+
+	P = np.zeros( (compiled.size, len(p)) )
+	P[p, np.arange(len(p))] = 1.0
+
+	W = np.linalg.solve( np.swapaxes(ytensor, -1, -2), P )
+
+	return noiseVoltages(compiled, W, freq, T), np.swapaxes( W[:, p, :], -1, -2 )
+
+# Noise factor for source admittances Ys from noise parameters. All 
+# arguments broadcast.
+def noiseFactor(Ys, Fmin, Rn, Yopt):
+
+	Ys = np.asarray(Ys, dtype = complex)
+	return Fmin + Rn / Ys.real * np.abs( Ys - Yopt )**2
+
+# Noise analysis of the twoport between n1 and n2 over a sweep. Noise 
+# voltages at the ports come from one adjoint solve per frequency (see 
+# portNoise) and are converted to the chain (ABCD) representation with an 
+# input noise voltage u and current i (Hillbrand and Russer). Noise 
+# parameters are arrays over frequency:
+#
+#	Fmin, NFmin		minimum noise factor and figure (dB)
+#	Rn				equivalent noise resistance
+#	Yopt, Gopt		optimum source admittance and reflection coefficient
+#	F, NF			noise factor and figure (dB) for source impedance Zs
+#
+# Noise factors are referred to T0 = 290 K. T is the circuit temperature.
+class noiseAnalysis:
+
+	def __init__(self, compiled, ytensor, freq, n1, n2, Zs = 50., z0 = 50., T = T0):
+
+		self.freq = np.atleast_1d( np.asarray(freq, dtype = float) )
+		self.z0, self.Zs = z0, Zs
+
+		# Open circuit noise voltages and port impedances
+		self.Cz, self.Z = portNoise(compiled, ytensor, self.freq, [n1, n2], T)
+
+		# Chain representation: u = v1 - Z11/Z21 v2 and i = -v2/Z21
+		Z11, Z21 = self.Z[:, 0, 0], self.Z[:, 1, 0]
+
+		A = np.zeros( (len(self.freq), 2, 2), dtype = complex )
+		A[:, 0, 0], A[:, 0, 1], A[:, 1, 1] = 1.0, -Z11 / Z21, -1.0 / Z21
+
+		self.Ca = np.matmul( np.matmul(A, self.Cz), np.swapaxes(A.conj(), -1, -2) )
+
+		# Noise parameters (normalized to 4kT0)
+		kT4 = 4.0 * BOLTZMANN * T0
+
+		Cuu, Cii, Ciu = self.Ca[:, 0, 0].real, self.Ca[:, 1, 1].real, self.Ca[:, 1, 0]
+
+		self.Rn = Cuu / kT4
+		self.Ycor = Ciu / Cuu
+		self.Gu = ( Cii - np.abs(self.Ycor)**2 * Cuu ) / kT4
+
+		Gopt = np.sqrt( np.maximum( self.Gu / self.Rn + self.Ycor.real**2, 0.0 ) )
+
+		self.Yopt = Gopt - 1j * self.Ycor.imag
+		self.Fmin = 1.0 + 2.0 * self.Rn * ( Gopt + self.Ycor.real )
+		self.Gopt = ( 1.0 - z0 * self.Yopt ) / ( 1.0 + z0 * self.Yopt )
+
+		self.NFmin = 10.0 * np.log10(self.Fmin)
+
+		self.F = self.noiseFactor( 1.0 / Zs )
+		self.NF = 10.0 * np.log10(self.F)
+
+	# Construct from a frequency analysis
+	@classmethod
+	def fromAnalysis(cls, analysis, n1, n2, **kwargs):
+
+		return cls( analysis.compiled, analysis.getTensor(), analysis.freq, n1, n2, **kwargs )
+
+	# Noise factor (nfreq, ...) for source admittances Ys of shape () or
+	# (nfreq, ...)
+	def noiseFactor(self, Ys):
+
+		Ys = np.asarray(Ys, dtype = complex)
+		_shape = (-1,) + (1,) * max( Ys.ndim - 1, 0 )
+
+		return noiseFactor( Ys, self.Fmin.reshape(_shape), self.Rn.reshape(_shape), self.Yopt.reshape(_shape) )
+
+	# Noise factor for source reflection coefficients (referred to z0)
+	def noiseFactorGamma(self, gamma):
+
+		gamma = np.asarray(gamma, dtype = complex)
+		return self.noiseFactor( ( 1.0 - gamma ) / ( 1.0 + gamma ) / self.z0 )
@@ -116,8 +116,85 @@ class vdp_conductance:
 
 		return 0.0
 
+# Base class for models of the form i = f(vgd, vgs). Provides vectorized
+# evaluation of the I-V surface and small signal conductances over a grid.
+class twoportModel:
+
+    # Evaluate Ids, gm and gds over the meshgrid of Vgs and Vds, one block of
+    # (chunk) rows of Vds at a time. Yields (rows, block) where rows is the
+    # slice of Vds covered and block holds arrays of shape (rows, len(Vgs)).
+    # Only one block is held in memory, so very large grids can be reduced
+    # or written out as they are generated.
+    def surfaceChunks(self, Vgs, Vds, chunk=None, derivatives=True, delta=1e-6):
+
+        # Gate and drain voltages as flat arrays
+        Vgs = np.asarray(Vgs, dtype=float).ravel()
+        Vds = np.asarray(Vds, dtype=float).ravel()
+
+        # Whole grid in one block if chunk is not specified
+        chunk = max(len(Vds), 1) if chunk is None else max(int(chunk), 1)
+
+        for i in range(0, len(Vds), chunk):
+
+            # Broadcast block of rows against gate voltages
+            _vds = Vds[i:i+chunk, np.newaxis]
+            _vgs = Vgs[np.newaxis, :]
+            _vgd = _vgs - _vds
+
+            _block = { "IDS" : self.f(_vgd, _vgs) }
+
+            if derivatives:
+
+                # Partial derivatives (central difference) 
+                _dgd = ( self.f(_vgd + delta, _vgs) - self.f(_vgd - delta, _vgs) ) / ( 2.0 * delta )
+                _dgs = ( self.f(_vgd, _vgs + delta) - self.f(_vgd, _vgs - delta) ) / ( 2.0 * delta )
+
+                # gm at constant Vds moves both vgd and vgs: gds at constant
+                # Vgs moves vgd in the opposite direction to vds
+                _block["GM"]  = _dgd + _dgs
+                _block["GDS"] = -1.0 * _dgd
+
+            yield slice(i, i + len(_vds)), _block
+
+    # Evaluate Ids, gm and gds over the meshgrid of Vgs and Vds. Outputs have
+    # shape (len(Vds), len(Vgs)). The chunk option bounds the temporaries 
+    # only: the outputs are allocated at full size unless preallocated arrays
+    # (e.g. np.memmap) are passed as out = {"IDS" : ..., "GM" : ..., "GDS" : ...}.
+    # Use surfaceChunks to bound the total memory.
+    def surface(self, Vgs, Vds, chunk=None, derivatives=True, delta=1e-6, out=None):
+
+        shape = ( np.size(Vds), np.size(Vgs) )
+        keys = ["IDS", "GM", "GDS"] if derivatives else ["IDS"]
+
+        # Preallocate output arrays which are not supplied
+        _surface = {} if out is None else out
+
+        for _key in keys:
+
+            if _key not in _surface:
+                _surface[_key] = np.empty(shape)
+
+            elif np.shape(_surface[_key]) != shape:
+                raise ValueError("out[%s] has shape %s but the grid is %s"%(_key, np.shape(_surface[_key]), shape))
+
+        for _rows, _block in self.surfaceChunks(Vgs, Vds, chunk, derivatives, delta):
+            for _key in keys:
+                _surface[_key][_rows] = _block[_key]
+
+        return _surface
+
+    # Transconductance surface 
+    def gm(self, Vgs, Vds, chunk=None):
+
+        return self.surface(Vgs, Vds, chunk)["GM"]
+
+    # Output conductance surface
+    def gds(self, Vgs, Vds, chunk=None):
+
+        return self.surface(Vgs, Vds, chunk)["GDS"]
+
 # Nonlinear transistor model
-class HFET:
+class HFET(twoportModel):
 
     def __init__(self):
 
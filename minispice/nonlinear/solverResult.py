@@ -0,0 +1,189 @@
+# ---------------------------------------------------------------------------------
+#   minispice -> nonlinear/solverResult.py
+#   Copyright (C) 2020 Michael Winters
+#   github: https://github.com/mesoic
+#   email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#   
+#   Permission is hereby granted, free of charge, to any person obtaining a copy
+#   of this software and associated documentation files (the "Software"), to deal
+#   in the Software without restriction, including without limitation the rights
+#   to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#   copies of the Software, and to permit persons to whom the Software is
+#   furnished to do so, subject to the following conditions:
+#   
+#   The above copyright notice and this permission notice shall be included in all
+#   copies or substantial portions of the Software.
+#   
+#   THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#   IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#   FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#   AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#   LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#   OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#   SOFTWARE.
+#
+
+#!/usr/bin/env python 
+import numpy as np
+import time
+
+from .. import instrument
+
+# Iteration history of a nonlinear solve. Residual norms, step sizes, damping
+# factors and elapsed times are kept in preallocated arrays which grow by
+# doubling if capacity is exceeded (e.g. Newton iterations of all time steps
+# of a transient). Solvers call record() once per iteration and stop when it
+# returns False:
+#
+#	result = solverResult(maxiter, callbacks = divergence(1e3), name = "hb")
+#	while result.record(residual, step, damping):
+#		...
+#
+# Abort callbacks are called as callback(result) after every iteration and 
+# stop the solve by returning True, e.g. to kill diverging runs early. The 
+# outcome is in result.status: "running", "converged", "maxiter" or "aborted".
+class solverResult:
+
+	def __init__(self, maxiter, callbacks = None, name = None, capacity = None):
+
+		self.maxiter = int(maxiter)
+		self.name = name
+
+		if callbacks is None:
+			self.callbacks = []
+
+		elif callable(callbacks):
+			self.callbacks = [callbacks]
+
+		else:
+			self.callbacks = list(callbacks)
+
+		# Preallocated history
+		_capacity = self.maxiter + 1 if capacity is None else max( int(capacity), 1 )
+
+		self._residual = np.full(_capacity, np.nan)
+		self._step = np.full(_capacity, np.nan)
+		self._damping = np.full(_capacity, np.nan)
+		self._time = np.full(_capacity, np.nan)
+
+		self.iterations = 0
+		self.status = "running"
+		self.message = ""
+
+		self.start = time.perf_counter()
+
+	# Double the capacity of the history arrays
+	def _grow(self):
+
+		for _name in ["_residual", "_step", "_damping", "_time"]:
+
+			_old = getattr(self, _name)
+			_new = np.full( 2 * len(_old), np.nan )
+			_new[:len(_old)] = _old
+
+			setattr(self, _name, _new)
+
+	# Record one iteration. Returns True if the solver should continue,
+	# False if an abort callback fired or maxiter was exceeded.
+	def record(self, residual, step = np.nan, damping = np.nan):
+
+		if self.iterations == len(self._residual):
+			self._grow()
+
+		k = self.iterations
+
+		self._residual[k] = residual
+		self._step[k] = step
+		self._damping[k] = damping
+		self._time[k] = time.perf_counter() - self.start
+
+		self.iterations += 1
+
+		if self.name is not None:
+			instrument.count(self.name + ".iterations")
+			instrument.append(self.name + ".residual", residual)
+
+		for _callback in self.callbacks:
+
+			if _callback(self):
+				self.finish("aborted", "aborted by %s"%getattr(_callback, "__name__", "callback"))
+				return False
+
+		if self.iterations > self.maxiter:
+			self.finish("maxiter", "maximum number of iterations (%d) exceeded"%self.maxiter)
+			return False
+
+		return True
+
+	# Set the final status of the solve
+	def finish(self, status, message = ""):
+
+		self.status = status
+		self.message = message
+
+	@property
+	def converged(self):
+		return self.status == "converged"
+
+	@property
+	def residual(self):
+		return self._residual[:self.iterations]
+
+	@property
+	def step(self):
+		return self._step[:self.iterations]
+
+	@property
+	def damping(self):
+		return self._damping[:self.iterations]
+
+	@property
+	def time(self):
+		return self._time[:self.iterations]
+
+	# Columns for result stores (see resultStore.py)
+	def toDict(self):
+
+		return {
+			"residual" 	: self.residual,
+			"step" 		: self.step,
+			"damping" 	: self.damping,
+			"time" 		: self.time,
+		}
+
+	def __repr__(self):
+
+		_last = self.residual[-1] if self.iterations else np.nan
+
+		return "solverResult(status=%s, iterations=%d, residual=%.3g)"%(self.status, self.iterations, _last)
+
+# Abort callback: residual has grown by factor over the smallest residual
+# seen, or is not finite
+def divergence(factor = 1e3):
+
+	def divergence(result):
+
+		_residual = result.residual
+		return not np.isfinite( _residual[-1] ) or _residual[-1] > factor * np.min(_residual)
+
+	return divergence
+
+# Abort callback: wall time of the solve exceeds seconds
+def timeout(seconds):
+
+	def timeout(result):
+		return result.time[-1] > seconds
+
+	return timeout
+
+# Abort callback: residual has not decreased by ratio over the last window
+# iterations
+def stagnation(window = 100, ratio = 0.99):
+
+	def stagnation(result):
+
+		_residual = result.residual
+		return len(_residual) > window and _residual[-1] > ratio * _residual[-1 - window]
+
+	return stagnation
@@ -0,0 +1,208 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> optimize.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import collections
+import numpy as np
+import math
+
+from .compiledNetlist import compiledNetlist
+from .sensitivity import adjointSensitivity
+from . import netlistParser
+
+# Conversion of d|x|^2/|x|^2 to dB
+DB = 10.0 / math.log(10.0)
+
+# Number of memoized evaluations kept
+MEMO_SIZE = 64
+
+# Index of S-parameters by name
+SPARAMS = {"S11" : (0, 0), "S12" : (0, 1), "S21" : (1, 0), "S22" : (1, 1)}
+
+# Gradient based optimization of element values and transistor model
+# parameters against a list of goals evaluated on the twoport between n1
+# and n2. Each goal is a dict with a type and a min and/or max target:
+#
+#	{"type" : "S21", "min" : 10.0, "band" : (8e9, 12e9)}	|S21| >= 10dB
+#	{"type" : "S11", "max" : -15.0}							|S11| <= -15dB
+#	{"type" : "K",   "min" : 1.0}							Rollet stability
+#	{"type" : "gain", "min" : 3.0}							network gain (dB)
+#
+# Optional keys are band (frequency range, default all) and weight. Each
+# goal contributes weight * mean(violation^2) over the band. Gradients come
+# from the adjoint sensitivities of all parameters evaluated over the whole
+# frequency grid in one batched call. Variables are optimized in log space.
+class optimizer:
+
+	def __init__(self, compiled, freq, n1, n2, variables, goals, bounds = None, Zs = 50., Zl = 50., z0 = 50., memosize = MEMO_SIZE):
+
+		self.compiled = compiled
+		self.freq = np.atleast_1d( np.asarray(freq, dtype=float) )
+
+		# Twoport configuration
+		self.ports = (n1, n2)
+		self.Zs, self.Zl, self.z0 = Zs, Zl, z0
+
+		# Optimization variables and bounds (default is a factor 10)
+		self.variables = list(variables)
+		self.nominal = np.array( [ compiled.get(_name) for _name in self.variables ] )
+
+		bounds = {} if bounds is None else bounds
+		self.bounds = [ bounds.get(_name, (_value / 10., _value * 10.)) for _name, _value in zip(self.variables, self.nominal) ]
+
+		# Goals with band masks
+		self.goals = []
+
+		for _goal in goals:
+
+			_band = _goal.get("band", (-np.inf, np.inf))
+			_mask = (self.freq >= _band[0]) & (self.freq <= _band[1])
+
+			if not np.any(_mask):
+				raise ValueError("Goal %s has no frequencies in band"%_goal["type"])
+
+			self.goals.append( dict(_goal, mask = _mask, weight = _goal.get("weight", 1.0)) )
+
+		# Memoized evaluations keyed by variable values. The least recently
+		# used entries are evicted beyond memosize.
+		self.memo = collections.OrderedDict()
+		self.memosize = memosize
+		self.evaluations = 0
+
+	# Construct from netlist file
+	@classmethod
+	def fromFile(cls, path, freq, n1, n2, variables, goals, **kwargs):
+
+		return cls( compiledNetlist( netlistParser.parse(path) ), freq, n1, n2, variables, goals, **kwargs )
+
+	# Goal quantity (dB or K) and its gradient (nfreq, nvariables)
+	def quantity(self, _type, sens, index):
+
+		S, dS = sens["S"], sens["dS"][:, index]
+
+		if _type in SPARAMS:
+
+			i, j = SPARAMS[_type]
+			s, ds = S[:, i, j, np.newaxis], dS[:, :, i, j]
+
+			return DB * np.log( np.abs(s[:, 0])**2 ), 2.0 * DB * np.real( s.conj() * ds ) / np.abs(s)**2
+
+		elif _type == "gain":
+
+			g, dg = sens["gain"], sens["dgain"][:, index]
+
+			return DB * np.log(g), DB * dg / g[:, np.newaxis]
+
+		elif _type == "K":
+
+			s11, s12, s21, s22 = [ S[:, i, j, np.newaxis] for i, j in [ (0,0), (0,1), (1,0), (1,1) ] ]
+			d11, d12, d21, d22 = [ dS[:, :, i, j] for i, j in [ (0,0), (0,1), (1,0), (1,1) ] ]
+
+			D = s11 * s22 - s12 * s21
+			dD = d11 * s22 + s11 * d22 - d12 * s21 - s12 * d21
+
+			a = 1 - np.abs(s11)**2 - np.abs(s22)**2 + np.abs(D)**2
+			da = -2.0 * np.real( s11.conj() * d11 + s22.conj() * d22 - D.conj() * dD )
+
+			b = 2.0 * np.abs(s12 * s21)
+			db = 2.0 * np.real( (s12 * s21).conj() * ( d12 * s21 + s12 * d21 ) ) / np.abs(s12 * s21)
+
+			return (a / b)[:, 0], ( da * b - a * db ) / b**2
+
+		else:
+			raise ValueError("Unknown goal type (%s)"%_type)
+
+	# Cost and gradient with respect to log(values). Memoized.
+	def evaluate(self, x):
+
+		key = tuple( np.asarray(x, dtype=float) )
+
+		if key in self.memo:
+			self.memo.move_to_end(key)
+			return self.memo[key]
+
+		self.evaluations += 1
+
+		# Apply values
+		values = np.exp(x)
+
+		for _name, _value in zip(self.variables, values):
+			self.compiled.set(_name, _value)
+
+		# Sensitivities of all parameters in one batched call
+		sens = adjointSensitivity(self.compiled, self.compiled.tensor(self.freq), self.freq, self.ports[0], self.ports[1], self.Zs, self.Zl, self.z0)
+		index = [ sens["names"].index(_name) for _name in self.variables ]
+
+		cost, grad = 0.0, np.zeros( len(self.variables) )
+
+		for _goal in self.goals:
+
+			q, dq = self.quantity(_goal["type"], sens, index)
+			q, dq = q[_goal["mask"]], dq[_goal["mask"]]
+
+			# Violation of min (q < min) and max (q > max) targets
+			for _target, _sign in [ ("min", 1.0), ("max", -1.0) ]:
+
+				if _target in _goal:
+
+					v = np.maximum( _sign * ( _goal[_target] - q ), 0.0 )
+
+					cost += _goal["weight"] * np.mean(v**2)
+					grad += _goal["weight"] * np.mean( -2.0 * _sign * v[:, np.newaxis] * dq, axis=0 )
+
+		# Chain rule for log variables
+		result = ( cost, grad * values )
+		self.memo[key] = result
+
+		while len(self.memo) > self.memosize:
+			self.memo.popitem(last = False)
+
+		return result
+
+	# Run the optimization (L-BFGS-B). The compiled netlist is left at the
+	# optimized values.
+	def run(self, maxiter = 200, tol = 1e-12):
+
+		from scipy.optimize import minimize
+
+		x0 = np.log(self.nominal)
+		bounds = [ ( math.log(lo), math.log(hi) ) for lo, hi in self.bounds ]
+
+		res = minimize(self.evaluate, x0, jac = True, method = "L-BFGS-B", bounds = bounds, options = {"maxiter" : maxiter, "ftol" : tol})
+
+		# Apply optimum. Evaluate may return a memoized result without
+		# touching the netlist, so set the values directly.
+		for _name, _value in zip(self.variables, np.exp(res.x)):
+			self.compiled.set(_name, _value)
+
+		return {
+			"values"	  : collections.OrderedDict( zip(self.variables, [ float(v) for v in np.exp(res.x) ]) ),
+			"cost"		  : float(res.fun),
+			"success"	  : bool(res.success),
+			"message"	  : str(res.message),
+			"iterations"  : int(res.nit),
+			"evaluations" : self.evaluations,
+		}
@@ -32,14 +32,16 @@ import sys
 # Import mwconverter
 from .Converter import *
 
-# Import matplotlib 
-import matplotlib.pyplot as plt
-
 # Helper class to plot frequency analysis data
 class plotAnalysis: 
 
 	def __init__(self):
 
+		# Import matplotlib on first use so that importing minispice never
+		# selects a backend
+		import matplotlib.pyplot as plt
+		self.plt = plt
+
 		# Dictionary of figures
 		self.figures = {}
 
@@ -47,7 +49,7 @@ class plotAnalysis:
 	def add_figure(self, key):
 		
 		# All plots will have the following
-		fig = plt.figure()
+		fig = self.plt.figure()
 
 		# Create some axes
 		ax = fig.add_subplot(111)
@@ -59,7 +61,7 @@ class plotAnalysis:
 	# Method to add polar plot figures
 	def add_polar(self, key):
 
-		fig = plt.figure(figsize=(6,6))
+		fig = self.plt.figure(figsize=(6,6))
 
 		# Add polar axes
 		ax = fig.add_axes([0.1, 0.1, 0.8, 0.8], polar=True)
@@ -71,7 +73,7 @@ class plotAnalysis:
 	# Method to add smith chart figures	
 	def add_smith(self, key):
 
-		fig = plt.figure(figsize=(6,6))
+		fig = self.plt.figure(figsize=(6,6))
 
 		# Add polar axes
 		ax = fig.add_axes([0.1, 0.1, 0.8, 0.8], polar=True)
@@ -255,4 +257,4 @@ class plotAnalysis:
 
 	# Wrap mpl show plots
 	def show(self):
-		plt.show()
+		self.plt.show()
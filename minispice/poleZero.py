@@ -0,0 +1,206 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> poleZero.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+import math
+
+from .compiledNetlist import compiledNetlist
+from .krylovReduction import mnaMatrices
+from . import netlistParser
+
+# Eigenvalues of the pencil (G + s C) x = 0. The capacitance stamps are 
+# scaled by s0 so that finite eigenvalues are O(1). Eigenvalues of singular 
+# C (e.g. purely resistive nodes) are at infinity and dropped.
+def _dense(G, C, s0, tol = 1e-9):
+
+	# Imported here to keep scipy out of the package import
+	import scipy.linalg
+
+	alpha, beta = scipy.linalg.eig( G.toarray(), -s0 * C.toarray(), right = False, homogeneous_eigvals = True )
+
+	finite = np.abs(beta) > tol * np.abs(alpha)
+
+	return s0 * alpha[finite] / beta[finite]
+
+# The k eigenvalues of the pencil (G + s C) x = 0 nearest to sigma by shift 
+# and invert Arnoldi. With (G + sigma C) factored once, the operator 
+# (G + sigma C)^-1 C has eigenvalues mu = -1 / (s - sigma).
+def _shiftInvert(G, C, sigma, k):
+
+	import scipy.sparse.linalg
+
+	lu = scipy.sparse.linalg.splu( ( G + sigma * C ).tocsc().astype(complex) )
+
+	operator = scipy.sparse.linalg.LinearOperator( G.shape, matvec = lambda x: lu.solve( C.dot(x).astype(complex) ), dtype = complex )
+
+	mu = scipy.sparse.linalg.eigs( operator, k = min(k, G.shape[0] - 2), which = "LM", return_eigenvectors = False )
+	mu = mu[ np.abs(mu) > 0 ]
+
+	return sigma - 1.0 / mu
+
+# Drop row i and column j (0-based) of a sparse matrix
+def _minor(A, i, j):
+
+	rows = np.setdiff1d( np.arange(A.shape[0]), [i] )
+	cols = np.setdiff1d( np.arange(A.shape[1]), [j] )
+
+	return A.tocsr()[rows].tocsc()[:, cols]
+
+# Pole-zero analysis of a linear netlist. Poles and zeros are generalized
+# eigenvalues of the modified nodal pencil G + s C (see mnaMatrices; 
+# inductor branch currents linearize the 1/s stamps). The transfer function
+# from input node n1 to output node n2 is
+#
+#	kind = "impedance"		H(s) = V(n2) / I(n1)
+#	kind = "gain"			H(s) = V(n2) / V(n1)
+#
+# Poles are the zeros of the determinant of the pencil (with n1 grounded for
+# "gain") and zeros are the zeros of the minor without row n1 and column n2.
+# Optional source and load resistances Zs, Zl terminate n1 and n2. Without 
+# n1, n2 only the natural frequencies (poles) are computed.
+#
+# By default the dense QZ algorithm finds all eigenvalues. For large
+# circuits pass f0 (and k) to compute the k eigenvalues nearest to j 2 pi f0
+# by sparse shift-invert. Coincident poles and zeros are not cancelled.
+class poleZero:
+
+	def __init__(self, compiled, n1 = None, n2 = None, kind = "gain", Zs = None, Zl = None, f0 = None, k = 10):
+
+		if kind not in ("gain", "impedance"):
+			raise ValueError("Unknown transfer function (%s)"%kind)
+
+		self.n1, self.n2, self.kind = n1, n2, kind
+
+		G, C, B = mnaMatrices(compiled, [ _n for _n in (n1, n2) if _n is not None ])
+		G = G.tolil()
+
+		# Terminations
+		for _node, _Z in [ (n1, Zs), (n2, Zl) ]:
+			if _node is not None and _Z is not None:
+				G[_node - 1, _node - 1] += 1.0 / _Z
+
+		self.G, self.C = G.tocsc(), C
+
+		# Frequency scale of the pencil
+		self.s0 = abs(self.G).sum(axis=0).max() / max( abs(C).sum(axis=0).max(), 1e-300 )
+
+		if f0 is None:
+			self.solve = lambda _G, _C: _dense(_G, _C, self.s0)
+
+		else:
+			self.solve = lambda _G, _C: _shiftInvert(_G, _C, 2j * math.pi * float(f0), k)
+
+		# Poles
+		if n1 is not None and kind == "gain":
+			self.poles = self._sort( self.solve( _minor(self.G, n1 - 1, n1 - 1), _minor(self.C, n1 - 1, n1 - 1) ) )
+
+		else:
+			self.poles = self._sort( self.solve(self.G, self.C) )
+
+		# Zeros
+		if n1 is not None and n2 is not None:
+			self.zeros = self._sort( self.solve( _minor(self.G, n1 - 1, n2 - 1), _minor(self.C, n1 - 1, n2 - 1) ) )
+
+		else:
+			self.zeros = np.array([], dtype=complex)
+
+		self.constant = None if n1 is None or n2 is None else self._constant()
+
+	# Construct from netlist file
+	@classmethod
+	def fromFile(cls, path, n1 = None, n2 = None, **kwargs):
+
+		return cls( compiledNetlist( netlistParser.parse(path) ), n1, n2, **kwargs )
+
+	# Sort by imaginary part and then real part
+	def _sort(self, values):
+
+		values = np.asarray(values, dtype=complex)
+		return values[ np.lexsort( (values.real, values.imag) ) ]
+
+	# Exact transfer function at complex frequencies s
+	def exact(self, s):
+
+		import scipy.sparse.linalg
+
+		s = np.atleast_1d( np.asarray(s, dtype=complex) )
+		H = np.empty(len(s), dtype=complex)
+
+		for i, _s in enumerate(s):
+
+			b = np.zeros( self.G.shape[0], dtype=complex )
+			b[self.n1 - 1] = 1.0
+
+			x = scipy.sparse.linalg.spsolve( ( self.G + _s * self.C ).tocsc().astype(complex), b )
+
+			H[i] = x[self.n2 - 1] / ( x[self.n1 - 1] if self.kind == "gain" else 1.0 )
+
+		return H
+
+	# Constant factor of the rational transfer function, matched to the
+	# exact solution at a reference frequency away from poles and zeros
+	def _constant(self):
+
+		s = 1j * self.s0 * ( 1.0 + math.pi / 10.0 )
+
+		return self.exact(s)[0] / self._rational(s, 1.0)[0]
+
+	def _rational(self, s, constant):
+
+		s = np.atleast_1d(s)[:, np.newaxis]
+
+		return constant * np.prod( s - self.zeros, axis = 1 ) / np.prod( s - self.poles, axis = 1 )
+
+	# Transfer function at frequencies from poles, zeros and constant. Only
+	# valid for the dense (complete) solution.
+	def __call__(self, freq):
+
+		if self.constant is None:
+			raise ValueError("Transfer function needs input and output nodes")
+
+		return self._rational( 2j * math.pi * np.asarray(freq, dtype=float), self.constant )
+
+	# Natural frequencies (Hz) and quality factors of roots with positive 
+	# imaginary part. Q uses |Re(r)|, so right half plane zeros have Q > 0.
+	def _resonances(self, roots):
+
+		r = roots[ roots.imag > 0 ]
+
+		# Roots on the imaginary axis (either sign of zero) have infinite Q
+		with np.errstate(divide = "ignore", invalid = "ignore"):
+			Q = np.where( r.real == 0, np.inf, np.abs(r) / ( 2.0 * np.abs(r.real) ) )
+
+		return np.abs(r) / ( 2 * math.pi ), Q
+
+	# Resonances of the poles as arrays of frequency (Hz) and quality factor
+	def resonances(self):
+		return self._resonances(self.poles)
+
+	# Anti-resonances (notches) of the zeros as arrays of frequency (Hz) and
+	# quality factor. Zeros on the imaginary axis have infinite Q.
+	def antiresonances(self):
+		return self._resonances(self.zeros)
@@ -0,0 +1,216 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> resultCache.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import hashlib
+import numpy as np
+import shutil
+import os
+
+from . import __version__
+from . import netlistParser
+from .resultStore import resultWriter, resultStore, HEADER
+
+# Default location and size bound (bytes) of the result cache
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".minispice", "results")
+MAX_SIZE = 1024**3
+
+# Content addressed on-disk cache of analysis results. Entries are result
+# stores (see resultStore.py) named by a hash of the netlist files, the
+# transistor model files, the frequency array, analysis options and the
+# library version, so any change to the inputs is a miss. The least
+# recently used entries are evicted when the directory exceeds maxsize.
+# Entries larger than maxsize are not stored.
+class resultCache:
+
+	def __init__(self, path = None, maxsize = MAX_SIZE):
+
+		self.path = CACHE_DIR if path is None else str(path)
+		self.maxsize = maxsize
+
+		# Statistics of this cache object
+		self.hits, self.misses, self.evictions, self.skipped = 0, 0, 0, 0
+
+	# Resolve the result_cache argument of analyses: True (default cache), a
+	# directory or a resultCache. Returns None if caching is disabled.
+	@classmethod
+	def open(cls, cache):
+
+		if cache is None or cache is False:
+			return None
+
+		if isinstance(cache, cls):
+			return cache
+
+		return cls() if cache is True else cls(cache)
+
+	# Cache key of an analysis of a parsed netlist at freq. Model files are
+	# looked up in model_path (cwd if None) as in nodeMatrix.readModel.
+	def key(self, _netlist, freq, model_path = None, **options):
+
+		h = hashlib.sha1()
+		h.update( ("%s:%s"%(__version__, netlistParser.PARSER_VERSION)).encode("utf-8") )
+
+		# Netlist and included files
+		for _path, _digest in _netlist.sources:
+			h.update( _digest.encode("utf-8") )
+
+		# Transistor model files of all scopes
+		models = set()
+
+		for _scope in [_netlist] + list( _netlist.subcircuits.values() ):
+			for _name, _component in _scope.components.items():
+				if _name[0].upper() == "Q":
+					models.add( _component["value"] )
+
+		for _model in sorted(models):
+
+			_path = os.path.join( os.getcwd() if model_path is None else model_path, _model + ".model" )
+
+			try:
+				with open(_path, "rb") as f:
+					h.update( ("%s:%s"%( _model, netlistParser.digest( f.read() ) )).encode("utf-8") )
+
+			except (IOError, OSError):
+				h.update( ("%s:missing"%_model).encode("utf-8") )
+
+		# Frequency array and options
+		h.update( np.ascontiguousarray( freq, dtype=float ).tobytes() )
+		h.update( repr( sorted( options.items() ) ).encode("utf-8") )
+
+		return h.hexdigest()
+
+	# Columns of a cached entry as arrays, or None on a miss
+	def get(self, key):
+
+		_entry = os.path.join(self.path, key)
+
+		try:
+			_store = resultStore(_entry)
+			result = dict( (_name, np.array( _store[_name] )) for _name in _store.keys() )
+
+		except (ValueError, IOError, OSError):
+			self.misses += 1
+			return None
+
+		# Mark as recently used
+		try:
+			os.utime( os.path.join(_entry, HEADER), None )
+
+		except OSError:
+			pass
+
+		self.hits += 1
+		return result
+
+	# Store a dict of columns under key and evict old entries. Entries which
+	# alone exceed maxsize are skipped, as they would evict the whole cache
+	# and then themselves. Caching is best effort and never raises on I/O 
+	# errors.
+	def put(self, key, columns, attrs = None):
+
+		if sum( np.asarray(_data).nbytes for _data in columns.values() ) > self.maxsize:
+			self.skipped += 1
+			return
+
+		_entry = os.path.join(self.path, key)
+		_tmp = "%s.%d.tmp"%(_entry, os.getpid())
+
+		try:
+			length = len( next( iter( columns.values() ) ) )
+
+			with resultWriter(_tmp, length, attrs) as store:
+				for _name, _data in columns.items():
+					store.write(_name, _data)
+
+			if os.path.isdir(_entry):
+				shutil.rmtree(_tmp, ignore_errors = True)
+
+			else:
+				os.replace(_tmp, _entry)
+
+		except (IOError, OSError):
+			shutil.rmtree(_tmp, ignore_errors = True)
+			return
+
+		self.evict()
+
+	# Complete entries as (last used, size, path)
+	def entries(self):
+
+		entries = []
+
+		if not os.path.isdir(self.path):
+			return entries
+
+		for _name in os.listdir(self.path):
+
+			_entry = os.path.join(self.path, _name)
+			_header = os.path.join(_entry, HEADER)
+
+			if _name.endswith(".tmp") or not os.path.isfile(_header):
+				continue
+
+			_size = sum( os.path.getsize( os.path.join(_entry, _f) ) for _f in os.listdir(_entry) )
+			entries.append( ( os.path.getmtime(_header), _size, _entry ) )
+
+		return entries
+
+	# Remove least recently used entries until the cache fits in maxsize
+	def evict(self):
+
+		entries = sorted( self.entries() )
+		size = sum( _size for _time, _size, _entry in entries )
+
+		for _time, _size, _entry in entries:
+
+			if size <= self.maxsize:
+				break
+
+			shutil.rmtree(_entry, ignore_errors = True)
+
+			size -= _size
+			self.evictions += 1
+
+	# Remove all entries
+	def clear(self):
+
+		for _time, _size, _entry in self.entries():
+			shutil.rmtree(_entry, ignore_errors = True)
+
+	# Hit, miss, eviction and skip statistics and current cache contents
+	def stats(self):
+
+		entries = self.entries()
+
+		return {
+			"hits" 		: self.hits,
+			"misses" 	: self.misses,
+			"evictions" : self.evictions,
+			"skipped" 	: self.skipped,
+			"entries" 	: len(entries),
+			"size" 		: sum( _size for _time, _size, _entry in entries ),
+		}
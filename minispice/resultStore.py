@@ -0,0 +1,185 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> resultStore.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import collections
+import json
+import numpy as np
+import os
+
+# Bump when the store layout changes
+STORE_VERSION = 1
+
+# Name of the header file in a store directory
+HEADER = "header.json"
+
+# Columnar binary result store. A store is a directory holding one .npy file
+# per column and a JSON header. Every column has the same leading (record)
+# axis, e.g. frequency, trial or time step. Columns are preallocated as
+# memory mapped .npy files and filled in chunks:
+#
+#	with resultWriter("sweep.store", len(freq)) as store:
+#		store.write("freq", freq)
+#		Y = store.column("Y", (2, 2), complex)
+#		for i in range(0, len(freq), chunk):
+#			Y[i:i+chunk] = ...
+#
+# The header is written on close and marks the store as complete. If the
+# with block raises, the partial columns are removed instead (see abort).
+class resultWriter:
+
+	def __init__(self, path, length, attrs = None):
+
+		self.path = path
+		self.length = int(length)
+		self.attrs = dict(attrs) if attrs is not None else {}
+		self.columns = collections.OrderedDict()
+
+		if not os.path.isdir(path):
+			os.makedirs(path)
+
+		# Remove a stale header so incomplete stores are never read
+		if os.path.isfile( os.path.join(path, HEADER) ):
+			os.remove( os.path.join(path, HEADER) )
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+
+		if exc_type is None:
+			self.close()
+
+		else:
+			self.abort()
+
+	# Preallocate a column of shape (length,) + shape. Returns a writable
+	# memory mapped array
+	def column(self, name, shape = (), dtype = complex):
+
+		if name in self.columns:
+			return self.columns[name]
+
+		self.columns[name] = np.lib.format.open_memmap(
+			os.path.join(self.path, name + ".npy"), mode = "w+", dtype = np.dtype(dtype), shape = (self.length,) + tuple(shape)
+		)
+
+		return self.columns[name]
+
+	# Write data into a column starting at record start. The column is
+	# created from the shape and type of data if needed
+	def write(self, name, data, start = 0):
+
+		data = np.asarray(data)
+		_column = self.column(name, data.shape[1:], data.dtype)
+
+		_column[start:start + len(data)] = data
+
+	# Flush columns and write the header
+	def close(self):
+
+		if self.columns is None:
+			return
+
+		header = {
+			"version" : STORE_VERSION,
+			"length"  : self.length,
+			"attrs"	  : self.attrs,
+			"columns" : collections.OrderedDict(
+				(_name, {"shape" : list(_c.shape[1:]), "dtype" : _c.dtype.str}) for _name, _c in self.columns.items()
+			),
+		}
+
+		for _column in self.columns.values():
+			_column.flush()
+
+		self.columns = None
+
+		_tmp = os.path.join(self.path, HEADER + ".tmp")
+
+		with open(_tmp, "w") as f:
+			json.dump(header, f, indent = 1)
+
+		os.replace( _tmp, os.path.join(self.path, HEADER) )
+
+	# Drop the memory maps and remove the partial columns without writing a
+	# header, e.g. after a failed or interrupted sweep
+	def abort(self):
+
+		if self.columns is None:
+			return
+
+		_names = list( self.columns.keys() )
+		self.columns = None
+
+		for _name in _names:
+
+			_file = os.path.join(self.path, _name + ".npy")
+
+			if os.path.isfile(_file):
+				os.remove(_file)
+
+# Read access to a result store. Columns are opened as read-only memory maps
+# so single records (store["S"][i]) or slices are read without loading the
+# whole file.
+class resultStore:
+
+	def __init__(self, path):
+
+		self.path = path
+
+		try:
+			with open( os.path.join(path, HEADER), "r" ) as f:
+				self.header = json.load(f)
+
+		except (IOError, OSError):
+			raise ValueError("%s is not a complete result store"%path)
+
+		if self.header["version"] != STORE_VERSION:
+			raise ValueError("%s has unsupported store version %s"%(path, self.header["version"]))
+
+		self.attrs = self.header["attrs"]
+		self._columns = {}
+
+	def __len__(self):
+		return self.header["length"]
+
+	def __contains__(self, name):
+		return name in self.header["columns"]
+
+	def keys(self):
+		return list( self.header["columns"].keys() )
+
+	# Memory mapped column
+	def __getitem__(self, name):
+
+		if name not in self.header["columns"]:
+			raise KeyError(name)
+
+		if name not in self._columns:
+			self._columns[name] = np.load( os.path.join(self.path, name + ".npy"), mmap_mode = "r" )
+
+		return self._columns[name]
@@ -0,0 +1,156 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> sensitivity.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+import math
+
+from .nodeMatrix import transistorStamp
+
+# Relative step for transistor model parameter derivatives
+DELTA = 1e-6
+
+# Derivative of linear element admittance with respect to its value
+def dadmittance(kind, value, freq):
+
+	w = 2 * math.pi * np.asarray(freq, dtype = float)[:, np.newaxis]
+	value = np.asarray(value, dtype = float)
+
+	return np.select(
+		[ kind == "R", kind == "C", kind == "L" ],
+		[ -1.0 / value**2 + 0j * w, 1j * w + 0.0 * value, -1.0 / ( 1j * w * value**2 ) ],
+		np.ones_like(value) + 0j * w
+	)
+
+# Gather rows of (nfreq, n, k) arrays at nodes. Ground (node 0) gives zeros.
+def _gather(A, nodes):
+
+	A = np.concatenate( [ np.zeros( (A.shape[0], 1, A.shape[2]), dtype = A.dtype ), A ], axis = 1 )
+
+	return A[:, nodes, :]
+
+# Derivatives of the port impedance matrix P^T Y^-1 P with respect to every
+# linear element value and transistor model parameter. Uses one forward and
+# one adjoint solve per frequency: dZ = -W^T (dY/dp) X with X = Y^-1 P and
+# W = Y^-T P. Returns (names, Z, dZ) with dZ of shape (nfreq, nparams, k, k)
+def portImpedanceGradient(compiled, ytensor, freq, ports):
+
+	freq = np.atleast_1d( np.asarray(freq, dtype = float) )
+	p = np.asarray(ports, dtype = int) - 1
+
+	P = np.zeros( (compiled.size, len(p)) )
+	P[p, np.arange(len(p))] = 1.0
+
+	# Forward and adjoint solutions
+	X = np.linalg.solve( ytensor, P )
+	W = np.linalg.solve( np.swapaxes(ytensor, -1, -2), P )
+
+	Z = X[:, p, :]
+
+	# Linear elements: dY/dp = dy u v^T so dZ = -dy (W^T u)(v^T X)
+	nodes = compiled.nodes
+	dy = dadmittance(compiled.kind, compiled.value, freq)
+
+	Wu = _gather(W, nodes[:, 0]) - _gather(W, nodes[:, 1])
+	vX = _gather(X, nodes[:, 2]) - _gather(X, nodes[:, 3])
+
+	dZ = [ -1.0 * dy[:, :, np.newaxis, np.newaxis] * Wu[:, :, :, np.newaxis] * vX[:, :, np.newaxis, :] ]
+	names = list(compiled.names)
+
+	# Transistor model parameters (shared by all instances of a model)
+	for _model, _tr in compiled.transistors.items():
+
+		params = compiled.model(_model)
+
+		Wt = [ _gather(W, _tr["nodes"][:, i]) for i in range(3) ]
+		Xt = [ _gather(X, _tr["nodes"][:, i]) for i in range(3) ]
+
+		for _param, _value in params.items():
+
+			# Central difference of the transistor block
+			h = DELTA * abs(_value) if _value != 0 else DELTA
+			_up, _dn = dict(params), dict(params)
+			_up[_param], _dn[_param] = _value + h, _value - h
+
+			B = ( transistorStamp(_model, _up, freq) - transistorStamp(_model, _dn, freq) ) / ( 2.0 * h )
+
+			_dZ = np.zeros( (len(freq), len(p), len(p)), dtype = complex )
+
+			for i in range(3):
+				for j in range(3):
+					_dZ -= np.einsum('f,fta,ftb->fab', B[:, i, j], Wt[i], Xt[j])
+
+			dZ.append( _dZ[:, np.newaxis] )
+			names.append( "%s.%s"%(_model, _param) )
+
+	return names, Z, np.concatenate(dZ, axis = 1)
+
+# Adjoint sensitivity of the twoport between n1 and n2. Returns derivatives
+# of twoport Y, S-parameters, network gain and transfer function with respect
+# to all linear element values (by name) and transistor model parameters
+# (model.param). Derivative arrays have shape (nfreq, nparams, ...)
+def adjointSensitivity(compiled, ytensor, freq, n1, n2, Zs = 50., Zl = 50., z0 = 50.):
+
+	names, Z, dZ = portImpedanceGradient(compiled, ytensor, freq, [n1, n2])
+
+	# Twoport admittance and derivative: dY = -Y dZ Y
+	Y = np.linalg.inv(Z)
+	dY = -1.0 * np.matmul( np.matmul( Y[:, np.newaxis], dZ ), Y[:, np.newaxis] )
+
+	# S = (I + z0 Y)^-1 (I - z0 Y) so dS = -2 z0 (I + z0 Y)^-1 dY (I + z0 Y)^-1
+	A = np.linalg.inv( np.eye(2) + z0 * Y )
+	S = np.matmul( A, np.eye(2) - z0 * Y )
+	dS = -2.0 * z0 * np.matmul( np.matmul( A[:, np.newaxis], dY ), A[:, np.newaxis] )
+
+	# Network gain G = N / D with N = c |y21|^2 and D = |delta|^2
+	Ys, Yl = complex(1./Zs), complex(1./Zl)
+	c = 4.0 * Ys.real * Yl.real
+
+	y11, y12, y21, y22 = [ Y[:, i, j, np.newaxis] for i, j in [ (0,0), (0,1), (1,0), (1,1) ] ]
+	d11, d12, d21, d22 = [ dY[:, :, i, j] for i, j in [ (0,0), (0,1), (1,0), (1,1) ] ]
+
+	delta = ( y11 + Ys ) * ( y22 + Yl ) - y12 * y21
+	ddelta = d11 * ( y22 + Yl ) + ( y11 + Ys ) * d22 - d12 * y21 - y12 * d21
+
+	N, D = c * np.abs(y21)**2, np.abs(delta)**2
+	dN = 2.0 * c * np.real( y21.conj() * d21 )
+	dD = 2.0 * np.real( delta.conj() * ddelta )
+
+	# Transfer function T = y21 / y22
+	T = y21 / y22
+	dT = d21 / y22 - y21 * d22 / y22**2
+
+	return {
+		"names"		: names,
+		"Y" 		: Y,
+		"dY"		: dY,
+		"S"			: S,
+		"dS"		: dS,
+		"gain"		: ( N / D )[:, 0],
+		"dgain"		: ( dN * D - N * dD ) / D**2,
+		"transfer"	: T[:, 0],
+		"dtransfer"	: dT,
+	}
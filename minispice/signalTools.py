@@ -25,7 +25,6 @@
 #
 
 #!/usr/bin/env python 
-from scipy import signal
 import numpy as np
 
 # Create signal tools namespace
@@ -38,8 +37,11 @@ class signalTools:
 	# Method to generate a test pulse for transient simulations
 	def pulse(self, config):
 
+		# Imported here to keep scipy out of the package import
+		from scipy import signal
+
 		# Construct time array 
-		time  = np.linspace(0, config["period"], config["npoints"], endpoint=False)
+		time  = np.linspace(0, config["period"], int(config["npoints"]), endpoint=False)
 
 		# Cache the sampling interval
 		delta = time[1] - time[0]
@@ -60,7 +62,7 @@ class signalTools:
 	def sinwave(self, config):
 
 		# Construct time array 
-		time  = np.linspace(0, config["period"], config["npoints"], endpoint=False)
+		time  = np.linspace(0, config["period"], int(config["npoints"]), endpoint=False)
 
 		# Cache the sampling interval
 		delta = time[1] - time[0]
@@ -0,0 +1,369 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> touchstone.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+import os
+
+# Frequency units
+UNITS = {
+	"HZ"  : 1.0,
+	"KHZ" : 1e3,
+	"MHZ" : 1e6,
+	"GHZ" : 1e9,
+}
+
+# Frequencies per chunk when streaming
+CHUNK = 4096
+
+# Exception raised for malformed Touchstone files
+class TouchstoneError(ValueError):
+	pass
+
+# Order of matrix entries on a data line. Two-port v1 data (and v2 with
+# [Two-Port Data Order] 21_12) is written N11 N21 N12 N22. All other data
+# is row major.
+def _order(nports, twoport = "21_12"):
+
+	if nports == 2 and twoport == "21_12":
+		return [ (0, 0), (1, 0), (0, 1), (1, 1) ]
+
+	return [ (i, j) for i in range(nports) for j in range(nports) ]
+
+# Streaming Touchstone writer for S, Y or Z data. Data is written in chunks
+# of shape (nfreq, nports, nports) so sweeps never need to sit in memory:
+#
+#	with touchstoneWriter("amp.s2p") as f:
+#		for freq, sparams in chunks:
+#			f.write(freq, sparams)
+#
+# Format is RI, MA or DB. Version 2 files need the total number of
+# frequencies up front. In version 1 files Y and Z are normalized to z0.
+# If the with block raises, the partial file is removed (see abort).
+class touchstoneWriter:
+
+	def __init__(self, path, nports = 2, kind = "S", fmt = "RI", unit = "HZ", z0 = 50., version = 1, nfreq = None, comments = ()):
+
+		self.kind, self.fmt, self.unit = kind.upper(), fmt.upper(), unit.upper()
+
+		if self.kind not in ("S", "Y", "Z"):
+			raise TouchstoneError("Unknown parameter type (%s)"%kind)
+
+		if self.fmt not in ("RI", "MA", "DB"):
+			raise TouchstoneError("Unknown data format (%s)"%fmt)
+
+		if self.unit not in UNITS:
+			raise TouchstoneError("Unknown frequency unit (%s)"%unit)
+
+		if version == 2 and nfreq is None:
+			raise TouchstoneError("Touchstone 2 files need the number of frequencies")
+
+		self.nports, self.z0 = nports, float(z0)
+		self.version, self.nfreq = version, nfreq
+		self.order = _order(nports)
+		self.count = 0
+
+		self.path = path
+		self.file = open(path, "w")
+
+		for _comment in comments:
+			self.file.write("! %s\n"%_comment)
+
+		self._header()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+
+		if exc_type is None:
+			self.close()
+
+		else:
+			self.abort()
+
+	# Option line and version 2 keywords
+	def _header(self):
+
+		if self.version == 2:
+			self.file.write("[Version] 2.0\n")
+
+		self.file.write( "# %s %s %s R %g\n"%(self.unit, self.kind, self.fmt, self.z0) )
+
+		if self.version == 2:
+			self.file.write("[Number of Ports] %d\n"%self.nports)
+
+			if self.nports == 2:
+				self.file.write("[Two-Port Data Order] 21_12\n")
+
+			self.file.write("[Number of Frequencies] %d\n"%self.nfreq)
+			self.file.write("[Network Data]\n")
+
+	# Write a chunk of data of shape (nfreq, nports, nports)
+	def write(self, freq, data):
+
+		freq = np.atleast_1d( np.asarray(freq, dtype=float) )
+		data = np.asarray(data, dtype=complex).reshape( len(freq), self.nports, self.nports )
+
+		# Version 1 Y and Z data is normalized
+		if self.version == 1 and self.kind == "Y":
+			data = data * self.z0
+
+		elif self.version == 1 and self.kind == "Z":
+			data = data / self.z0
+
+		values = np.stack( [ data[:, i, j] for i, j in self.order ], axis=1 )
+
+		if self.fmt == "RI":
+			a, b = values.real, values.imag
+
+		elif self.fmt == "MA":
+			a, b = np.abs(values), np.angle(values, deg=True)
+
+		else:
+			a, b = 20.0 * np.log10( np.abs(values) ), np.angle(values, deg=True)
+
+		# Columns: frequency followed by pairs. Above two ports every matrix 
+		# row starts on a new line with at most 4 pairs per line.
+		columns = np.empty( (len(freq), 2 * values.shape[1]) )
+		columns[:, 0::2], columns[:, 1::2] = a, b
+
+		row = 2 * self.nports if self.nports > 2 else columns.shape[1]
+		spans = [ (i, min(i + 8, r + row)) for r in range(0, columns.shape[1], row) for i in range(r, r + row, 8) ]
+		lines = []
+
+		for k in range(len(freq)):
+			for i, j in spans:
+
+				_first = "%.15g"%( freq[k] / UNITS[self.unit] ) if i == 0 else " "
+				lines.append( _first + " " + " ".join( "%.12g"%_v for _v in columns[k, i:j] ) )
+
+		self.file.write( "\n".join(lines) + "\n" )
+		self.count += len(freq)
+
+	def close(self):
+
+		if self.file.closed:
+			return
+
+		if self.version == 2:
+			self.file.write("[End]\n")
+
+		self.file.close()
+
+		if self.nfreq is not None and self.count != self.nfreq:
+			raise TouchstoneError("Wrote %d frequencies but header declares %d"%(self.count, self.nfreq))
+
+	# Close and remove a partially written file
+	def abort(self):
+
+		if self.file.closed:
+			return
+
+		self.file.close()
+
+		if os.path.isfile(self.path):
+			os.remove(self.path)
+
+# Write data (nfreq, nports, nports) to a Touchstone file in chunks
+def writeTouchstone(path, freq, data, kind = "S", fmt = "RI", unit = "HZ", z0 = 50., version = 1, chunk = CHUNK, comments = ()):
+
+	data = np.asarray(data)
+
+	with touchstoneWriter(path, data.shape[-1], kind, fmt, unit, z0, version, len(freq), comments) as f:
+
+		for i in range(0, len(freq), chunk):
+			f.write( freq[i:i+chunk], data[i:i+chunk] )
+
+# Parse the option line, e.g. "# GHZ S MA R 50"
+def _options(tokens):
+
+	info = {"unit" : "GHZ", "kind" : "S", "fmt" : "MA", "z0" : 50.}
+	tokens = [ _t.upper() for _t in tokens ]
+
+	i = 0
+	while i < len(tokens):
+
+		if tokens[i] in UNITS:
+			info["unit"] = tokens[i]
+
+		elif tokens[i] in ("S", "Y", "Z", "H", "G"):
+			info["kind"] = tokens[i]
+
+		elif tokens[i] in ("RI", "MA", "DB"):
+			info["fmt"] = tokens[i]
+
+		elif tokens[i] == "R" and i + 1 < len(tokens):
+			info["z0"] = float(tokens[i + 1])
+			i += 1
+
+		i += 1
+
+	if info["kind"] not in ("S", "Y", "Z"):
+		raise TouchstoneError("Unsupported parameter type (%s)"%info["kind"])
+
+	return info
+
+# Stream a Touchstone v1 or v2 file. Yields (freq, data) chunks with data of
+# shape (nchunk, nports, nports). Info is filled with the file options
+# (unit, kind, fmt, z0, nports, version). Two-port noise data is ignored.
+def iterTouchstone(path, chunk = CHUNK, info = None):
+
+	info = {} if info is None else info
+	info.update( {"unit" : "GHZ", "kind" : "S", "fmt" : "MA", "z0" : 50., "version" : 1, "nports" : None} )
+
+	# Number of ports from extension (v1)
+	_ext = os.path.splitext(path)[1].lower()
+
+	if len(_ext) > 3 and _ext[:2] == ".s" and _ext[-1] == "p" and _ext[2:-1].isdigit():
+		info["nports"] = int( _ext[2:-1] )
+
+	twoport = "21_12"
+	values, freq = [], []
+	last = -np.inf
+
+	with open(path, "r") as f:
+
+		data, noise = False, False
+
+		for line in f:
+
+			if noise:
+				break
+
+			line = line.split("!")[0].strip()
+
+			if not line:
+				continue
+
+			# Option line
+			if line[0] == "#":
+				info.update( _options( line[1:].split() ) )
+				continue
+
+			# Version 2 keywords
+			if line[0] == "[":
+
+				_key, _sep, _value = line[1:].partition("]")
+				_key, _value = _key.strip().lower(), _value.strip()
+
+				if _key == "version":
+					info["version"] = 2
+
+				elif _key == "number of ports":
+					info["nports"] = int(_value)
+
+				elif _key == "two-port data order":
+					twoport = _value
+
+				elif _key == "network data":
+					data = True
+
+				elif _key in ("noise data", "end"):
+					break
+
+				continue
+
+			if info["version"] == 2 and not data:
+				continue
+
+			if info["nports"] is None:
+				raise TouchstoneError("%s: unknown number of ports"%path)
+
+			nvalues = 1 + 2 * info["nports"]**2
+
+			_values = [ float(_v) for _v in line.split() ]
+
+			# Two-port noise data starts with a lower frequency
+			if not values and info["nports"] == 2 and _values[0] <= last:
+				noise = True
+				continue
+
+			values.extend(_values)
+
+			# Complete frequency points
+			while len(values) >= nvalues:
+
+				last = values[0]
+				freq.append( values[:nvalues] )
+				values = values[nvalues:]
+
+				if len(freq) == chunk:
+					yield _convert(freq, info, twoport)
+					freq = []
+
+	if values:
+		raise TouchstoneError("%s: incomplete data at end of file"%path)
+
+	if freq:
+		yield _convert(freq, info, twoport)
+
+# Convert rows of (freq, a1, b1, ...) into complex matrices
+def _convert(rows, info, twoport):
+
+	rows = np.array(rows)
+	n = info["nports"]
+
+	freq = rows[:, 0] * UNITS[ info["unit"] ]
+	a, b = rows[:, 1::2], rows[:, 2::2]
+
+	if info["fmt"] == "RI":
+		values = a + 1j * b
+
+	elif info["fmt"] == "MA":
+		values = a * np.exp( 1j * np.radians(b) )
+
+	else:
+		values = 10.0**( a / 20.0 ) * np.exp( 1j * np.radians(b) )
+
+	data = np.empty( (len(freq), n, n), dtype=complex )
+
+	for k, (i, j) in enumerate( _order(n, twoport) ):
+		data[:, i, j] = values[:, k]
+
+	# Version 1 Y and Z data is normalized
+	if info["version"] == 1 and info["kind"] == "Y":
+		data /= info["z0"]
+
+	elif info["version"] == 1 and info["kind"] == "Z":
+		data *= info["z0"]
+
+	return freq, data
+
+# Read a Touchstone file. Returns (freq, data, info) with data of shape
+# (nfreq, nports, nports)
+def readTouchstone(path, chunk = CHUNK):
+
+	info = {}
+	chunks = list( iterTouchstone(path, chunk, info) )
+
+	if not chunks:
+		raise TouchstoneError("%s: no network data"%path)
+
+	freq = np.concatenate( [ _f for _f, _d in chunks ] )
+	data = np.concatenate( [ _d for _f, _d in chunks ] )
+
+	return freq, data, info
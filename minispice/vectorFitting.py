@@ -0,0 +1,401 @@
+# ---------------------------------------------------------------------------------
+# 	minispice -> vectorFitting.py
+#	Copyright (C) 2020 Michael Winters
+#	github: https://github.com/mesoic
+#	email:  mesoic@protonmail.com
+# ---------------------------------------------------------------------------------
+#
+#	Permission is hereby granted, free of charge, to any person obtaining a copy
+#	of this software and associated documentation files (the "Software"), to deal
+#	in the Software without restriction, including without limitation the rights
+#	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#	copies of the Software, and to permit persons to whom the Software is
+#	furnished to do so, subject to the following conditions:
+#
+#	The above copyright notice and this permission notice shall be included in all
+#	copies or substantial portions of the Software.
+#
+#	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#	SOFTWARE.
+#
+
+#!/usr/bin/env python
+import numpy as np
+import warnings
+import math
+
+from .nodeMatrix import portReduction
+
+# Frequencies per chunk when evaluating the model
+CHUNK = 65536
+
+# Least squares with column scaling. A is real (m, n), B is (m, k)
+def _lstsq(A, B):
+
+	scale = np.linalg.norm(A, axis=0)
+	scale[scale == 0] = 1.0
+
+	x = np.linalg.lstsq(A / scale, B, rcond=None)[0]
+
+	return x / scale.reshape( (-1,) + (1,) * (x.ndim - 1) )
+
+# Stack real and imaginary parts of complex rows
+def _real(A):
+
+	return np.concatenate( [ A.real, A.imag ], axis=0 )
+
+# Real valued pole basis (nfreq, nparams). Real poles contribute 1/(s-a) and
+# complex poles (stored with positive imaginary part) contribute the pair
+# 1/(s-a) + 1/(s-a*) and j/(s-a) - j/(s-a*)
+def poleBasis(s, poles):
+
+	cols = []
+
+	for a in poles:
+
+		if a.imag == 0:
+			cols.append( 1.0 / ( s - a ) )
+
+		else:
+			cols.append( 1.0 / ( s - a ) + 1.0 / ( s - a.conjugate() ) )
+			cols.append( 1j / ( s - a ) - 1j / ( s - a.conjugate() ) )
+
+	return np.stack(cols, axis=1)
+
+# Initial poles. Complex pairs with imaginary parts spread over the band and
+# small damping, plus one real pole if npoles is odd.
+def initialPoles(freq, npoles):
+
+	fmin, fmax = max( np.min(freq), 0.0 ), np.max(freq)
+
+	if fmin > 0 and fmax / fmin > 100:
+		beta = 2 * math.pi * np.logspace( math.log10(fmin), math.log10(fmax), npoles // 2 )
+
+	else:
+		beta = 2 * math.pi * np.linspace( max(fmin, fmax / 100.), fmax, npoles // 2 )
+
+	poles = list( -beta / 100. + 1j * beta )
+
+	if npoles % 2:
+		poles.append( complex( -2 * math.pi * fmax, 0.0 ) )
+
+	return np.array(poles, dtype=complex)
+
+# Rational (pole-residue) model fitted by vector fitting. Data has shape
+# (nfreq, ...) e.g. (nfreq, 2, 2) twoport admittances. All entries share the
+# same poles:
+#
+#	H(s) = sum_k r_k / (s - a_k) + d + s e
+#
+# Complex poles appear in conjugate pairs so the impulse response is real.
+# Asymptote is "d" (constant term), "de" (constant and proportional) or None.
+# If passive is True the model is perturbed until the hermitian part of H is
+# positive semidefinite on a dense frequency grid (immittance data only). The
+# outcome is kept in passive and violation (None if not enforced), and a
+# RuntimeWarning is issued if violations remain.
+class vectorFit:
+
+	def __init__(self, freq, data, npoles = 10, niter = 10, asymptote = "d", weights = None, passive = False):
+
+		self.freq = np.atleast_1d( np.asarray(freq, dtype=float) )
+
+		data = np.asarray(data, dtype=complex)
+		self.shape = data.shape[1:]
+
+		if asymptote not in ("d", "de", None):
+			raise ValueError("Unknown asymptote (%s)"%asymptote)
+
+		self.asymptote = asymptote
+
+		# Responses as columns (nfreq, nresponses)
+		H = data.reshape( len(self.freq), -1 )
+		s = 2j * math.pi * self.freq
+
+		w = np.ones( len(self.freq) ) if weights is None else np.broadcast_to( np.asarray(weights, dtype=float), self.freq.shape )
+
+		# Pole relocation
+		poles = initialPoles(self.freq, npoles)
+
+		for _ in range(niter):
+			poles = self._relocate(s, H, poles, w)
+
+		self.poles = poles
+
+		# Residue identification with final poles
+		self.params = _lstsq( _real( self._basis(s, poles) * w[:, np.newaxis] ), _real( H * w[:, np.newaxis] ) )
+
+		self.data = data
+		self.passive, self.violation = None, None
+
+		if passive and not self.enforcePassivity():
+			warnings.warn("Passivity enforcement failed (violation %g)"%self.violation, RuntimeWarning)
+
+		self.error = self.fitError(self.freq, data)
+
+	# Fit twoport admittance between n1 and n2 of a frequency analysis
+	@classmethod
+	def fromAnalysis(cls, analysis, n1, n2, **kwargs):
+
+		return cls( analysis.freq, portReduction( analysis.getTensor(), [n1, n2] ), **kwargs )
+
+	# Pole basis with asymptotic terms
+	def _basis(self, s, poles):
+
+		cols = [ poleBasis(s, poles) ]
+
+		if self.asymptote is not None:
+			cols.append( np.ones( (len(s), 1), dtype=complex ) )
+
+		if self.asymptote == "de":
+			cols.append( s[:, np.newaxis] )
+
+		return np.concatenate(cols, axis=1)
+
+	# One pole relocation step. Solves for the weighting function sigma(s) =
+	# 1 + sum c_k / (s - a_k) such that sigma H is rational with the current
+	# poles. The QR decomposition of each response eliminates its residues so
+	# only the sigma coefficients are solved jointly. New poles are the zeros
+	# of sigma with unstable poles flipped into the left half plane.
+	def _relocate(self, s, H, poles, w):
+
+		Phi = poleBasis(s, poles)
+		A = self._basis(s, poles)
+
+		n, m = A.shape[1], Phi.shape[1]
+
+		# (nresponses, 2 nfreq, n + m) batched least squares systems
+		M = np.concatenate( [ np.broadcast_to( A, (H.shape[1],) + A.shape ), -1.0 * H.T[:, :, np.newaxis] * Phi ], axis=2 )
+		M = np.concatenate( [ M.real, M.imag ], axis=1 ) * np.tile(w, 2)[np.newaxis, :, np.newaxis]
+		b = np.concatenate( [ H.T.real, H.T.imag ], axis=1 ) * np.tile(w, 2)[np.newaxis, :]
+
+		Q, R = np.linalg.qr(M)
+		rhs = np.einsum('rij,ri->rj', Q[:, :, n:], b)
+
+		c = _lstsq( R[:, n:, n:].reshape(-1, m), rhs.reshape(-1) )
+
+		# Zeros of sigma: eig(A - b c^T) in real block form
+		Ar, br = np.zeros( (m, m) ), np.zeros(m)
+		i = 0
+
+		for a in poles:
+
+			if a.imag == 0:
+				Ar[i, i], br[i] = a.real, 1.0
+				i += 1
+
+			else:
+				Ar[i:i+2, i:i+2] = [ [a.real, a.imag], [-a.imag, a.real] ]
+				br[i] = 2.0
+				i += 2
+
+		zeros = np.linalg.eigvals( Ar - np.outer(br, c) )
+
+		# Stable poles with one member of each conjugate pair
+		zeros = -np.abs(zeros.real) + 1j * zeros.imag
+		zeros[ np.abs(zeros.imag) < 1e-12 * np.abs(zeros) ] = zeros[ np.abs(zeros.imag) < 1e-12 * np.abs(zeros) ].real
+
+		return np.sort_complex( zeros[ zeros.imag >= 0 ] )
+
+	# Complex residues (npoles, ...), constant and proportional terms
+	@property
+	def residues(self):
+
+		r, i = [], 0
+
+		for a in self.poles:
+
+			if a.imag == 0:
+				r.append( self.params[i] + 0j )
+				i += 1
+
+			else:
+				r.append( self.params[i] + 1j * self.params[i+1] )
+				i += 2
+
+		return np.array(r).reshape( (len(self.poles),) + self.shape )
+
+	@property
+	def d(self):
+
+		m = len(self.poles) + np.count_nonzero(self.poles.imag)
+		return ( self.params[m] if self.asymptote is not None else np.zeros( self.params.shape[1] ) ).reshape(self.shape)
+
+	@property
+	def e(self):
+
+		return ( self.params[-1] if self.asymptote == "de" else np.zeros( self.params.shape[1] ) ).reshape(self.shape)
+
+	# All poles and residues including conjugates
+	def _expanded(self):
+
+		r = self.residues.reshape( len(self.poles), -1 )
+		c = self.poles.imag != 0
+
+		return np.concatenate( [ self.poles, self.poles[c].conj() ] ), np.concatenate( [ r, r[c].conj() ] )
+
+	# Evaluate the model at an array of frequencies. Returns (nfreq, ...)
+	def __call__(self, freq, chunk = CHUNK):
+
+		freq = np.atleast_1d( np.asarray(freq, dtype=float) )
+		s = 2j * math.pi * freq
+
+		a, r = self._expanded()
+		d, e = self.d.reshape(-1), self.e.reshape(-1)
+
+		out = np.empty( (len(freq), r.shape[1]), dtype=complex )
+
+		for i in range(0, len(freq), chunk):
+
+			_s = s[i:i+chunk, np.newaxis]
+			out[i:i+chunk] = np.matmul( 1.0 / ( _s - a ), r ) + d + _s * e
+
+		return out.reshape( (len(freq),) + self.shape )
+
+	# Impulse response sum_k r_k exp(a_k t) at times t >= 0 (excluding the
+	# d delta(t) and e delta'(t) terms). Returns (ntimes, ...)
+	def impulse(self, t, chunk = CHUNK):
+
+		t = np.atleast_1d( np.asarray(t, dtype=float) )
+		a, r = self._expanded()
+
+		out = np.empty( (len(t), r.shape[1]) )
+
+		for i in range(0, len(t), chunk):
+			out[i:i+chunk] = np.matmul( np.exp( t[i:i+chunk, np.newaxis] * a ), r ).real
+
+		return out.reshape( (len(t),) + self.shape )
+
+	# Fit error against data. Returns rms, max and relative rms error
+	def fitError(self, freq, data):
+
+		err = np.abs( self(freq) - np.asarray(data) )
+
+		return {
+			"rms" 		: float( np.sqrt( np.mean(err**2) ) ),
+			"max"		: float( np.max(err) ),
+			"relative"	: float( np.sqrt( np.mean(err**2) / np.mean( np.abs(data)**2 ) ) ),
+		}
+
+	# Minimum eigenvalue of the hermitian part of the model at freq
+	def passivity(self, freq):
+
+		H = self(freq)
+		return np.linalg.eigvalsh( 0.5 * ( H + np.conj( np.swapaxes(H, -1, -2) ) ) )[:, 0]
+
+	# Passivity enforcement by residue perturbation (d and e are kept). On a 
+	# check grid (fit band, extension to 1e3 fmax and resonances) the 
+	# hermitian part G = V L V^H is evaluated. Every eigenvalue gives one 
+	# linearized constraint v^H dG v >= margin - L on the residue change, and 
+	# eigenvalues within rtol of |H| at their frequency count as round-off. 
+	# Among the changes meeting the constraints the one with the smallest 
+	# change at the fit frequencies is taken (plus beta times the change on 
+	# the check grid). Repeated up to niter times.
+	#
+	# If the relative in-band error grows by more than tol the original 
+	# model is restored and reported as non-passive. Returns True if no 
+	# violations remain on the check grid. The result and the largest 
+	# remaining violation are stored in passive and violation.
+	def enforcePassivity(self, freq = None, niter = 20, margin = 0.0, tol = 1e-3, rtol = 1e-9, beta = 1e-3):
+
+		if len(self.shape) != 2 or self.shape[0] != self.shape[1]:
+			raise ValueError("Passivity enforcement needs square (immittance) data")
+
+		# Check grid: fit band, extension to high frequency and resonances
+		if freq is None:
+
+			fmax = np.max(self.freq)
+			fmin = max( np.min(self.freq[self.freq > 0]), fmax * 1e-6 )
+
+			freq = np.unique( np.concatenate( [
+				self.freq,
+				np.logspace( math.log10(fmin), math.log10(fmax * 1e3), 10 * len(self.freq) ),
+				np.abs(self.poles.imag) / ( 2 * math.pi ),
+			] ) )
+
+		sc = 2j * math.pi * freq
+		params, error = self.params.copy(), self.fitError(self.freq, self.data)["relative"]
+
+		# Metric of residue changes: mean square change at the fit frequencies
+		# plus beta times the mean square change on the check grid, which 
+		# bounds changes the band does not see
+		A = _real( poleBasis(2j * math.pi * self.freq, self.poles) )
+		Ac = _real( poleBasis(sc, self.poles) )
+		m = A.shape[1]
+
+		P = np.matmul(A.T, A) / len(A) + beta * np.matmul(Ac.T, Ac) / len(Ac)
+		P = np.linalg.inv( P + 1e-12 * np.trace(P) / m * np.eye(m) )
+
+		for _ in range(niter):
+
+			L, V, bad = self._violations(freq, margin, rtol)
+
+			if not np.any(bad):
+				break
+
+			# Constraint rows C[c, entry, k] on the residue changes X[k, entry]
+			# for every eigenvalue on the check grid
+			v = np.swapaxes(V, 1, 2).reshape( -1, V.shape[1] )
+			w = ( np.conj(v)[:, :, np.newaxis] * v[:, np.newaxis, :] ).reshape( len(v), -1 )
+			C = np.real( w[:, :, np.newaxis] * np.repeat( poleBasis(sc, self.poles), V.shape[1], axis=0 )[:, np.newaxis, :] )
+
+			t = ( margin - L + rtol * self._scale(freq)[:, np.newaxis] ).ravel()
+
+			self.params[:m] += self._qp(C, P, t)
+
+			if self.fitError(self.freq, self.data)["relative"] > error + tol:
+				break
+
+		L, V, bad = self._violations(freq, margin, rtol)
+
+		self.passive = not np.any(bad)
+		self.violation = 0.0 if self.passive else float( np.max( margin - L[bad] ) )
+
+		# Keep the original model if the fit no longer matches the data
+		if self.fitError(self.freq, self.data)["relative"] > error + tol:
+
+			self.params = params
+
+			L, V, bad = self._violations(freq, margin, rtol)
+			self.passive, self.violation = False, float( np.max( margin - L[bad], initial = 0.0 ) )
+
+		return self.passive
+
+	# Minimum norm change X (m, nentries) in the metric inv(P) subject to the
+	# linear constraints sum C[c] X >= t[c]. Solved in the dual: X = P C^T mu
+	# with mu >= 0 minimizing mu^T K mu / 2 - t^T mu (L-BFGS-B).
+	def _qp(self, C, P, t):
+
+		from scipy.optimize import minimize
+
+		CP = np.matmul(C, P)
+		K = np.matmul( CP.reshape( len(C), -1 ), C.reshape( len(C), -1 ).T )
+
+		# Scale the dual so its gradient is of order one
+		scale = max( np.max( np.abs( np.diag(K) ) ), 1e-300 )
+
+		res = minimize(
+			lambda mu: ( 0.5 * mu @ K @ mu / scale - t @ mu / scale, ( K @ mu - t ) / scale ), 
+			np.zeros( len(t) ), jac = True, method = "L-BFGS-B", bounds = [ (0.0, None) ] * len(t), 
+			options = {"maxiter" : 1000, "ftol" : 1e-15, "gtol" : 1e-12}
+		)
+
+		return np.tensordot(res.x, CP, axes = 1).T
+
+	# Largest magnitude of the model at each frequency
+	def _scale(self, freq):
+
+		return np.max( np.abs( self(freq).reshape( len(freq), -1 ) ), axis=1 )
+
+	# Eigen decomposition of the hermitian part and mask of eigenvalues below
+	# margin beyond round-off
+	def _violations(self, freq, margin, rtol):
+
+		H = self(freq)
+		L, V = np.linalg.eigh( 0.5 * ( H + np.conj( np.swapaxes(H, -1, -2) ) ) )
+
+		return L, V, L < margin - rtol * np.max( np.abs( H.reshape( len(freq), -1 ) ), axis=1 )[:, np.newaxis]
@@ -43,7 +43,7 @@ setup(name='minispice',
 		keywords='Simulation Electronics Analysis Education',
 		license='MIT License',
 		python_requires='>=2.7, !=3.0.*, !=3.1.*, !=3.2.*, !=3.3.*',
-		install_requires=['visa', 'matplotlib', 'PyQt5'],
+		install_requires=['visa', 'numpy', 'scipy', 'matplotlib', 'PyQt5'],
 		classifiers=[
 			'Development Status :: 5 - Production/Stable',
 			'Intended Audience :: Science/Research',
@@ -62,6 +62,7 @@ setup(name='minispice',
 			'Programming Language :: Python :: 3.7',
 			],
 		packages=['minispice', 'minispice.nonlinear'],
+		entry_points={'console_scripts' : ['minispice=minispice.cli:main']},
 		platforms="Linux, Windows, Mac",
 		use_2to3=False,
 		zip_safe=False,